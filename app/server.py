@@ -74,7 +74,6 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-kg_gen = KGGen()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -234,7 +233,17 @@ async def generate_graph(
         if numeric_temperature is None:
             numeric_temperature = 1.0
 
-    kg_gen.init_model(model=model, api_key=api_key, temperature=numeric_temperature)
+    # A KGGen per request, so concurrent requests never share a model or key.
+    # An omitted temperature keeps KGGen's deterministic default.
+    kg_gen = KGGen(
+        model=model,
+        api_key=api_key,
+        **(
+            {"temperature": numeric_temperature}
+            if numeric_temperature is not None
+            else {}
+        ),
+    )
 
     logger.info(
         "Generating graph via KGGen: model=%s cluster=%s chunk_size=%s context_len=%s text_len=%s temperature=%s",
@@ -246,14 +255,11 @@ async def generate_graph(
         numeric_temperature,
     )
     try:
-        graph = kg_gen.generate(
+        graph = await kg_gen.agenerate(
             input_data=request_text,
-            model=model,
-            api_key=api_key,
             context=_clean_str(context) or "",
             chunk_size=numeric_chunk,
             cluster=_parse_bool(cluster),
-            temperature=numeric_temperature,
         )
     except ValidationError as exc:
         logger.exception("KGGen returned validation error")
@@ -0,0 +1,48 @@
+"""Reading and answering dspy ChatAdapter prompts.
+
+Shared by the offline LMs, `SimulatedLM` here and `FakeLM` in the tests, so
+they parse prompts and format answers the same way.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+
+FIELD_PATTERN = re.compile(
+    r"\[\[ ## (\w+) ## \]\]\n(.*?)(?=\n\n\[\[ ## |\n\nRespond with|\Z)", re.S
+)
+OUTPUT_FIELDS_PATTERN = re.compile(
+    r"Your output fields are:\n(.*?)All interactions", re.S
+)
+
+
+def output_fields(system_prompt: str) -> list[str]:
+    """The output field names a signature's system prompt asks for."""
+    block = OUTPUT_FIELDS_PATTERN.search(system_prompt).group(1)
+    return re.findall(r"^\d+\. `(\w+)`", block, re.M)
+
+
+def input_fields(user_prompt: str) -> dict[str, str]:
+    """The input field values of a user prompt, by name."""
+    return {name: value.strip() for name, value in FIELD_PATTERN.findall(user_prompt)}
+
+
+def parse_list(value: str) -> list:
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return []
+
+
+def format_answer(answer: dict) -> str:
+    """A ChatAdapter completion holding the fields of `answer`."""
+    return (
+        "\n\n".join(
+            # dspy reads str fields verbatim and everything else as JSON.
+            f"[[ ## {name} ## ]]\n"
+            + (value if isinstance(value, str) else json.dumps(value))
+            for name, value in answer.items()
+        )
+        + "\n\n[[ ## completed ## ]]"
+    )
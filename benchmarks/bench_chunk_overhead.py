@@ -0,0 +1,87 @@
+"""Per-chunk Python overhead of extraction, excluding network time.
+
+Runs `KGGen._process_chunk` sequentially over chunks of
+tests/data/kingkiller_chapter_one.txt against a zero-latency `SimulatedLM`,
+so the measured time is signature/predictor construction plus dspy prompt
+formatting and parsing. `--rebuild` clears the signature and predictor
+memoization before every chunk to reproduce per-chunk construction.
+
+Usage:
+    python -m benchmarks.bench_chunk_overhead [--chunks 200] [--rebuild]
+"""
+
+import argparse
+import time
+import tracemalloc
+from itertools import cycle, islice
+
+from src.kg_gen import KGGen
+from src.kg_gen.steps._2_get_relations import (
+    _relation_model,
+    extraction_sig,
+    joint_extraction_sig,
+)
+from src.kg_gen.utils.chunk_text import chunk_text
+from src.kg_gen.utils.predictors import cached_predict
+
+from .simulated_lm import SimulatedLM
+
+DATA_PATH = "tests/data/kingkiller_chapter_one.txt"
+
+
+def clear_memoization():
+    for memoized in (
+        _relation_model,
+        extraction_sig,
+        joint_extraction_sig,
+        cached_predict,
+    ):
+        memoized.cache_clear()
+
+
+def run(num_chunks: int, rebuild: bool, extraction_mode: str) -> dict[str, float]:
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        chunks = list(islice(cycle(chunk_text(f.read(), 1000)), num_chunks))
+
+    kg = KGGen(api_key="simulated")
+    kg.lm = SimulatedLM()
+    kg._process_chunk(chunks[0], False, extraction_mode)  # warm up imports
+
+    start = time.perf_counter()
+    for chunk in chunks:
+        if rebuild:
+            clear_memoization()
+        kg._process_chunk(chunk, False, extraction_mode)
+    elapsed = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows execution, so it is kept out of the timing.
+    tracemalloc.start()
+    for chunk in chunks:
+        if rebuild:
+            clear_memoization()
+        kg._process_chunk(chunk, False, extraction_mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ms_per_chunk": 1000 * elapsed / num_chunks, "peak_kib": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument(
+        "--extraction_mode", choices=["two_step", "joint"], default="two_step"
+    )
+    args = parser.parse_args()
+
+    result = run(args.chunks, args.rebuild, args.extraction_mode)
+    label = "rebuilt per chunk" if args.rebuild else "memoized"
+    print(
+        f"{label}: {result['ms_per_chunk']:.2f} ms/chunk, "
+        f"tracemalloc peak {result['peak_kib']:.0f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
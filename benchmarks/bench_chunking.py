@@ -0,0 +1,82 @@
+"""Compare `chunk_text` with the streaming `iter_chunks` on a large input.
+
+Builds a corpus of about `--mb` megabytes by repeating
+tests/data/kingkiller_chapter_one.txt, then reports wall time and peak
+Python heap for `chunk_text(text)` (whole text in memory) against
+`iter_chunks(path)` (memory-mapped file, chunks consumed one at a time).
+
+Usage:
+    python -m benchmarks.bench_chunking [--mb 50] [--chunk_size 500]
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from src.kg_gen.utils.chunk_text import chunk_text, iter_chunks
+
+DATA_PATH = "tests/data/kingkiller_chapter_one.txt"
+
+
+def write_corpus(path: Path, megabytes: int):
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        sample = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(max(1, megabytes * 1024 * 1024 // len(sample))):
+            f.write(sample)
+            f.write("\n")
+
+
+def run_chunk_text(path: Path, chunk_size: int) -> int:
+    with open(path, "r", encoding="utf-8") as f:
+        return len(chunk_text(f.read(), chunk_size))
+
+
+def run_iter_chunks(path: Path, chunk_size: int) -> int:
+    return sum(1 for _ in iter_chunks(path, chunk_size))
+
+
+def measure(fn, *args) -> tuple[int, float, float]:
+    gc.collect()
+    start = time.perf_counter()
+    count = fn(*args)
+    elapsed = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows execution, so it is kept out of the timing.
+    gc.collect()
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=50)
+    parser.add_argument("--chunk_size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "corpus.txt"
+        write_corpus(path, args.mb)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"corpus: {size_mb:.1f} MB, chunk_size={args.chunk_size}")
+
+        for name, fn in (
+            ("chunk_text", run_chunk_text),
+            ("iter_chunks", run_iter_chunks),
+        ):
+            count, elapsed, peak = measure(fn, path, args.chunk_size)
+            print(
+                f"{name:<12} {count:>8} chunks {elapsed:>8.2f} s "
+                f"{size_mb / elapsed:>7.2f} MB/s  peak heap {peak:>8.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""LM calls, prompt tokens and wall time of clustering with and without blocking.
+
+Clusters graphs of `--sizes` synthetic names, a tenth of them with a spelling
+variant, against `SimulatedLM`, which merges the variants. Blocks come from
+`HashingEmbedder` character-trigram embeddings. `clusters` should come out
+equal to `names`. Clustering without blocks puts every remaining item in each
+prompt, so it only runs up to `--max_unblocked` entities.
+
+Usage:
+    python -m benchmarks.bench_cluster_blocking [--sizes 500 5000 50000]
+        [--latency 0.05] [--block_size 50] [--threshold 0.6]
+"""
+
+import argparse
+import time
+
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+
+from .simulated_lm import SimulatedLM
+from .synthetic import HashingEmbedder, make_names, with_variants
+
+
+def run(
+    size: int,
+    blocking: bool,
+    latency: float,
+    block_size: int,
+    threshold: float,
+    max_concurrency: int,
+) -> dict[str, float]:
+    names = with_variants(make_names(size))
+    relations = {(s, "relates to", o) for s, o in zip(names, names[1:])}
+    graph = Graph(entities=set(names), edges={"relates to"}, relations=relations)
+
+    kg = KGGen(
+        api_key="simulated",
+        max_concurrency=max_concurrency,
+        cluster_block_size=block_size if blocking else None,
+        cluster_block_threshold=threshold,
+    )
+    kg.retrieval_model = HashingEmbedder()
+    kg.lm = SimulatedLM(latency)
+    start = time.perf_counter()
+    clustered = kg.cluster(graph)
+    elapsed = time.perf_counter() - start
+    totals = kg.lm.totals()
+    return {
+        "seconds": elapsed,
+        "calls": totals["calls"],
+        "prompt_tokens": totals["prompt_tokens"],
+        "clusters": len(clustered.entities),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--block_size", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--max_concurrency", type=int, default=16)
+    parser.add_argument("--max_unblocked", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(
+        f"{'entities':>9}{'mode':>10}{'seconds':>10}{'calls':>8}"
+        f"{'prompt_tokens':>15}{'clusters':>10}"
+    )
+    for size in args.sizes:
+        for blocking in (False, True):
+            if not blocking and size > args.max_unblocked:
+                continue
+            result = run(
+                size,
+                blocking,
+                args.latency,
+                args.block_size,
+                args.threshold,
+                args.max_concurrency,
+            )
+            mode = "blocked" if blocking else "full"
+            print(
+                f"{size:>9}{mode:>10}{result['seconds']:>10.2f}{result['calls']:>8}"
+                f"{result['prompt_tokens']:>15}{result['clusters']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
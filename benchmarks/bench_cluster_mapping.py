@@ -0,0 +1,94 @@
+"""Time to remap clustered relations: per-cluster scans against `ClusterMapping`.
+
+Builds `--triples` relations over `--entities` synthetic names, clustered in
+groups of `--cluster_size`, and remaps them with `ClusterMapping` and with the
+scan over every cluster that `cluster_graph` used before. Scanning costs
+relations x clusters, so it runs on the first `--scan_sample` relations and is
+extrapolated.
+
+Usage:
+    python -m benchmarks.bench_cluster_mapping [--triples 1000000]
+        [--entities 100000] [--cluster_size 3]
+"""
+
+import argparse
+import random
+import time
+
+from src.kg_gen.utils.cluster_mapping import ClusterMapping
+
+
+def scan_remap(relations, entities, entity_clusters, edges, edge_clusters):
+    """The remapping loop `cluster_graph` used before `ClusterMapping`."""
+    remapped = set()
+    for s, p, o in relations:
+        if s not in entities:
+            for rep, cluster in entity_clusters.items():
+                if s in cluster:
+                    s = rep
+                    break
+        if p not in edges:
+            for rep, cluster in edge_clusters.items():
+                if p in cluster:
+                    p = rep
+                    break
+        if o not in entities:
+            for rep, cluster in entity_clusters.items():
+                if o in cluster:
+                    o = rep
+                    break
+        remapped.add((s, p, o))
+    return remapped
+
+
+def clusters_of(names: list[str], size: int) -> dict[str, set[str]]:
+    return {names[i]: set(names[i : i + size]) for i in range(0, len(names), size)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--triples", type=int, default=1_000_000)
+    parser.add_argument("--entities", type=int, default=100_000)
+    parser.add_argument("--edges", type=int, default=1_000)
+    parser.add_argument("--cluster_size", type=int, default=3)
+    parser.add_argument("--scan_sample", type=int, default=1_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = [f"entity {i}" for i in range(args.entities)]
+    predicates = [f"edge {i}" for i in range(args.edges)]
+    relations = [
+        (rng.choice(names), rng.choice(predicates), rng.choice(names))
+        for _ in range(args.triples)
+    ]
+    entity_clusters = clusters_of(names, args.cluster_size)
+    edge_clusters = clusters_of(predicates, args.cluster_size)
+
+    start = time.perf_counter()
+    mapping = ClusterMapping(entity_clusters).remap_relations(
+        relations, ClusterMapping(edge_clusters)
+    )
+    mapping_seconds = time.perf_counter() - start
+
+    sample = relations[: args.scan_sample]
+    start = time.perf_counter()
+    scanned = scan_remap(
+        sample, set(entity_clusters), entity_clusters, set(edge_clusters), edge_clusters
+    )
+    scan_seconds = (time.perf_counter() - start) * len(relations) / len(sample)
+
+    check = ClusterMapping(entity_clusters).remap_relations(
+        sample, ClusterMapping(edge_clusters)
+    )
+    assert scanned == check, "ClusterMapping disagrees with the scan"
+
+    print(
+        f"{len(relations)} triples, {len(entity_clusters)} entity clusters, "
+        f"{len(mapping)} remapped triples"
+    )
+    print(f"{'ClusterMapping':<16}{mapping_seconds:>12.2f} s")
+    print(f"{'scan (estimate)':<16}{scan_seconds:>12.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""LM calls saved by merging trivial duplicates before clustering.
+
+Clusters graphs of `--sizes` synthetic names, a `--variant_rate` fraction of
+them with a case or plural variant, against `SimulatedLM`, with and without
+`cluster_normalize`. Normalization stems words with the Porter stemmer, so no
+WordNet data is needed. `avoided` is the estimate in `normalization_stats`;
+compare it with the difference in `calls`. `clusters` should come out equal to
+the number of names.
+
+Usage:
+    python -m benchmarks.bench_cluster_normalization [--sizes 200 1000]
+        [--variant_rate 0.3] [--window 100]
+"""
+
+import argparse
+import time
+
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+from src.kg_gen.utils.normalize import Normalizer
+
+from .simulated_lm import SimulatedLM
+from .synthetic import make_names, with_variants
+
+
+def run(size: int, variant_rate: float, normalize: bool, window) -> dict[str, float]:
+    names = with_variants(make_names(size), rate=variant_rate)
+    relations = {(s, "relates to", o) for s, o in zip(names, names[1:])}
+    graph = Graph(entities=set(names), edges={"relates to"}, relations=relations)
+
+    kg = KGGen(
+        api_key="simulated",
+        cluster_window=window,
+        cluster_normalize=Normalizer(lemmatize="stem") if normalize else False,
+    )
+    kg.lm = SimulatedLM()
+    start = time.perf_counter()
+    clustered = kg.cluster(graph)
+    elapsed = time.perf_counter() - start
+    totals = kg.lm.totals()
+    stats = kg.normalization_stats or {}
+    return {
+        "seconds": elapsed,
+        "calls": totals["calls"],
+        "prompt_tokens": totals["prompt_tokens"],
+        "avoided": sum(stat["estimated_lm_calls_avoided"] for stat in stats.values()),
+        "clusters": len(clustered.entities),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--variant_rate", type=float, default=0.3)
+    parser.add_argument("--window", type=int, default=100)
+    args = parser.parse_args()
+
+    print(
+        f"{'entities':>9}{'normalize':>11}{'seconds':>10}{'calls':>8}"
+        f"{'avoided':>9}{'prompt_tokens':>15}{'clusters':>10}"
+    )
+    for size in args.sizes:
+        for normalize in (False, True):
+            result = run(size, args.variant_rate, normalize, args.window)
+            print(
+                f"{size:>9}{str(normalize):>11}{result['seconds']:>10.2f}"
+                f"{result['calls']:>8}{result['avoided']:>9}"
+                f"{result['prompt_tokens']:>15}{result['clusters']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Prompt tokens per clustering call against graph size, with and without windows.
+
+Clusters graphs of `--sizes` synthetic names, a tenth of them with a spelling
+variant, against `SimulatedLM`. Without windows every prompt carries the
+remaining items and a `Literal` of all of them, so tokens per call grow with
+the graph and full clustering only runs up to `--max_full` entities. With
+`--window`, prompts number at most that many items and stay the same size.
+
+Usage:
+    python -m benchmarks.bench_cluster_prompts [--sizes 100 1000 10000]
+        [--window 100]
+"""
+
+import argparse
+import time
+
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+
+from .simulated_lm import SimulatedLM
+from .synthetic import make_names, with_variants
+
+
+def run(size: int, window) -> dict[str, float]:
+    names = with_variants(make_names(size))
+    relations = {(s, "relates to", o) for s, o in zip(names, names[1:])}
+    graph = Graph(entities=set(names), edges={"relates to"}, relations=relations)
+
+    kg = KGGen(api_key="simulated", cluster_window=window)
+    kg.lm = SimulatedLM()
+    start = time.perf_counter()
+    clustered = kg.cluster(graph)
+    elapsed = time.perf_counter() - start
+    totals = kg.lm.totals()
+    return {
+        "seconds": elapsed,
+        "calls": totals["calls"],
+        "tokens_per_call": totals["prompt_tokens"] / max(totals["calls"], 1),
+        "max_tokens": max(kg.lm.max_prompt_tokens.values(), default=0),
+        "clusters": len(clustered.entities),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--window", type=int, default=100)
+    parser.add_argument("--max_full", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(
+        f"{'entities':>9}{'mode':>12}{'seconds':>10}{'calls':>8}"
+        f"{'tokens/call':>13}{'max_tokens':>12}{'clusters':>10}"
+    )
+    for size in args.sizes:
+        for window in (None, args.window):
+            if window is None and size > args.max_full:
+                continue
+            result = run(size, window)
+            mode = "full" if window is None else f"window={window}"
+            print(
+                f"{size:>9}{mode:>12}{result['seconds']:>10.2f}{result['calls']:>8}"
+                f"{result['tokens_per_call']:>13.0f}{result['max_tokens']:>12}"
+                f"{result['clusters']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""End-to-end throughput of kg-gen against a simulated LM.
+
+Runs every public stage over a synthetic corpus of `--chunks` chunks
+(1k-100k) with `SimulatedLM` as the provider, so results track kg-gen's own
+cost plus the simulated latency and errors rather than a real API:
+
+    generate_chunked    generate over the whole corpus with chunk_size
+    generate_unchunked  generate over one `--unchunked_chunks`-chunk document
+    aggregate           aggregate the chunked graph split into `--documents` graphs
+    cluster             cluster the subgraph of the first `--cluster_entities` entities
+    embed               generate_embeddings for the chunked graph
+    retrieve            `--queries` retrieve calls against those embeddings
+    visualize           visualize the chunked graph to an HTML file
+
+Each stage reports wall time, throughput, LM calls and the process's peak
+RSS after the stage (a high-water mark, so it only grows from stage to
+stage). Per-step LM latencies come from a `MetricsCollector`. Pass `--json`
+to save the results for comparison between releases.
+
+Usage:
+    python -m benchmarks.bench_end_to_end [--chunks 1000] [--latency 0.05]
+        [--error_rate 0.01] [--output_scale 2] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+from src.kg_gen.utils.chunk_text import chunk_text
+from src.kg_gen.utils.metrics import MetricsCollector
+
+from .simulated_lm import SimulatedLM
+from .synthetic import HashingEmbedder, synthetic_corpus
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def split_graph(graph: Graph, parts: int) -> list[Graph]:
+    """Partition `graph`'s relations into `parts` graphs with their entities."""
+    relations = sorted(graph.relations)
+    graphs = []
+    for i in range(parts):
+        part = set(relations[i::parts])
+        graphs.append(
+            Graph(
+                entities={e for s, _, o in part for e in (s, o)},
+                edges={p for _, p, _ in part},
+                relations=part,
+            )
+        )
+    return graphs
+
+
+def subgraph(graph: Graph, num_entities: int) -> Graph:
+    """The first `num_entities` entities (sorted) and the relations among them."""
+    entities = set(sorted(graph.entities)[:num_entities])
+    relations = {r for r in graph.relations if r[0] in entities and r[2] in entities}
+    return Graph(
+        entities=entities, edges={p for _, p, _ in relations}, relations=relations
+    )
+
+
+class Stages:
+    """Times stages and records throughput, LM calls and peak RSS for each."""
+
+    def __init__(self, lm: SimulatedLM):
+        self.lm = lm
+        self.results: dict[str, dict[str, float]] = {}
+
+    def run(self, name: str, items: int, fn):
+        self.lm.reset()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        totals = self.lm.totals()
+        self.results[name] = {
+            "seconds": round(elapsed, 3),
+            "items": items,
+            "items_per_second": round(items / elapsed, 1) if elapsed else 0.0,
+            "lm_calls": totals["calls"],
+            "lm_errors": totals["errors"],
+            "peak_rss_mib": round(peak_rss_mib(), 1),
+        }
+        return result
+
+    def report(self) -> str:
+        columns = [
+            "seconds",
+            "items",
+            "items_per_second",
+            "lm_calls",
+            "lm_errors",
+            "peak_rss_mib",
+        ]
+        rows = [["stage", *columns]]
+        for name, stats in self.results.items():
+            rows.append([name, *(str(stats[column]) for column in columns)])
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+            for row in rows
+        )
+
+
+def run(args) -> dict:
+    text = synthetic_corpus(args.chunks, args.chunk_size, seed=args.seed)
+    chunks = chunk_text(text, args.chunk_size)
+    num_chunks = len(chunks)
+    unchunked = " ".join(chunks[: args.unchunked_chunks])
+
+    collector = MetricsCollector()
+    kg = KGGen(
+        api_key="simulated",
+        max_concurrency=args.max_concurrency,
+        callbacks=[collector],
+    )
+    kg.lm = SimulatedLM(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        output_scale=args.output_scale,
+        seed=args.seed,
+    )
+    stages = Stages(kg.lm)
+
+    # Chunks are the items of the generate stages and entities of the rest.
+    graph = stages.run(
+        "generate_chunked",
+        num_chunks,
+        lambda: kg.generate(input_data=text, chunk_size=args.chunk_size),
+    )
+    stages.run(
+        "generate_unchunked",
+        args.unchunked_chunks,
+        lambda: kg.generate(input_data=unchunked),
+    )
+    graphs = split_graph(graph, args.documents)
+    stages.run("aggregate", len(graph.entities), lambda: kg.aggregate(graphs))
+    to_cluster = subgraph(graph, args.cluster_entities)
+    stages.run("cluster", len(to_cluster.entities), lambda: kg.cluster(to_cluster))
+
+    embedder = HashingEmbedder()
+    nx_graph = kg.to_nx(graph)
+    node_embeddings, _ = stages.run(
+        "embed",
+        len(graph.entities),
+        lambda: kg.generate_embeddings(nx_graph, embedder),
+    )
+    queries = random.Random(args.seed).sample(
+        text.split(". "), min(args.queries, text.count(". "))
+    )
+    stages.run(
+        "retrieve",
+        len(queries),
+        lambda: [
+            kg.retrieve(query, node_embeddings, nx_graph, embedder) for query in queries
+        ],
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        output_path = os.path.join(folder, "graph.html")
+        stages.run(
+            "visualize",
+            len(graph.entities),
+            lambda: kg.visualize(graph, output_path),
+        )
+
+    return {
+        "config": vars(args),
+        "graph": {
+            "chunks": num_chunks,
+            "entities": len(graph.entities),
+            "relations": len(graph.relations),
+        },
+        "stages": stages.results,
+        "steps": collector.summary(),
+        "report": stages.report(),
+        "steps_report": collector.report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--chunk_size", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    parser.add_argument("--output_scale", type=int, default=1)
+    parser.add_argument("--max_concurrency", type=int, default=16)
+    parser.add_argument("--unchunked_chunks", type=int, default=20)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--cluster_entities", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    graph = results["graph"]
+    print(
+        f"{graph['chunks']} chunks -> {graph['entities']} entities, "
+        f"{graph['relations']} relations\n"
+    )
+    print(results.pop("report"))
+    print()
+    print(results.pop("steps_report"))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
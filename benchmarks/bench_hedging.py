@@ -0,0 +1,109 @@
+"""Measure the effect of hedged requests on a long-tailed provider.
+
+Runs `generate` over tests/data/kingkiller_chapter_one.txt against
+`SimulatedLM` with a heavy latency tail: most calls take `--latency` seconds,
+but a `--tail_rate` fraction take `--tail_latency` seconds. Each configuration
+reports wall time, per-call latency percentiles (as seen by the caller) and
+hedge statistics.
+
+Usage:
+    python -m benchmarks.bench_hedging [--chunk_size 500] [--percentile 0.9]
+"""
+
+import argparse
+import random
+import threading
+import time
+from typing import Optional
+
+from src.kg_gen import KGGen
+from src.kg_gen.utils.hedging import Hedger
+
+from .simulated_lm import SimulatedLM
+
+DATA_PATH = "tests/data/kingkiller_chapter_one.txt"
+
+
+class TailLatencyLM(SimulatedLM):
+    """SimulatedLM whose latency has a heavy tail, optionally hedged."""
+
+    def __init__(
+        self,
+        latency: float,
+        tail_latency: float,
+        tail_rate: float,
+        hedger: Optional[Hedger] = None,
+        seed: int = 0,
+    ):
+        super().__init__(latency)
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.hedger = hedger
+        self.observed: list[float] = []
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _sample_latency(self) -> float:
+        with self._random_lock:
+            slow = self._random.random() < self.tail_rate
+        return self.tail_latency if slow else self.latency
+
+    def _attempt(self, prompt, messages):
+        time.sleep(self._sample_latency())
+        return self._respond(prompt, messages)
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        start = time.monotonic()
+        if self.hedger is None:
+            response = self._attempt(prompt, messages)
+        else:
+            response = self.hedger.call(lambda: self._attempt(prompt, messages))
+        with self._lock:
+            self.observed.append(time.monotonic() - start)
+        return response
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run(args, hedger: Optional[Hedger]) -> dict:
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        text = f.read()
+    kg = KGGen(api_key="simulated", max_concurrency=args.concurrency)
+    kg.lm = TailLatencyLM(args.latency, args.tail_latency, args.tail_rate, hedger)
+    start = time.perf_counter()
+    kg.generate(input_data=text, chunk_size=args.chunk_size)
+    wall = time.perf_counter() - start
+    observed = kg.lm.observed
+    return {
+        "wall_seconds": round(wall, 2),
+        "calls": len(observed),
+        "p50": round(percentile(observed, 0.5), 3),
+        "p99": round(percentile(observed, 0.99), 3),
+        "max": round(max(observed), 3),
+        **(hedger.stats() if hedger else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk_size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tail_latency", type=float, default=1.0)
+    parser.add_argument("--tail_rate", type=float, default=0.05)
+    parser.add_argument("--percentile", type=float, default=0.9)
+    parser.add_argument("--max_hedge_ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print("no hedging:", run(args, None))
+    hedger = Hedger(
+        percentile=args.percentile, max_hedge_ratio=args.max_hedge_ratio, min_samples=10
+    )
+    print("hedged:    ", run(args, hedger))
+
+
+if __name__ == "__main__":
+    main()
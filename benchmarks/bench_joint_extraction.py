@@ -0,0 +1,53 @@
+"""Compare LM calls and tokens of two-step vs joint extraction.
+
+Runs `generate` over tests/data/kingkiller_chapter_one.txt in both extraction
+modes against `SimulatedLM` and reports calls and estimated prompt/completion
+tokens (~4 characters per token).
+
+Usage:
+    python -m benchmarks.bench_joint_extraction [--chunk_size 1000]  # 0 = unchunked
+"""
+
+import argparse
+
+from src.kg_gen import KGGen
+
+from .simulated_lm import SimulatedLM
+
+DATA_PATH = "tests/data/kingkiller_chapter_one.txt"
+
+
+def run(chunk_size: int) -> dict[str, dict[str, int]]:
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    kg = KGGen(api_key="simulated")
+    kg.lm = SimulatedLM()
+    results = {}
+    for mode in ("two_step", "joint"):
+        kg.lm.reset()
+        kg.generate(input_data=text, chunk_size=chunk_size, extraction_mode=mode)
+        results[mode] = kg.lm.totals()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk_size", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = run(args.chunk_size)
+    print(f"{'mode':<10}{'calls':>8}{'prompt_tokens':>16}{'completion_tokens':>20}")
+    for mode, totals in results.items():
+        print(
+            f"{mode:<10}{totals['calls']:>8}{totals['prompt_tokens']:>16}"
+            f"{totals['completion_tokens']:>20}"
+        )
+    two_step, joint = results["two_step"], results["joint"]
+    for key in ("calls", "prompt_tokens"):
+        saved = 1 - joint[key] / two_step[key]
+        print(f"{key} saved by joint mode: {saved:.1%}")
+
+
+if __name__ == "__main__":
+    main()
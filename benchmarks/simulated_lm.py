@@ -0,0 +1,206 @@
+"""Offline stand-in LM for benchmarking kg-gen without a provider.
+
+`SimulatedLM` reads the dspy ChatAdapter prompt, works out which kg-gen
+signature is being called and answers it from the prompt itself, so every
+pipeline stage runs end to end. Entities are the capitalized words of the
+source text, and clustering groups entities that differ only in case or a
+trailing "s". It records calls, prompt/completion token estimates and the
+largest prompt per signature.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import dspy
+
+from src.kg_gen.utils.rate_limit import estimate_tokens
+
+from ._prompt_parsing import format_answer, input_fields, output_fields, parse_list
+
+OBJECTIVE_PATTERN = re.compile(r"your objective is:\s*\n\s*(\S.*)")
+ENTITY_PATTERN = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)*\b")
+
+
+def _cluster_key(item: str) -> str:
+    return item.casefold().removesuffix("s")
+
+
+def _largest_cluster(items: list[str]) -> list[str]:
+    """The largest group of items with the same cluster key, or [] if no two
+    share one."""
+    groups: dict[str, list[str]] = defaultdict(list)
+    for item in sorted(items):
+        groups[_cluster_key(item)].append(item)
+    largest = max(groups.values(), key=len, default=[])
+    return largest if len(largest) > 1 else []
+
+
+class SimulatedLM(dspy.BaseLM):
+    """Deterministic LM that answers kg-gen signatures offline.
+
+    Args:
+        latency: Seconds to sleep per call, simulating network time
+        error_rate: Probability (0-1) that an attempt fails transiently. Failed
+            attempts are retried inside the LM, each costing another `latency`,
+            so errors slow a run down without failing it
+        output_scale: Relations per entity in extraction answers; each entity
+            is related to the next `output_scale` entities
+        seed: Seed for sampling errors
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        output_scale: int = 1,
+        seed: int = 0,
+    ):
+        if not 0.0 <= error_rate < 1.0:
+            raise ValueError("error_rate must be in [0, 1)")
+        if output_scale < 1:
+            raise ValueError("output_scale must be at least 1")
+        super().__init__(model="simulated/kg-gen", cache=False)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.output_scale = output_scale
+        self.calls: dict[str, int] = defaultdict(int)
+        self.prompt_tokens: dict[str, int] = defaultdict(int)
+        self.completion_tokens: dict[str, int] = defaultdict(int)
+        self.max_prompt_tokens: dict[str, int] = defaultdict(int)
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stage(system_prompt: str, outputs: list[str]) -> str:
+        objective = OBJECTIVE_PATTERN.search(system_prompt)
+        return ",".join(outputs) + (
+            f" ({objective.group(1)[:40]})" if objective else ""
+        )
+
+    def _answer(self, outputs: list[str], inputs: dict[str, str]) -> dict:
+        answer = {}
+        for field in outputs:
+            if field == "entities":
+                found = ENTITY_PATTERN.findall(inputs.get("source_text", ""))
+                answer[field] = sorted(set(found))
+            elif field in ("relations", "fixed_relations"):
+                entities = (
+                    parse_list(inputs["entities"])
+                    if "entities" in inputs
+                    else answer.get("entities", [])
+                )
+                answer[field] = [
+                    {"subject": s, "predicate": "relates to", "object": o}
+                    for step in range(1, self.output_scale + 1)
+                    for s, o in zip(entities, entities[step:])
+                ]
+            elif field == "representative":
+                answer[field] = sorted(parse_list(inputs.get("cluster", "[]")))[0]
+            elif field == "cluster":
+                answer[field] = _largest_cluster(parse_list(inputs["items"]))
+            elif field == "cluster_ids":
+                numbered = parse_list(inputs["items"])
+                cluster = set(_largest_cluster(list(numbered.values())))
+                answer[field] = [
+                    int(i) for i, item in numbered.items() if item in cluster
+                ]
+            elif field == "validated_ids":
+                answer[field] = sorted(int(i) for i in parse_list(inputs["cluster"]))
+            elif field == "cluster_ids_that_items_belong_to":
+                cluster_ids = {
+                    _cluster_key(cluster["representative"]): int(i)
+                    for i, cluster in parse_list(inputs["clusters"]).items()
+                }
+                answer[field] = [
+                    cluster_ids.get(_cluster_key(item))
+                    for item in parse_list(inputs["items"]).values()
+                ]
+            elif field == "validated_items":
+                answer[field] = sorted(parse_list(inputs["cluster"]))
+            elif field == "cluster_reps_that_items_belong_to":
+                representatives = {
+                    _cluster_key(cluster["representative"]): cluster["representative"]
+                    for cluster in parse_list(inputs["clusters"])
+                }
+                answer[field] = [
+                    representatives.get(_cluster_key(item))
+                    for item in parse_list(inputs["items"])
+                ]
+            elif field == "reasoning":
+                answer[field] = "Not applicable."
+            else:
+                answer[field] = []
+        return answer
+
+    def _attempts(self) -> int:
+        """Attempts until one succeeds, counting the failures in `errors`."""
+        attempts = 1
+        with self._lock:
+            while self._random.random() < self.error_rate:
+                attempts += 1
+                self.errors += 1
+        return attempts
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        time.sleep(self.latency * self._attempts())
+        return self._respond(prompt, messages)
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        await asyncio.sleep(self.latency * self._attempts())
+        return self._respond(prompt, messages)
+
+    def _respond(self, prompt, messages):
+        system_prompt = messages[0]["content"]
+        outputs = output_fields(system_prompt)
+        inputs = input_fields(messages[-1]["content"])
+        content = format_answer(self._answer(outputs, inputs))
+
+        prompt_tokens = estimate_tokens(prompt, messages)
+        completion_tokens = estimate_tokens(content)
+        stage = self._stage(system_prompt, outputs)
+        with self._lock:
+            self.calls[stage] += 1
+            self.prompt_tokens[stage] += prompt_tokens
+            self.max_prompt_tokens[stage] = max(
+                self.max_prompt_tokens[stage], prompt_tokens
+            )
+            self.completion_tokens[stage] += completion_tokens
+
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        # Report usage as dspy.LM does, so `track_call` events carry tokens.
+        if dspy.settings.usage_tracker:
+            dspy.settings.usage_tracker.add_usage(self.model, usage)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=usage,
+            model=self.model,
+        )
+
+    def totals(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "calls": sum(self.calls.values()),
+                "prompt_tokens": sum(self.prompt_tokens.values()),
+                "completion_tokens": sum(self.completion_tokens.values()),
+                "errors": self.errors,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.prompt_tokens.clear()
+            self.completion_tokens.clear()
+            self.max_prompt_tokens.clear()
+            self.errors = 0
@@ -0,0 +1,103 @@
+"""Synthetic corpora and embeddings for benchmarking kg-gen at scale.
+
+`synthetic_corpus` writes short sentences relating made-up names, so
+`SimulatedLM` finds a few entities per sentence. Some mentions are spelling
+variants of a name, which `SimulatedLM` clusters with it. `HashingEmbedder`
+stands in for a SentenceTransformer.
+"""
+
+from __future__ import annotations
+
+import random
+import zlib
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+SYLLABLES = [
+    "ka", "lor", "bri", "an", "del", "mo", "ra", "ven",
+    "is", "or", "en", "tu", "sa", "mir", "gol", "thi",
+]  # fmt: skip
+VERBS = ["met", "followed", "trusted", "wrote to", "sailed with", "argued with"]
+VARIANT_RATE = 0.1
+
+
+def make_names(count: int, seed: int = 0) -> list[str]:
+    """`count` distinct capitalized names of two to five syllables."""
+    if count > len(SYLLABLES) ** 5 // 2:
+        raise ValueError(f"cannot make {count} distinct names")
+    rng = random.Random(seed)
+    names: set[str] = set()
+    while len(names) < count:
+        syllables = rng.choices(SYLLABLES, k=rng.randint(2, 5))
+        names.add("".join(syllables).capitalize())
+    return sorted(names)
+
+
+def variant(name: str, rng: random.Random) -> str:
+    """A spelling variant of `name`: plural, lowercase or both."""
+    return rng.choice([name + "s", name.lower(), name.lower() + "s"])
+
+
+def with_variants(
+    names: list[str], rate: float = VARIANT_RATE, seed: int = 0
+) -> list[str]:
+    """`names` plus, for a `rate` fraction of them, one spelling variant."""
+    rng = random.Random(seed)
+    variants = {variant(name, rng) for name in names if rng.random() < rate}
+    return sorted(set(names) | variants)
+
+
+def synthetic_corpus(
+    num_chunks: int,
+    chunk_size: int = 500,
+    vocabulary: Optional[int] = None,
+    seed: int = 0,
+) -> str:
+    """Text of about `num_chunks * chunk_size` characters.
+
+    Args:
+        num_chunks: Number of `chunk_size` chunks the text should fill
+        chunk_size: Chunk size in characters
+        vocabulary: Number of distinct names; defaults to two per chunk, so the
+            graph grows with the corpus
+        seed: Seed for names and sentences
+    """
+    rng = random.Random(seed)
+    names = make_names(vocabulary or max(50, 2 * num_chunks), seed)
+    target = num_chunks * chunk_size
+    sentences, size = [], 0
+    while size < target:
+        subject, obj = rng.sample(names, 2)
+        if rng.random() < VARIANT_RATE:
+            obj += "s"  # a plural variant, the kind clustering merges
+        sentence = f"{subject} {rng.choice(VERBS)} {obj} near {rng.choice(names)}."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)
+
+
+class HashingEmbedder:
+    """Character-trigram counts hashed into `dimensions` buckets.
+
+    Has the `encode` method kg-gen's retrieval and clustering blocks use, so
+    they run without downloading a model. Spelling variants of a name get
+    similar embeddings.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _encode(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in text.casefold().split():
+            padded = f" {token} "
+            for i in range(len(padded) - 2):
+                trigram = padded[i : i + 3].encode("utf-8")
+                vector[zlib.crc32(trigram) % self.dimensions] += 1.0
+        return vector
+
+    def encode(self, text: Union[str, Sequence[str]]) -> np.ndarray:
+        if isinstance(text, str):
+            return self._encode(text)
+        return np.stack([self._encode(item) for item in text])
@@ -16,6 +16,7 @@ load_dotenv()
 import logging
 from pathlib import Path
 from src.kg_gen import Graph
+from src.kg_gen.utils.cluster_mapping import ClusterMapping
 import dspy
 from concurrent.futures import ThreadPoolExecutor
 import faiss
@@ -383,31 +384,9 @@ class KGAssistedRAG:
         print("Finished processing all clusters")
         
         # Update relations based on clusters
-        relations: set[tuple[str, str, str]] = set()
-        
-        for s, p, o in self.kg.get("relations"):
-            # Look up subject in entity clusters
-            if s not in entities:
-                for rep, cluster in entity_clusters.items():
-                    if s in cluster:
-                        s = rep
-                        break
-                
-            # Look up predicate in edge clusters
-            if p not in edges:
-                for rep, cluster in edge_clusters.items():
-                    if p in cluster:
-                        p = rep
-                        break
-                
-            # Look up object in entity clusters
-            if o not in entities:
-                for rep, cluster in entity_clusters.items():
-                    if o in cluster:
-                        o = rep
-                        break
-                
-            relations.add((s, p, o))
+        relations = ClusterMapping.flat(entity_clusters).remap_relations(
+            map(tuple, self.kg.get("relations")), ClusterMapping.flat(edge_clusters)
+        )
             
         # Create new Graph instance with deduplicated data
         deduped_kg = Graph(
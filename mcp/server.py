@@ -7,6 +7,9 @@ You can specify configuration via environment variables:
 - KG_API_KEY (optional, can also use OPENAI_API_KEY)
 - KG_STORAGE_PATH (default: "./kg_memory.json")
 - KG_CLEAR_MEMORY (default: "false", set to "true" to clear memory on startup)
+- KG_REQUESTS_PER_MINUTE (optional, client-side request budget for model calls)
+- KG_TOKENS_PER_MINUTE (optional, client-side token budget for model calls)
+- KG_ADAPTIVE_CONCURRENCY (default: "false", set to "true" to back off on rate-limit errors)
 
 CLI Examples:
 - kggen mcp (clears memory by default, uses ./kg_memory.json relative to current directory)
@@ -47,6 +50,9 @@ def initialize_kg_gen():
     api_key = os.environ.get("KG_API_KEY") or os.environ.get("OPENAI_API_KEY")
     storage_path = os.environ.get("KG_STORAGE_PATH", "./kg_memory.json")
     clear_memory = os.environ.get("KG_CLEAR_MEMORY", "false").lower() == "true"
+    requests_per_minute = os.environ.get("KG_REQUESTS_PER_MINUTE")
+    tokens_per_minute = os.environ.get("KG_TOKENS_PER_MINUTE")
+    adaptive_concurrency = os.environ.get("KG_ADAPTIVE_CONCURRENCY", "false").lower() == "true"
     
     # Ensure storage path is absolute for consistent behavior
     if not os.path.isabs(storage_path):
@@ -67,7 +73,10 @@ def initialize_kg_gen():
     kg_gen_instance = KGGen(
         model=model,
         temperature=0.0,
-        api_key=api_key
+        api_key=api_key,
+        requests_per_minute=int(requests_per_minute) if requests_per_minute else None,
+        tokens_per_minute=int(tokens_per_minute) if tokens_per_minute else None,
+        adaptive_concurrency=adaptive_concurrency
     )
     
     # Load existing memory graph if it exists
@@ -76,7 +76,10 @@ class TestInitializeKGGen:
         mock_kg_gen.assert_called_once_with(
             model='test-model',
             temperature=0.0,
-            api_key='test-key'
+            api_key='test-key',
+            requests_per_minute=None,
+            tokens_per_minute=None,
+            adaptive_concurrency=False
         )
         
         # Verify load_memory_graph was called
@@ -98,12 +101,35 @@ class TestInitializeKGGen:
         mock_kg_gen.assert_called_once_with(
             model='openai/gpt-4o',
             temperature=0.0,
-            api_key=None
+            api_key=None,
+            requests_per_minute=None,
+            tokens_per_minute=None,
+            adaptive_concurrency=False
         )
         
         mock_load.assert_called_once()
         assert result == mock_instance
 
+    @patch.dict(os.environ, {
+        'KG_REQUESTS_PER_MINUTE': '60',
+        'KG_TOKENS_PER_MINUTE': '90000',
+        'KG_ADAPTIVE_CONCURRENCY': 'true'
+    }, clear=True)
+    @patch('server.KGGen')
+    @patch('server.load_memory_graph')
+    def test_initialize_with_rate_limits(self, mock_load, mock_kg_gen):
+        """Test that rate limit environment variables reach KGGen."""
+        initialize_kg_gen()
+        
+        mock_kg_gen.assert_called_once_with(
+            model='openai/gpt-4o',
+            temperature=0.0,
+            api_key=None,
+            requests_per_minute=60,
+            tokens_per_minute=90000,
+            adaptive_concurrency=True
+        )
+
 
 class TestLoadMemoryGraph:
     """Test the load_memory_graph function."""
@@ -287,7 +313,10 @@ class TestEnvironmentHandling:
                     mock_kg_gen.assert_called_once_with(
                         model='test-model',
                         temperature=0.0,
-                        api_key='openai-key'
+                        api_key='openai-key',
+                        requests_per_minute=None,
+                        tokens_per_minute=None,
+                        adaptive_concurrency=False
                     )
     
     def test_kg_api_key_priority(self):
@@ -307,5 +336,8 @@ class TestEnvironmentHandling:
                     mock_kg_gen.assert_called_once_with(
                         model='test-model',
                         temperature=0.0,
-                        api_key='kg-key'
+                        api_key='kg-key',
+                        requests_per_minute=None,
+                        tokens_per_minute=None,
+                        adaptive_concurrency=False
                     )
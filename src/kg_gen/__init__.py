@@ -1,2 +1,3 @@
 from .kg_gen import KGGen 
-from .models import Graph
\ No newline at end of file
+from .conversation import ConversationExtractor
+from .models import ChunkUpdate, Graph
\ No newline at end of file
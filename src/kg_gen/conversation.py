@@ -0,0 +1,148 @@
+"""Incremental extraction for conversations that grow one turn at a time."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import dspy
+
+from .models import Graph
+from .steps._1_get_entities import aget_entities, get_entities
+from .steps._2_get_relations import aget_relations, get_relations
+from .utils.metrics import track_call
+
+if TYPE_CHECKING:
+    from .kg_gen import KGGen
+
+
+class ConversationExtractor:
+    """Keeps the graph of a growing conversation up to date.
+
+    `generate` on a message list re-extracts the whole conversation, so calling
+    it after every turn costs quadratically in the conversation length. Each
+    `update` here extracts only the messages added since the previous call,
+    preceded by the last `overlap` processed messages for context, and merges
+    the new triples into `graph` in place. The most recently mentioned entities
+    are passed to the entity step so later mentions reuse their names.
+
+    Args:
+        kg: KGGen whose model, cache and callbacks are used
+        graph: Graph of messages already processed, to continue from
+        processed: Number of messages `graph` was extracted from
+        overlap: Processed messages repeated before the new ones
+        max_known_entities: Cap on the known entities passed forward
+    """
+
+    def __init__(
+        self,
+        kg: KGGen,
+        graph: Optional[Graph] = None,
+        processed: int = 0,
+        overlap: int = 2,
+        max_known_entities: int = 200,
+    ):
+        if overlap < 0:
+            raise ValueError("overlap must be non-negative")
+        if max_known_entities < 0:
+            raise ValueError("max_known_entities must be non-negative")
+        self.kg = kg
+        self.graph = graph or Graph(entities=set(), relations=set(), edges=set())
+        self.processed = processed
+        self.overlap = overlap
+        self.max_known_entities = max_known_entities
+        # Entities in order of their last mention, most recent last.
+        self._recent: dict[str, None] = dict.fromkeys(sorted(self.graph.entities))
+
+    def known_entities(self) -> list[str]:
+        if not self.max_known_entities:
+            return []
+        return list(self._recent)[-self.max_known_entities :]
+
+    def _window(self, messages: List[Dict]) -> Optional[str]:
+        """Text of the new messages and their overlap, or None if nothing is new."""
+        if len(messages) < self.processed:
+            raise ValueError(
+                f"Expected the conversation to extend the {self.processed} "
+                f"messages already processed, got {len(messages)}"
+            )
+        if len(messages) == self.processed:
+            return None
+        start = max(0, self.processed - self.overlap)
+        text, _ = self.kg._prepare_input(list(messages[start:]))
+        return text or None
+
+    @contextmanager
+    def _step(self, stage: str):
+        with dspy.context(lm=self.kg.lm), track_call(self.kg.callbacks, stage):
+            yield
+
+    def _merge(self, messages: List[Dict], entities, relations) -> Graph:
+        for entity in entities:
+            self._recent.pop(entity, None)
+            self._recent[entity] = None
+        self.graph.entities.update(entities)
+        self.graph.relations.update(relations)
+        self.graph.edges.update(relation[1] for relation in relations)
+        self.processed = len(messages)
+        return self.graph
+
+    def update(self, messages: List[Dict]) -> Graph:
+        """Extract the messages added since the last update and return the
+        updated graph.
+
+        Args:
+            messages: The whole conversation so far, as message dicts; it must
+                start with the messages already processed
+        """
+        text = self._window(messages)
+        if text is None:
+            self.processed = len(messages)
+            return self.graph
+
+        lms = self.kg._routed_lms()
+        with self._step("entities"):
+            entities = get_entities(
+                text,
+                is_conversation=True,
+                cache=self.kg.cache,
+                lms=lms,
+                known_entities=self.known_entities(),
+            )
+        with self._step("relations"):
+            relations = get_relations(
+                text,
+                entities,
+                is_conversation=True,
+                cache=self.kg.cache,
+                repair=self.kg.relation_repair,
+                lms=lms,
+            )
+        return self._merge(messages, entities, relations)
+
+    async def aupdate(self, messages: List[Dict]) -> Graph:
+        """Async counterpart of `update`."""
+        text = self._window(messages)
+        if text is None:
+            self.processed = len(messages)
+            return self.graph
+
+        lms = self.kg._routed_lms()
+        with self._step("entities"):
+            entities = await aget_entities(
+                text,
+                is_conversation=True,
+                cache=self.kg.cache,
+                lms=lms,
+                known_entities=self.known_entities(),
+            )
+        with self._step("relations"):
+            relations = await aget_relations(
+                text,
+                entities,
+                is_conversation=True,
+                cache=self.kg.cache,
+                repair=self.kg.relation_repair,
+                lms=lms,
+            )
+        return self._merge(messages, entities, relations)
@@ -1,19 +1,73 @@
-from typing import Union, List, Dict, Optional
+from __future__ import annotations
 
-from .steps._1_get_entities import get_entities
-from .steps._2_get_relations import get_relations
+from typing import (
+    TYPE_CHECKING,
+    Iterable,
+    Iterator,
+    Union,
+    List,
+    Dict,
+    Literal,
+    Optional,
+)
+
+from .steps._1_get_entities import (
+    ConversationEntities,
+    TextEntities,
+    get_entities,
+    aget_entities,
+)
+from .steps._2_get_relations import (
+    _relation_model,
+    extraction_sig,
+    get_relations,
+    aget_relations,
+    get_entities_and_relations,
+    aget_entities_and_relations,
+    fix_joint_relations,
+    joint_extraction_sig,
+)
 from .steps._3_cluster_graph import cluster_graph
-from .utils.chunk_text import chunk_text
-from .utils.visualize_kg import visualize as visualize_kg
-from .models import Graph
+from .utils.batch import BatchFolder, format_messages, parse_content, request_body
+from .utils.blocking import Blocker
+from .utils.cassette import (
+    Cassette,
+    CassetteMode,
+    RecordingLM,
+    ReplayLatency,
+    ReplayLM,
+)
+from .utils.checkpoint import ChunkCheckpoint
+from .utils.chunk_text import TextSource, Tokenizer, iter_chunks
+from .utils.cluster_mapping import ClusterMapping
+from .utils.hedging import Hedger
+from .utils.llm_cache import ExtractionCache
+from .utils.metrics import MetricsCallback, track_call
+from .utils.normalize import Normalizer
+from .utils.predictors import STAGES
+from .utils.rate_limit import RateLimiter
+from .utils.relation_repair import RelationRepairer
+from .models import ChunkUpdate, Graph
+import asyncio
+import copy
 import dspy
 import json
 import os
-from concurrent.futures import ThreadPoolExecutor
-import networkx as nx
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    FIRST_EXCEPTION,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from itertools import chain, islice, zip_longest
+
+# Retrieval and visualization dependencies are heavy to import; they are loaded
+# on first use so `import kg_gen` stays fast for extraction-only callers.
+if TYPE_CHECKING:
+    import networkx as nx
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
 
 # Configure dspy logging to only show errors
 import logging
@@ -21,6 +75,25 @@ import logging
 dspy_logger = logging.getLogger("dspy")
 dspy_logger.setLevel(logging.CRITICAL)
 
+ExtractionMode = Literal["two_step", "joint"]
+# Stages whose LMs determine a chunk's extraction result.
+EXTRACTION_STAGES = ("entities", "relations", "fix_relations", "joint")
+BatchMode = Literal["export", "ingest"]
+# The LM and the per-stage LMs (None when every stage uses the LM).
+Models = tuple[dspy.BaseLM, Optional[dict[str, dspy.BaseLM]]]
+
+_EMPTY = object()
+
+
+def _round_robin(queues: list[list]) -> list:
+    """Interleave queues one item at a time so no queue can starve the others."""
+    return [
+        item
+        for batch in zip_longest(*queues, fillvalue=_EMPTY)
+        for item in batch
+        if item is not _EMPTY
+    ]
+
 
 class KGGen:
     def __init__(
@@ -32,6 +105,24 @@ class KGGen:
         api_key: str = None,
         api_base: str = None,
         retrieval_model: Optional[str] = None,
+        max_concurrency: int = 16,
+        cache_path: Optional[str] = None,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        adaptive_concurrency: bool = False,
+        repair_threshold: float = 0.85,
+        tokenizer: Optional[Tokenizer] = None,
+        callbacks: Optional[list[MetricsCallback]] = None,
+        stage_models: Optional[dict[str, Union[str, dict, dspy.BaseLM]]] = None,
+        hedge_percentile: Optional[float] = None,
+        max_hedge_ratio: float = 0.1,
+        cassette_path: Optional[str] = None,
+        cassette_mode: CassetteMode = "replay",
+        replay_latency: ReplayLatency = None,
+        cluster_block_size: Optional[int] = None,
+        cluster_block_threshold: float = 0.75,
+        cluster_window: Optional[int] = None,
+        cluster_normalize: Union[bool, Normalizer] = False,
     ):
         """Initialize KGGen with optional model configuration
 
@@ -40,6 +131,60 @@ class KGGen:
             temperature: Temperature for model sampling
             api_key: API key for model access
             api_base: Specify the base URL endpoint for making API calls to a language model service
+            max_concurrency: Maximum number of chunks extracted concurrently
+            cache_path: SQLite file for caching entity/relation extraction results
+                across runs. Disabled when None.
+            requests_per_minute: Client-side request budget for LM calls to
+                each model and endpoint
+            tokens_per_minute: Client-side token budget for LM calls to each
+                model and endpoint
+            adaptive_concurrency: Back off in-flight LM calls on rate-limit errors
+                and ramp back up (up to max_concurrency) while latency is healthy
+            repair_threshold: Minimum similarity (0-1) for snapping a relation's
+                subject/object onto an extracted entity without an LLM call
+            tokenizer: Tokenizer for `chunk_size_tokens`: a tiktoken encoding or
+                model name, a Hugging Face tokenizer name, an object with
+                `encode`, or a callable returning a token count. Defaults to
+                tiktoken's o200k_base (~4 characters per token without tiktoken)
+            callbacks: `MetricsCallback`s notified as each extraction or
+                clustering step starts and ends, with its stage, chunk index,
+                latency and token usage (see `utils.metrics.MetricsCollector`)
+            stage_models: LMs for individual stages, keyed by stage name
+                ("entities", "relations", "fix_relations", "joint",
+                "extract_cluster", "validate_cluster", "choose_representative",
+                "check_existing_clusters"). A value is a model name, a dict of
+                dspy.LM arguments overriding the main model's (e.g. `model` and
+                `api_base` for a local endpoint) or a dspy LM. Other stages use
+                the main model. A dspy LM is used as given, apart from cassette
+                recording and replay; it is not rate limited or hedged
+            hedge_percentile: Send a duplicate of any LM request that runs past
+                this percentile (0-1) of recent request latencies and use
+                whichever answer arrives first. Disabled when None
+            max_hedge_ratio: Cap on duplicate requests as a fraction of all
+                requests when hedging
+            cassette_path: JSONL file of LM requests and responses. With
+                cassette_mode "record" every LM call is appended to it; with
+                "replay" LM calls are answered from it without a provider
+            cassette_mode: "record" or "replay"
+            replay_latency: Simulated latency when replaying: None for none,
+                "recorded" for each response's recorded latency, seconds, or a
+                callable returning seconds
+            cluster_block_size: Cluster within blocks of at most this many
+                similar items, found by nearest-neighbor search over
+                embeddings from `retrieval_model`, instead of over all items
+                at once. Blocks are clustered concurrently, up to
+                max_concurrency. Disabled when None
+            cluster_block_threshold: Minimum cosine similarity for two items
+                to share a block
+            cluster_window: Cluster at most this many items per prompt,
+                numbered by ID, so prompts stay the same size however large
+                the graph. Items are sorted and windowed; when blocking, each
+                block is windowed. Disabled when None
+            cluster_normalize: Merge case, Unicode, punctuation and inflection
+                variants before clustering, so the LM only sees one of each.
+                True uses a default Normalizer; counts of merged items and an
+                estimate of the LM calls avoided are left in
+                `normalization_stats`
         """
         self.model = model
         self.reasoning_effort = reasoning_effort
@@ -49,6 +194,53 @@ class KGGen:
         self.api_base = api_base
         self.retrieval_model: Optional[SentenceTransformer] = None
         self.lm = None
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.cache: Optional[ExtractionCache] = (
+            ExtractionCache(cache_path) if cache_path else None
+        )
+        self.relation_repair = RelationRepairer(threshold=repair_threshold)
+        self.tokenizer = tokenizer
+        # The *_stats attributes hold the counts of the last call to finish.
+        # Each call builds its own and sets them whole, so calls running
+        # concurrently on one instance don't mix counts, but only one is kept.
+        self.incremental_stats: Optional[dict[str, int]] = None
+        self.batch_stats: Optional[dict[str, int]] = None
+        self.callbacks: list[MetricsCallback] = list(callbacks or [])
+        self.validate_stage_models(stage_models)
+        self.stage_models = dict(stage_models or {})
+        self.stage_lms: dict[str, dspy.BaseLM] = {}
+        self._rate_limit = (
+            dict(
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                max_concurrency=max_concurrency,
+                adaptive=adaptive_concurrency,
+            )
+            if requests_per_minute or tokens_per_minute or adaptive_concurrency
+            else None
+        )
+        # Budget for the main model; stages on another model or endpoint get
+        # their own in `stage_rate_limiters`, keyed by (model, api_base).
+        self.rate_limiter: Optional[RateLimiter] = (
+            RateLimiter(**self._rate_limit) if self._rate_limit else None
+        )
+        self.stage_rate_limiters: dict[tuple[str, Optional[str]], RateLimiter] = {}
+        self.cassette: Optional[Cassette] = (
+            Cassette(cassette_path, cassette_mode) if cassette_path else None
+        )
+        self.replay_latency = replay_latency
+        self.cluster_block_size = cluster_block_size
+        self.cluster_block_threshold = cluster_block_threshold
+        self.cluster_window = cluster_window
+        self.cluster_normalize = cluster_normalize
+        self.normalization_stats: Optional[dict[str, dict[str, int]]] = None
+        self.hedger: Optional[Hedger] = (
+            Hedger(percentile=hedge_percentile, max_hedge_ratio=max_hedge_ratio)
+            if hedge_percentile is not None
+            else None
+        )
 
         self.init_model(
             model=model,
@@ -74,6 +266,42 @@ class KGGen:
         if "gpt-5" in self.model and max_tokens < 16000:
             raise ValueError("Max tokens must be 16000 for gpt-5 family models")
 
+    @staticmethod
+    def validate_extraction_mode(extraction_mode: str):
+        if extraction_mode not in ("two_step", "joint"):
+            raise ValueError(
+                f"Unknown extraction_mode '{extraction_mode}', expected 'two_step' or 'joint'"
+            )
+
+    @staticmethod
+    def validate_stage_models(stage_models: Optional[dict]):
+        unknown = set(stage_models or {}) - set(STAGES)
+        if unknown:
+            raise ValueError(
+                f"Unknown stages in stage_models: {sorted(unknown)}. "
+                f"Valid stages: {', '.join(STAGES)}"
+            )
+
+    @staticmethod
+    def validate_resume(resume: bool, output_folder: Optional[str]):
+        if resume and not output_folder:
+            raise ValueError(
+                "resume and incremental require an output_folder holding chunk results"
+            )
+
+    @staticmethod
+    def validate_batch(
+        batch: Optional[BatchMode], batch_folder: Optional[str], resume: bool
+    ):
+        if batch is None:
+            return
+        if batch not in ("export", "ingest"):
+            raise ValueError("batch must be 'export' or 'ingest'")
+        if not batch_folder:
+            raise ValueError("batch mode requires a batch_folder")
+        if resume:
+            raise ValueError("batch mode cannot be combined with resume or incremental")
+
     def init_model(
         self,
         model: str = None,
@@ -111,6 +339,8 @@ class KGGen:
         if reasoning_effort is not None:
             self.reasoning_effort = reasoning_effort
         if retrieval_model is not None:
+            from sentence_transformers import SentenceTransformer
+
             self.retrieval_model = SentenceTransformer(retrieval_model)
 
         self.validate_temperature(self.temperature)
@@ -118,23 +348,101 @@ class KGGen:
         self.validate_max_tokens(self.max_tokens)
 
         # Initialize dspy LM with current settings
+        lm_kwargs = dict(
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            api_base=self.api_base,
+            reasoning_effort=self.reasoning_effort,
+        )
         if self.api_key:
-            self.lm = dspy.LM(
-                model=self.model,
-                api_key=self.api_key,
-                reasoning_effort=self.reasoning_effort,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                api_base=self.api_base,
-            )
-        else:
-            self.lm = dspy.LM(
-                model=self.model,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                api_base=self.api_base,
-                reasoning_effort=self.reasoning_effort,
+            lm_kwargs["api_key"] = self.api_key
+        self.lm = self._build_lm(**lm_kwargs)
+        self.stage_lms = {
+            stage: self._build_stage_lm(spec, lm_kwargs)
+            for stage, spec in self.stage_models.items()
+        }
+
+    def _build_lm(
+        self, provider_lm: Optional[dspy.BaseLM] = None, **lm_kwargs
+    ) -> dspy.BaseLM:
+        """The LM for `lm_kwargs`, or `provider_lm` if given, recorded to or
+        replayed from the cassette if there is one."""
+        if self.cassette is not None and self.cassette.mode == "replay":
+            # Built only for its model name and normalized arguments, which
+            # requests are replayed under; it is never called.
+            lm = provider_lm or dspy.LM(**lm_kwargs)
+            return ReplayLM(
+                self.cassette, self.replay_latency, model=lm.model, **lm.kwargs
             )
+        lm = provider_lm or self._build_provider_lm(**lm_kwargs)
+        if self.cassette is not None:
+            return RecordingLM(lm, self.cassette)
+        return lm
+
+    def _build_provider_lm(self, **lm_kwargs) -> dspy.LM:
+        rate_limiter = self._rate_limiter_for(lm_kwargs)
+        if self.hedger is not None:
+            from .utils.hedging import HedgedLM
+
+            return HedgedLM(hedger=self.hedger, rate_limiter=rate_limiter, **lm_kwargs)
+        if rate_limiter is not None:
+            from .utils.rate_limit import RateLimitedLM
+
+            return RateLimitedLM(rate_limiter=rate_limiter, **lm_kwargs)
+        return dspy.LM(**lm_kwargs)
+
+    def _rate_limiter_for(self, lm_kwargs: dict) -> Optional[RateLimiter]:
+        """`rate_limiter` for the main model and endpoint, else a limiter with
+        the same settings shared by the stages on that model and endpoint."""
+        if self._rate_limit is None:
+            return None
+        key = (lm_kwargs["model"], lm_kwargs.get("api_base"))
+        if key == (self.model, self.api_base):
+            return self.rate_limiter
+        if key not in self.stage_rate_limiters:
+            self.stage_rate_limiters[key] = RateLimiter(**self._rate_limit)
+        return self.stage_rate_limiters[key]
+
+    def _build_stage_lm(
+        self, spec: Union[str, dict, dspy.BaseLM], lm_kwargs: dict
+    ) -> dspy.BaseLM:
+        if isinstance(spec, dspy.BaseLM):
+            return self._build_lm(provider_lm=spec)
+        if isinstance(spec, str):
+            spec = {"model": spec}
+        return self._build_lm(**{**lm_kwargs, **spec})
+
+    def _routed_lms(self) -> Optional[dict[str, dspy.BaseLM]]:
+        """LM for every stage, or None when all stages use `self.lm`."""
+        if not self.stage_lms:
+            return None
+        return {stage: self.stage_lms.get(stage, self.lm) for stage in STAGES}
+
+    def _models(self) -> Models:
+        """The current LM and per-stage LMs.
+
+        Generation reads them once and hands them to every chunk, so a call's
+        chunks keep its models even if `init_model` runs before they start.
+        """
+        return self.lm, self._routed_lms()
+
+    @staticmethod
+    def _checkpoint_settings(models: Models, context: str = "") -> dict:
+        """What a checkpointed chunk result depends on besides the chunk: the
+        model and temperature of each extraction stage's LM, and the context."""
+        lm, lms = models
+        stage_lms = {stage: (lms or {}).get(stage, lm) for stage in EXTRACTION_STAGES}
+        return {
+            "models": {
+                stage: [
+                    getattr(stage_lm, "model", None),
+                    getattr(stage_lm, "kwargs", {}).get("temperature"),
+                ]
+                for stage, stage_lm in stage_lms.items()
+            },
+            "context": context,
+        }
 
     @staticmethod
     def from_file(file_path: str) -> Graph:
@@ -146,6 +454,78 @@ class KGGen:
     def from_dict(graph_dict: dict) -> Graph:
         return Graph(**graph_dict)
 
+    @staticmethod
+    def _prepare_input(input_data: Union[str, List[Dict]]) -> tuple[str, bool]:
+        """Flatten a messages list into text; returns (text, is_conversation)."""
+        is_conversation = isinstance(input_data, list)
+        if not is_conversation:
+            return input_data, False
+
+        # Extract text from messages
+        text_content = []
+        for message in input_data:
+            if (
+                not isinstance(message, dict)
+                or "role" not in message
+                or "content" not in message
+            ):
+                raise ValueError(
+                    "Messages must be dicts with 'role' and 'content' keys"
+                )
+            if message["role"] in ["user", "assistant"]:
+                text_content.append(f"{message['role']}: {message['content']}")
+
+        # Join with newlines to preserve message boundaries
+        return "\n".join(text_content), True
+
+    def _update_model(
+        self,
+        model: str = None,
+        temperature: float = None,
+        api_key: str = None,
+        api_base: str = None,
+    ):
+        # Reinitialize dspy with new parameters if any are provided
+        if any([model, temperature, api_key, api_base]):
+            self.init_model(
+                model=model or self.model,
+                temperature=temperature or self.temperature,
+                api_key=api_key or self.api_key,
+                api_base=api_base or self.api_base,
+            )
+
+    def _chunk(
+        self,
+        text: Union[str, TextSource],
+        chunk_size: Optional[int] = None,
+        chunk_size_tokens: Optional[int] = None,
+        content_defined: bool = False,
+    ) -> Iterator[str]:
+        if chunk_size and chunk_size_tokens:
+            raise ValueError("Pass either chunk_size or chunk_size_tokens, not both")
+        if chunk_size_tokens:
+            return iter_chunks(
+                text,
+                chunk_size_tokens=chunk_size_tokens,
+                tokenizer=self.tokenizer,
+                content_defined=content_defined,
+            )
+        if chunk_size:
+            return iter_chunks(text, chunk_size, content_defined=content_defined)
+        if not isinstance(text, str):
+            raise ValueError(
+                "Streamed input needs chunk_size or chunk_size_tokens to be chunked"
+            )
+        return iter([text])
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Per-instance semaphore bounding in-flight chunks, rebuilt per event loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
     def generate(
         self,
         input_data: Union[str, List[Dict]],
@@ -157,83 +537,198 @@ class KGGen:
         cluster: bool = False,
         temperature: float = None,
         output_folder: Optional[str] = None,
+        extraction_mode: ExtractionMode = "two_step",
+        resume: bool = False,
+        chunk_size_tokens: Optional[int] = None,
+        incremental: bool = False,
+        batch: Optional[BatchMode] = None,
+        batch_folder: Optional[str] = None,
     ) -> Graph:
         """Generate a knowledge graph from input text or messages.
 
         Args:
-            input_data: Text string or list of message dicts
+            input_data: Text string or list of message dicts. Large inputs can be
+                streamed as a `pathlib.Path` (memory-mapped), a file object or
+                an iterator of text pieces; they are chunked lazily and need
+                chunk_size or chunk_size_tokens. A `str` is always the text
+                itself, never a file name
             model: Name of OpenAI model to use
             api_key (str): OpenAI API key for making model calls
             chunk_size: Max size of text chunks in characters to process
+            chunk_size_tokens: Max size of text chunks in tokens (of the KGGen
+                tokenizer); sentences are packed up to this budget. Use instead
+                of chunk_size
             context: Description of data context
-            output_folder: Path to save partial progress
+            output_folder: Path to save partial progress. Each chunk's result is
+                appended to `chunks.jsonl` there as soon as it completes
+            extraction_mode: "two_step" extracts entities, then relations given
+                those entities; "joint" extracts both in a single call per chunk
+            resume: Reuse chunk results already in `output_folder` and only
+                extract the remaining chunks
+            incremental: Update the graph in `output_folder` after the input was
+                edited: only new or changed chunks are extracted, and results of
+                chunks no longer in the input are dropped from `chunks.jsonl`.
+                Chunk boundaries are content-defined so that an edit only
+                changes the chunks around it. Diff counts are left in
+                `incremental_stats`
+            batch: Extract through a provider batch API instead of synchronous
+                calls. "export" writes the first wave of requests to
+                `batch_folder`. "ingest" reads the responses saved there; in
+                two-step mode, the first ingest writes the relations wave and
+                returns a graph without relations, the second returns the full
+                graph. Every call needs the same input and chunking. Counts are
+                left in `batch_stats`
+            batch_folder: Folder for batch request and response files
 
         Returns:
             Graph: Generated knowledge graph
         """
 
-        # Process input data
-        is_conversation = isinstance(input_data, list)
-        if is_conversation:
-            # Extract text from messages
-            text_content = []
-            for message in input_data:
-                if (
-                    not isinstance(message, dict)
-                    or "role" not in message
-                    or "content" not in message
-                ):
-                    raise ValueError(
-                        "Messages must be dicts with 'role' and 'content' keys"
-                    )
-                if message["role"] in ["user", "assistant"]:
-                    text_content.append(f"{message['role']}: {message['content']}")
+        self.validate_extraction_mode(extraction_mode)
+        self.validate_resume(resume or incremental, output_folder)
+        self.validate_batch(batch, batch_folder, resume or incremental)
+        processed_input, is_conversation = self._prepare_input(input_data)
+        self._update_model(model, temperature, api_key, api_base)
+        models = self._models()
 
-            # Join with newlines to preserve message boundaries
-            processed_input = "\n".join(text_content)
-        else:
-            processed_input = input_data
-
-        # Reinitialize dspy with new parameters if any are provided
-        if any([model, temperature, api_key, api_base]):
-            self.init_model(
-                model=model or self.model,
-                temperature=temperature or self.temperature,
-                api_key=api_key or self.api_key,
-                api_base=api_base or self.api_base,
+        chunks = self._chunk(
+            processed_input, chunk_size, chunk_size_tokens, content_defined=incremental
+        )
+        entities = set()
+        relations = set()
+        if batch:
+            entities, relations, complete = self._batch_extract(
+                list(chunks),
+                is_conversation,
+                extraction_mode,
+                batch,
+                batch_folder,
+                models,
             )
-
-        if not chunk_size:
-            with dspy.context(lm=self.lm):
-                entities = get_entities(
-                    processed_input, is_conversation=is_conversation
+            if not complete:
+                return Graph(entities=entities, relations=set(), edges=set())
+        else:
+            checkpoint = (
+                ChunkCheckpoint(
+                    output_folder,
+                    resume or incremental,
+                    self._checkpoint_settings(models, context),
                 )
-                relations = get_relations(
-                    processed_input, entities, is_conversation=is_conversation
+                if output_folder
+                else None
+            )
+            try:
+                results = self._iter_chunk_results(
+                    chunks, is_conversation, extraction_mode, checkpoint, models
                 )
-        else:
-            chunks = chunk_text(processed_input, chunk_size)
-            entities = set()
-            relations = set()
+                for _, (chunk_entities, chunk_relations) in results:
+                    entities.update(chunk_entities)
+                    relations.update(chunk_relations)
+                if incremental:
+                    self.incremental_stats = checkpoint.compact()
+            finally:
+                if checkpoint:
+                    checkpoint.close()
 
-            def process_chunk(chunk, lm):
-                with dspy.context(lm=lm):
-                    chunk_entities = get_entities(chunk, is_conversation)
-                    chunk_relations = get_relations(
-                        chunk, chunk_entities, is_conversation=is_conversation
-                    )
-                    return chunk_entities, chunk_relations
+        graph = Graph(
+            entities=entities,
+            relations=relations,
+            edges={relation[1] for relation in relations},
+        )
 
-            # Process chunks in parallel using ThreadPoolExecutor
-            with ThreadPoolExecutor() as executor:
-                results = list(
-                    executor.map(process_chunk, chunks, [self.lm] * len(chunks))
-                )
+        if cluster:
+            graph = self._cluster(graph, context, models)
+
+        if output_folder:
+            self._save_graph(graph, output_folder, entities, relations)
+
+        return graph
+
+    async def agenerate(
+        self,
+        input_data: Union[str, List[Dict]],
+        model: str = None,
+        api_key: str = None,
+        api_base: str = None,
+        context: str = "",
+        chunk_size: Optional[int] = None,
+        cluster: bool = False,
+        temperature: float = None,
+        output_folder: Optional[str] = None,
+        extraction_mode: ExtractionMode = "two_step",
+        resume: bool = False,
+        chunk_size_tokens: Optional[int] = None,
+        incremental: bool = False,
+    ) -> Graph:
+        """Async counterpart of `generate`.
 
-            # Combine results
-            for chunk_entities, chunk_relations in results:
-                entities.update(chunk_entities)
-                relations.update(chunk_relations)
+        Chunks are extracted through dspy's async predictors on the running event
+        loop; at most `max_concurrency` chunks are in flight per KGGen instance,
+        across all concurrent `agenerate` calls.
+
+        Args:
+            input_data: Text string or list of message dicts
+            model: Name of OpenAI model to use
+            api_key (str): OpenAI API key for making model calls
+            chunk_size: Max size of text chunks in characters to process
+            chunk_size_tokens: Max size of text chunks in tokens (of the KGGen
+                tokenizer); sentences are packed up to this budget. Use instead
+                of chunk_size
+            context: Description of data context
+            output_folder: Path to save partial progress. Each chunk's result is
+                appended to `chunks.jsonl` there as soon as it completes
+            extraction_mode: "two_step" extracts entities, then relations given
+                those entities; "joint" extracts both in a single call per chunk
+            resume: Reuse chunk results already in `output_folder` and only
+                extract the remaining chunks
+            incremental: Update the graph in `output_folder` after the input was
+                edited: only new or changed chunks are extracted, and results of
+                chunks no longer in the input are dropped from `chunks.jsonl`.
+                Chunk boundaries are content-defined so that an edit only
+                changes the chunks around it. Diff counts are left in
+                `incremental_stats`
+
+        Returns:
+            Graph: Generated knowledge graph
+        """
+        self.validate_extraction_mode(extraction_mode)
+        self.validate_resume(resume or incremental, output_folder)
+        processed_input, is_conversation = self._prepare_input(input_data)
+        self._update_model(model, temperature, api_key, api_base)
+        models = self._models()
+
+        chunks = list(
+            self._chunk(
+                processed_input,
+                chunk_size,
+                chunk_size_tokens,
+                content_defined=incremental,
+            )
+        )
+        checkpoint = (
+            ChunkCheckpoint(
+                output_folder,
+                resume or incremental,
+                self._checkpoint_settings(models, context),
+            )
+            if output_folder
+            else None
+        )
+        try:
+            results = await self._aextract_chunks(
+                chunks, is_conversation, extraction_mode, checkpoint, models
+            )
+            if incremental:
+                self.incremental_stats = checkpoint.compact()
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+        entities = set()
+        relations = set()
+        for chunk_entities, chunk_relations in results:
+            entities.update(chunk_entities)
+            relations.update(chunk_relations)
 
         graph = Graph(
             entities=entities,
@@ -242,31 +737,624 @@ class KGGen:
         )
 
         if cluster:
-            graph = self.cluster(graph, context)
+            graph = await asyncio.to_thread(self._cluster, graph, context, models)
 
         if output_folder:
-            os.makedirs(output_folder, exist_ok=True)
-            output_path = os.path.join(output_folder, "graph.json")
-
-            graph_dict = {
-                "entities": list(entities),
-                "relations": list(relations),
-                "edges": list(graph.edges),
-                "entity_clusters": {
-                    k: list(v) for k, v in graph.entity_clusters.items()
-                }
-                if graph.entity_clusters
-                else None,
-                "edge_clusters": {k: list(v) for k, v in graph.edge_clusters.items()}
-                if graph.edge_clusters
-                else None,
-            }
-
-            with open(output_path, "w") as f:
-                json.dump(graph_dict, f, indent=2)
+            self._save_graph(graph, output_folder, entities, relations)
 
         return graph
 
+    def generate_stream(
+        self,
+        input_data: Union[str, List[Dict]],
+        model: str = None,
+        api_key: str = None,
+        api_base: str = None,
+        chunk_size: Optional[int] = None,
+        temperature: float = None,
+        output_folder: Optional[str] = None,
+        extraction_mode: ExtractionMode = "two_step",
+        resume: bool = False,
+        chunk_size_tokens: Optional[int] = None,
+    ) -> Iterator[ChunkUpdate]:
+        """Generate a knowledge graph, yielding each chunk's result as it completes.
+
+        Chunks are yielded in completion order, not input order, so the first
+        triples arrive as soon as any chunk finishes. `update.graph` is the
+        running merge of all chunks so far; it is updated in place, so take
+        `update.graph.model_copy(deep=True)` to keep a snapshot. Clustering
+        needs the whole graph: call `cluster` on the final `update.graph`.
+
+        Args:
+            input_data: Text string, list of message dicts, or streamed input
+                (see `generate`)
+            model: Name of OpenAI model to use
+            api_key (str): OpenAI API key for making model calls
+            chunk_size: Max size of text chunks in characters to process
+            chunk_size_tokens: Token budget per chunk, see `generate`
+            output_folder: Path to save partial progress, see `generate`
+            extraction_mode: "two_step" or "joint", see `generate`
+            resume: Yield checkpointed chunks from `output_folder` first and only
+                extract the remaining ones
+
+        Yields:
+            ChunkUpdate: chunk index, the chunk's entities and relations, and the
+                running graph
+        """
+        self.validate_extraction_mode(extraction_mode)
+        self.validate_resume(resume, output_folder)
+        processed_input, is_conversation = self._prepare_input(input_data)
+        self._update_model(model, temperature, api_key, api_base)
+        models = self._models()
+
+        chunks = self._chunk(processed_input, chunk_size, chunk_size_tokens)
+        graph = Graph(entities=set(), relations=set(), edges=set())
+
+        def update(index: int, chunk_entities, chunk_relations) -> ChunkUpdate:
+            graph.entities.update(chunk_entities)
+            graph.relations.update(chunk_relations)
+            graph.edges.update(relation[1] for relation in chunk_relations)
+            return ChunkUpdate(
+                chunk_index=index,
+                entities=list(chunk_entities),
+                relations=list(chunk_relations),
+                graph=graph,
+            )
+
+        checkpoint = (
+            ChunkCheckpoint(output_folder, resume, self._checkpoint_settings(models))
+            if output_folder
+            else None
+        )
+        results = self._iter_chunk_results(
+            chunks, is_conversation, extraction_mode, checkpoint, models
+        )
+        try:
+            for index, (chunk_entities, chunk_relations) in results:
+                yield update(index, chunk_entities, chunk_relations)
+        finally:
+            results.close()
+            if checkpoint:
+                checkpoint.close()
+
+        if output_folder:
+            self._save_graph(graph, output_folder, graph.entities, graph.relations)
+
+    def generate_many(
+        self,
+        documents: List[Union[str, List[Dict]]],
+        model: str = None,
+        api_key: str = None,
+        api_base: str = None,
+        context: str = "",
+        chunk_size: Optional[int] = None,
+        cluster: bool = False,
+        temperature: float = None,
+        extraction_mode: ExtractionMode = "two_step",
+        chunk_size_tokens: Optional[int] = None,
+    ) -> list[Graph]:
+        """Generate one knowledge graph per document with a single global scheduler.
+
+        The chunks of all documents go through one work queue capped at
+        `max_concurrency`, interleaved round-robin across documents so a long
+        document does not hold back the short ones.
+
+        Args:
+            documents: Text strings and/or message lists, one per graph
+            model: Name of OpenAI model to use
+            api_key (str): OpenAI API key for making model calls
+            chunk_size: Max size of text chunks in characters to process
+            chunk_size_tokens: Token budget per chunk, see `generate`
+            context: Description of data context
+            cluster: Whether to cluster each document's graph
+            extraction_mode: "two_step" or "joint", see `generate`
+
+        Returns:
+            list[Graph]: Generated knowledge graphs, in input order
+        """
+        self.validate_extraction_mode(extraction_mode)
+        self._update_model(model, temperature, api_key, api_base)
+        models = self._models()
+
+        queues = []
+        for doc_index, document in enumerate(documents):
+            processed_input, is_conversation = self._prepare_input(document)
+            chunks = list(self._chunk(processed_input, chunk_size, chunk_size_tokens))
+            queues.append(
+                [
+                    (doc_index, chunk_index, chunk, is_conversation)
+                    for chunk_index, chunk in enumerate(chunks)
+                ]
+            )
+        work = _round_robin(queues)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            futures = [
+                executor.submit(
+                    self._process_chunk,
+                    chunk,
+                    is_conversation,
+                    extraction_mode,
+                    chunk_index,
+                    models,
+                )
+                for _, chunk_index, chunk, is_conversation in work
+            ]
+            wait(futures, return_when=FIRST_EXCEPTION)
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+            results = [future.result() for future in futures]
+        finally:
+            # Don't keep extracting the other documents once a chunk has failed.
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        entities = [set() for _ in documents]
+        relations = [set() for _ in documents]
+        for (doc_index, *_), (chunk_entities, chunk_relations) in zip(work, results):
+            entities[doc_index].update(chunk_entities)
+            relations[doc_index].update(chunk_relations)
+
+        graphs = [
+            Graph(
+                entities=doc_entities,
+                relations=doc_relations,
+                edges={relation[1] for relation in doc_relations},
+            )
+            for doc_entities, doc_relations in zip(entities, relations)
+        ]
+
+        if cluster:
+            graphs = [self._cluster(graph, context, models) for graph in graphs]
+
+        return graphs
+
+    def _iter_chunk_results(
+        self,
+        chunks: Iterable[str],
+        is_conversation: bool,
+        extraction_mode: ExtractionMode,
+        checkpoint: Optional[ChunkCheckpoint] = None,
+        models: Optional[Models] = None,
+    ) -> Iterator[tuple[int, tuple]]:
+        """Extract chunks on the thread pool, yielding `(index, result)` as each completes.
+
+        Chunks are pulled lazily, with at most twice `max_concurrency` submitted
+        at a time, so streamed input is never materialized in full. Checkpointed
+        chunks are yielded without extraction and new results are recorded as
+        they complete. With a checkpoint, a failed chunk is raised only after
+        the remaining chunks finish, so a resume redoes as little as possible.
+        """
+        chunks = iter(chunks)
+        head = list(islice(chunks, 2))
+        if len(head) == 1 and checkpoint is None:
+            # A single chunk runs in the caller's thread (and dspy context).
+            yield (
+                0,
+                self._process_chunk(
+                    head[0], is_conversation, extraction_mode, 0, models
+                ),
+            )
+            return
+
+        def process(index: int, key: Optional[str], chunk: str):
+            result = self._process_chunk(
+                chunk, is_conversation, extraction_mode, index, models
+            )
+            if checkpoint:
+                checkpoint.record(key, *result)
+            return result
+
+        errors = []
+
+        def completed(futures) -> Iterator[tuple[int, tuple]]:
+            for future in futures:
+                index = pending.pop(future)
+                try:
+                    yield index, future.result()
+                except Exception as error:
+                    if checkpoint is None:
+                        raise
+                    errors.append(error)
+
+        window = 2 * self.max_concurrency
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            for index, chunk in enumerate(chain(head, chunks)):
+                key = None
+                if checkpoint:
+                    key = checkpoint.key(chunk, is_conversation, extraction_mode)
+                    if checkpoint.get(key) is not None:
+                        yield index, checkpoint.get(key)
+                        continue
+                pending[executor.submit(process, index, key, chunk)] = index
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from completed(done)
+            yield from completed(as_completed(list(pending)))
+        finally:
+            # Stop scheduling new chunks if the consumer stops early or a chunk fails.
+            executor.shutdown(wait=True, cancel_futures=True)
+        if errors:
+            raise errors[0]
+
+    async def _aextract_chunks(
+        self,
+        chunks: list[str],
+        is_conversation: bool,
+        extraction_mode: ExtractionMode,
+        checkpoint: Optional[ChunkCheckpoint] = None,
+        models: Optional[Models] = None,
+    ) -> list:
+        """Async counterpart of `_iter_chunk_results`, returning results in input order."""
+        if checkpoint is None:
+            return await asyncio.gather(
+                *(
+                    self._aprocess_chunk(
+                        chunk, is_conversation, extraction_mode, index, models
+                    )
+                    for index, chunk in enumerate(chunks)
+                )
+            )
+
+        keys = [
+            checkpoint.key(chunk, is_conversation, extraction_mode)
+            for chunk in chunks
+        ]
+        pending = {}
+        for index, (key, chunk) in enumerate(zip(keys, chunks)):
+            if checkpoint.get(key) is None:
+                pending.setdefault(key, (index, chunk))
+
+        async def process(key: str, index: int, chunk: str):
+            result = await self._aprocess_chunk(
+                chunk, is_conversation, extraction_mode, index, models
+            )
+            checkpoint.record(key, *result)
+
+        # Let every chunk finish and be recorded before raising the first failure.
+        outcomes = await asyncio.gather(
+            *(process(key, index, chunk) for key, (index, chunk) in pending.items()),
+            return_exceptions=True,
+        )
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            raise errors[0]
+        return [checkpoint.get(key) for key in keys]
+
+    def _process_chunk(
+        self,
+        chunk: str,
+        is_conversation: bool,
+        extraction_mode: ExtractionMode = "two_step",
+        index: Optional[int] = None,
+        models: Optional[Models] = None,
+    ):
+        lm, lms = models or self._models()
+        with dspy.context(lm=lm):
+            if extraction_mode == "joint":
+                with track_call(self.callbacks, "joint", index):
+                    return get_entities_and_relations(
+                        chunk,
+                        is_conversation=is_conversation,
+                        cache=self.cache,
+                        repair=self.relation_repair,
+                        lms=lms,
+                    )
+            with track_call(self.callbacks, "entities", index):
+                chunk_entities = get_entities(
+                    chunk, is_conversation=is_conversation, cache=self.cache, lms=lms
+                )
+            with track_call(self.callbacks, "relations", index):
+                chunk_relations = get_relations(
+                    chunk,
+                    chunk_entities,
+                    is_conversation=is_conversation,
+                    cache=self.cache,
+                    repair=self.relation_repair,
+                    lms=lms,
+                )
+            return chunk_entities, chunk_relations
+
+    async def _aprocess_chunk(
+        self,
+        chunk: str,
+        is_conversation: bool,
+        extraction_mode: ExtractionMode = "two_step",
+        index: Optional[int] = None,
+        models: Optional[Models] = None,
+    ):
+        lm, lms = models or self._models()
+        async with self._get_semaphore():
+            with dspy.context(lm=lm):
+                if extraction_mode == "joint":
+                    with track_call(self.callbacks, "joint", index):
+                        return await aget_entities_and_relations(
+                            chunk,
+                            is_conversation=is_conversation,
+                            cache=self.cache,
+                            repair=self.relation_repair,
+                            lms=lms,
+                        )
+                with track_call(self.callbacks, "entities", index):
+                    chunk_entities = await aget_entities(
+                        chunk,
+                        is_conversation=is_conversation,
+                        cache=self.cache,
+                        lms=lms,
+                    )
+                with track_call(self.callbacks, "relations", index):
+                    chunk_relations = await aget_relations(
+                        chunk,
+                        chunk_entities,
+                        is_conversation=is_conversation,
+                        cache=self.cache,
+                        repair=self.relation_repair,
+                        lms=lms,
+                    )
+                return chunk_entities, chunk_relations
+
+    @staticmethod
+    def _wave_signature(wave: str, is_conversation: bool) -> type[dspy.Signature]:
+        if wave == "entities":
+            return ConversationEntities if is_conversation else TextEntities
+        if wave == "relations":
+            return extraction_sig(_relation_model(), is_conversation)
+        return joint_extraction_sig(_relation_model(), is_conversation)
+
+    @staticmethod
+    def _wave_result(wave: str, parsed: dict):
+        if wave == "entities":
+            return parsed["entities"]
+        if wave == "relations":
+            return [(r.subject, r.predicate, r.object) for r in parsed["relations"]]
+        # Joint relations are repaired against the entities by the caller.
+        return parsed["entities"], parsed["relations"]
+
+    def _export_wave(
+        self,
+        folder: BatchFolder,
+        wave: str,
+        chunks: list[str],
+        ids: list[str],
+        is_conversation: bool,
+        chunk_entities: Optional[list[list[str]]] = None,
+        models: Optional[Models] = None,
+    ) -> int:
+        signature = self._wave_signature(wave, is_conversation)
+        lm, lms = models or self._models()
+        lm = (lms or {}).get(wave, lm)
+
+        def requests():
+            for index, (custom_id, chunk) in enumerate(zip(ids, chunks)):
+                inputs = {"source_text": chunk}
+                if chunk_entities is not None:
+                    inputs["entities"] = chunk_entities[index]
+                messages = format_messages(signature, inputs)
+                yield custom_id, request_body(lm, messages)
+
+        return folder.write_requests(wave, requests())
+
+    def _ingest_wave(
+        self,
+        folder: BatchFolder,
+        wave: str,
+        chunks: list[str],
+        ids: list[str],
+        is_conversation: bool,
+        chunk_entities: Optional[list[list[str]]] = None,
+        models: Optional[Models] = None,
+        stats: Optional[dict[str, int]] = None,
+    ) -> list:
+        """Parse a wave's responses in chunk order. Requests that failed or
+        whose response can't be parsed are retried as synchronous calls.
+        Both are counted in `stats`."""
+        if stats is None:
+            stats = {"ingested": 0, "fallback": 0}
+        responses = folder.read_responses(wave)
+        if not any(custom_id in responses for custom_id in ids):
+            raise ValueError(
+                f"Responses in {folder.responses_path(wave)} do not match this "
+                "input; ingest needs the input and chunking used for the export"
+            )
+        signature = self._wave_signature(wave, is_conversation)
+        lm, lms = models or self._models()
+        results = []
+        for index, (custom_id, chunk) in enumerate(zip(ids, chunks)):
+            entities = chunk_entities[index] if chunk_entities is not None else None
+            try:
+                parsed = parse_content(signature, responses[custom_id])
+                result = self._wave_result(wave, parsed)
+            except Exception:
+                results.append(
+                    self._batch_fallback(wave, chunk, is_conversation, entities, models)
+                )
+                stats["fallback"] += 1
+                continue
+            if wave == "joint":
+                # As in synchronous joint extraction, snap the triples onto
+                # the entities and send only the residue to the fix call.
+                entities, relations = result
+                with dspy.context(lm=lm):
+                    relations = fix_joint_relations(
+                        chunk, relations, entities, self.relation_repair, lms
+                    )
+                result = entities, relations
+            results.append(result)
+            stats["ingested"] += 1
+        return results
+
+    def _batch_fallback(
+        self,
+        wave: str,
+        chunk: str,
+        is_conversation: bool,
+        entities: Optional[list[str]] = None,
+        models: Optional[Models] = None,
+    ):
+        lm, lms = models or self._models()
+        with dspy.context(lm=lm):
+            if wave == "entities":
+                return get_entities(
+                    chunk, is_conversation=is_conversation, cache=self.cache, lms=lms
+                )
+            if wave == "relations":
+                return get_relations(
+                    chunk,
+                    entities,
+                    is_conversation=is_conversation,
+                    cache=self.cache,
+                    repair=self.relation_repair,
+                    lms=lms,
+                )
+            return get_entities_and_relations(
+                chunk,
+                is_conversation=is_conversation,
+                cache=self.cache,
+                repair=self.relation_repair,
+                lms=lms,
+            )
+
+    def _batch_extract(
+        self,
+        chunks: list[str],
+        is_conversation: bool,
+        extraction_mode: ExtractionMode,
+        batch: BatchMode,
+        batch_folder: str,
+        models: Optional[Models] = None,
+    ) -> tuple[set, set, bool]:
+        """Run the next step of a batch extraction.
+
+        Returns the entities and relations gathered so far and whether
+        extraction is complete.
+        """
+        stats = {"exported": 0, "ingested": 0, "fallback": 0}
+        try:
+            return self._batch_step(
+                chunks,
+                is_conversation,
+                extraction_mode,
+                batch_folder,
+                batch,
+                models,
+                stats,
+            )
+        finally:
+            # Set whole once the step ends, so concurrent calls on one
+            # instance don't mix their counts.
+            self.batch_stats = stats
+
+    def _batch_step(
+        self,
+        chunks: list[str],
+        is_conversation: bool,
+        extraction_mode: ExtractionMode,
+        batch_folder: str,
+        batch: BatchMode,
+        models: Optional[Models],
+        stats: dict[str, int],
+    ) -> tuple[set, set, bool]:
+        folder = BatchFolder(batch_folder)
+        first = "joint" if extraction_mode == "joint" else "entities"
+
+        # Custom ids carry a chunk hash, so responses can't be matched to the
+        # wrong chunks if the input changed since the export.
+        keys = [
+            ChunkCheckpoint.chunk_key(chunk, is_conversation, extraction_mode)[:16]
+            for chunk in chunks
+        ]
+
+        def wave_ids(wave: str) -> list[str]:
+            return [f"{wave}-{index}-{key}" for index, key in enumerate(keys)]
+
+        if batch == "export":
+            stats["exported"] = self._export_wave(
+                folder, first, chunks, wave_ids(first), is_conversation, None, models
+            )
+            return set(), set(), False
+
+        if first == "joint":
+            results = self._ingest_wave(
+                folder,
+                "joint",
+                chunks,
+                wave_ids("joint"),
+                is_conversation,
+                None,
+                models,
+                stats,
+            )
+            entities = {e for chunk_entities, _ in results for e in chunk_entities}
+            relations = {r for _, chunk_relations in results for r in chunk_relations}
+            return entities, relations, True
+
+        entity_ids = wave_ids("entities")
+        if not folder.has_responses("relations"):
+            chunk_entities = self._ingest_wave(
+                folder,
+                "entities",
+                chunks,
+                entity_ids,
+                is_conversation,
+                None,
+                models,
+                stats,
+            )
+            folder.write_results("entities", dict(zip(entity_ids, chunk_entities)))
+            stats["exported"] = self._export_wave(
+                folder,
+                "relations",
+                chunks,
+                wave_ids("relations"),
+                is_conversation,
+                chunk_entities,
+                models,
+            )
+            return {e for es in chunk_entities for e in es}, set(), False
+
+        exported = folder.read_results("entities")
+        if not all(custom_id in exported for custom_id in entity_ids):
+            raise ValueError(
+                f"Entities in {folder.results_path('entities')} do not match this input"
+            )
+        chunk_entities = [exported[custom_id] for custom_id in entity_ids]
+        chunk_relations = self._ingest_wave(
+            folder,
+            "relations",
+            chunks,
+            wave_ids("relations"),
+            is_conversation,
+            chunk_entities,
+            models,
+            stats,
+        )
+        entities = {e for es in chunk_entities for e in es}
+        relations = {tuple(r) for rs in chunk_relations for r in rs}
+        return entities, relations, True
+
+    @staticmethod
+    def _save_graph(graph: Graph, output_folder: str, entities, relations):
+        os.makedirs(output_folder, exist_ok=True)
+        output_path = os.path.join(output_folder, "graph.json")
+
+        graph_dict = {
+            "entities": list(entities),
+            "relations": list(relations),
+            "edges": list(graph.edges),
+            "entity_clusters": {k: list(v) for k, v in graph.entity_clusters.items()}
+            if graph.entity_clusters
+            else None,
+            "edge_clusters": {k: list(v) for k, v in graph.edge_clusters.items()}
+            if graph.edge_clusters
+            else None,
+        }
+
+        with open(output_path, "w") as f:
+            json.dump(graph_dict, f, indent=2)
+
     def cluster(
         self,
         graph: Graph,
@@ -276,35 +1364,114 @@ class KGGen:
         api_key: str = None,
         api_base: str = None,
     ) -> Graph:
-        # Reinitialize dspy with new parameters if any are provided
-        if any([model, temperature, api_key, api_base]):
-            self.init_model(
-                model=model or self.model,
-                temperature=temperature or self.temperature,
-                api_key=api_key or self.api_key,
-                api_base=api_base or self.api_base,
+        self._update_model(model, temperature, api_key, api_base)
+        return self._cluster(graph, context, self._models())
+
+    def _cluster(self, graph: Graph, context: str, models: Models) -> Graph:
+        lm, lms = models
+        blocker = self._cluster_blocker()
+        normalizer = self._cluster_normalizer()
+        with dspy.context(lm=lm), track_call(self.callbacks, "cluster"):
+            clustered = cluster_graph(
+                graph,
+                context,
+                lms,
+                blocker,
+                self.max_concurrency,
+                self.cluster_window,
+                normalizer,
             )
+        self.normalization_stats = normalizer.stats if normalizer else None
+        return clustered
+
+    def _cluster_normalizer(self) -> Optional[Normalizer]:
+        if isinstance(self.cluster_normalize, Normalizer):
+            # A copy per call, so concurrent calls keep separate stats.
+            normalizer = copy.copy(self.cluster_normalize)
+            normalizer.stats = {}
+            return normalizer
+        return Normalizer() if self.cluster_normalize else None
+
+    def _cluster_blocker(self) -> Optional[Blocker]:
+        if self.cluster_block_size is None:
+            return None
+        return Blocker(
+            self._parse_embedding_model(),
+            max_block_size=self.cluster_block_size,
+            threshold=self.cluster_block_threshold,
+        )
+
+    async def acluster(
+        self,
+        graph: Graph,
+        context: str = "",
+        model: str = None,
+        temperature: float = None,
+        api_key: str = None,
+        api_base: str = None,
+    ) -> Graph:
+        """Async counterpart of `cluster`.
 
-        with dspy.context(lm=self.lm):
-            return cluster_graph(graph, context)
+        Runs `cluster` in a worker thread so the event loop stays free. Its
+        entity and edge clustering, blocks and validations already run
+        concurrently on threads, capped at `max_concurrency` LM calls, so
+        there are no async LM calls here. The worker thread is held for the
+        whole clustering run and its calls do not count against the
+        semaphore `agenerate` uses.
+        """
+        return await asyncio.to_thread(
+            self.cluster, graph, context, model, temperature, api_key, api_base
+        )
 
     def aggregate(self, graphs: list[Graph]) -> Graph:
+        """Combine graphs into one.
+
+        Each graph's clusters are kept as they are. A cluster whose
+        representative is already clustered by an earlier graph joins that
+        cluster, and every entity, edge and relation is mapped to the
+        representatives of the combined clusters, so graphs clustered
+        separately stay consistent with each other.
+        """
         # Initialize empty sets for combined graph
         all_entities = set()
         all_relations = set()
         all_edges = set()
+        entity_mapping = ClusterMapping()
+        edge_mapping = ClusterMapping()
+        entity_clusters: dict[str, set[str]] = {}
+        edge_clusters: dict[str, set[str]] = {}
+
+        def merge(mapping, combined, clusters):
+            mapping.extend(clusters)
+            for representative, members in clusters.items():
+                combined.setdefault(mapping[representative], set()).update(members)
 
         # Combine all graphs
         for graph in graphs:
             all_entities.update(graph.entities)
             all_relations.update(graph.relations)
             all_edges.update(graph.edges)
+            merge(entity_mapping, entity_clusters, graph.entity_clusters or {})
+            merge(edge_mapping, edge_clusters, graph.edge_clusters or {})
+
+        if not entity_mapping and not edge_mapping:
+            return Graph(
+                entities=all_entities, relations=all_relations, edges=all_edges
+            )
 
         # Create and return aggregated graph
-        return Graph(entities=all_entities, relations=all_relations, edges=all_edges)
+        return Graph(
+            entities={entity_mapping[entity] for entity in all_entities},
+            relations=entity_mapping.remap_relations(all_relations, edge_mapping),
+            edges={edge_mapping[edge] for edge in all_edges},
+            entity_clusters=entity_clusters or None,
+            edge_clusters=edge_clusters or None,
+        )
 
     @staticmethod
     def visualize(graph: Graph, output_path: str, open_in_browser: bool = False):
+        from .utils.visualize_kg import visualize as visualize_kg
+
         visualize_kg(graph, output_path, open_in_browser=open_in_browser)
 
     # ====== Retrieval Methods ======
@@ -320,6 +1487,8 @@ class KGGen:
 
     @staticmethod
     def to_nx(graph: Graph) -> nx.DiGraph:
+        import networkx as nx
+
         G = nx.DiGraph()
         for entity in graph.entities:
             G.add_node(entity)
@@ -374,6 +1543,9 @@ class KGGen:
         model: SentenceTransformer,
         k: int = 8,
     ) -> list[tuple[str, float]]:
+        import numpy as np
+        from sklearn.metrics.pairwise import cosine_similarity
+
         query_embedding = model.encode(query).reshape(1, -1)
         similarities = []
         for node, embed in node_embeddings.items():
@@ -13,3 +13,14 @@ class Graph(BaseModel):
     )
     entity_clusters: Optional[dict[str, set[str]]] = None
     edge_clusters: Optional[dict[str, set[str]]] = None
+
+
+class ChunkUpdate(BaseModel):
+    chunk_index: int = Field(..., description="Position of the chunk in the input")
+    entities: list[str] = Field(..., description="Entities extracted from this chunk")
+    relations: list[Tuple[str, str, str]] = Field(
+        ..., description="Relations extracted from this chunk"
+    )
+    graph: Graph = Field(
+        ..., description="Running merge of every chunk completed so far"
+    )
@@ -1,6 +1,9 @@
-from typing import List
+from typing import List, Mapping, Optional
 import dspy
 
+from ..utils.llm_cache import ExtractionCache
+from ..utils.predictors import cached_predict, stage_lm
+
 
 class TextEntities(dspy.Signature):
     """Extract key entities from the source text. Extracted entities are subjects or objects.
@@ -19,11 +22,79 @@ class ConversationEntities(dspy.Signature):
     entities: list[str] = dspy.OutputField(desc="THOROUGH list of key entities")
 
 
-def get_entities(input_data: str, is_conversation: bool = False) -> List[str]:
-    extract = (
-        dspy.Predict(ConversationEntities)
-        if is_conversation
-        else dspy.Predict(TextEntities)
+class ConversationUpdateEntities(dspy.Signature):
+    """Extract key entities from the latest messages of a conversation. Extracted entities are subjects or objects.
+    Consider both explicit entities and participants in the conversation. Known entities were extracted from earlier
+    messages; when the messages mention one of them, return it with exactly the same name.
+    This is for an extraction task, please be THOROUGH and accurate."""
+
+    source_text: str = dspy.InputField()
+    known_entities: list[str] = dspy.InputField(
+        desc="Entities extracted from earlier in the conversation"
+    )
+    entities: list[str] = dspy.OutputField(desc="THOROUGH list of key entities")
+
+
+def _signature_and_inputs(
+    input_data: str, is_conversation: bool, known_entities: Optional[list[str]]
+) -> tuple[type[dspy.Signature], dict]:
+    if known_entities is not None:
+        inputs = {"source_text": input_data, "known_entities": known_entities}
+        return ConversationUpdateEntities, inputs
+    signature = ConversationEntities if is_conversation else TextEntities
+    return signature, {"source_text": input_data}
+
+
+def get_entities(
+    input_data: str,
+    is_conversation: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+    known_entities: Optional[list[str]] = None,
+) -> List[str]:
+    """Extract entities from `input_data`. With `known_entities`, the input is
+    treated as new messages of a conversation whose entities are those."""
+    signature, inputs = _signature_and_inputs(
+        input_data, is_conversation, known_entities
     )
-    result = extract(source_text=input_data)
+    with stage_lm(lms, "entities"):
+        key = None
+        if cache is not None:
+            key = cache.make_key(signature, input_data, known_entities)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        extract = cached_predict(signature)
+        result = extract(**inputs)
+
+    if cache is not None:
+        cache.set(key, result.entities)
+    return result.entities
+
+
+async def aget_entities(
+    input_data: str,
+    is_conversation: bool = False,
+    cache: Optional[ExtractionCache] = None,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+    known_entities: Optional[list[str]] = None,
+) -> List[str]:
+    """Async counterpart of `get_entities`."""
+    signature, inputs = _signature_and_inputs(
+        input_data, is_conversation, known_entities
+    )
+    with stage_lm(lms, "entities"):
+        key = None
+        if cache is not None:
+            key = cache.make_key(signature, input_data, known_entities)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        extract = cached_predict(signature)
+        result = await extract.acall(**inputs)
+
+    if cache is not None:
+        cache.set(key, result.entities)
     return result.entities
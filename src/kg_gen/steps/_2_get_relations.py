@@ -1,8 +1,15 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Mapping, Optional
 import dspy
 from pydantic import BaseModel
 
+from ..utils.llm_cache import ExtractionCache
+from ..utils.predictors import cached_predict, stage_lm
+from ..utils.relation_repair import RelationRepairer
+from ._1_get_entities import aget_entities, get_entities
 
+
+@lru_cache(maxsize=128)
 def extraction_sig(
     Relation: BaseModel, is_conversation: bool, context: str = ""
 ) -> dspy.Signature:
@@ -39,6 +46,45 @@ def extraction_sig(
         return ExtractConversationRelations
 
 
+@lru_cache(maxsize=128)
+def joint_extraction_sig(
+    Relation: BaseModel, is_conversation: bool, context: str = ""
+) -> dspy.Signature:
+    """Single-call signature returning both the entities and the triples between them."""
+    if not is_conversation:
+
+        class ExtractTextEntitiesAndRelations(dspy.Signature):
+            __doc__ = f"""Extract key entities and subject-predicate-object triples from the source text.
+      Extracted entities are subjects or objects. Subject and object of every triple must be exact matches to items in the entities list.
+      This is for an extraction task, please be THOROUGH, accurate, and faithful to the reference text. {context}"""
+
+            source_text: str = dspy.InputField()
+            entities: list[str] = dspy.OutputField(desc="THOROUGH list of key entities")
+            relations: list[Relation] = dspy.OutputField(
+                desc="List of subject-predicate-object tuples. Be thorough."
+            )
+
+        return ExtractTextEntitiesAndRelations
+    else:
+
+        class ExtractConversationEntitiesAndRelations(dspy.Signature):
+            __doc__ = f"""Extract key entities and subject-predicate-object triples from the conversation.
+      Consider both explicit entities and participants in the conversation. Triples include:
+      1. Relations between concepts discussed
+      2. Relations between speakers and concepts (e.g. user asks about X)
+      3. Relations between speakers (e.g. assistant responds to user)
+      Subject and object of every triple must be exact matches to items in the entities list.
+      This is for an extraction task, please be THOROUGH, accurate, and faithful to the reference text. {context}"""
+
+            source_text: str = dspy.InputField()
+            entities: list[str] = dspy.OutputField(desc="THOROUGH list of key entities")
+            relations: list[Relation] = dspy.OutputField(
+                desc="List of subject-predicate-object tuples where subject and object are exact matches to items in entities list. Be thorough"
+            )
+
+        return ExtractConversationEntitiesAndRelations
+
+
 def fallback_extraction_sig(
     entities, is_conversation, context: str = ""
 ) -> dspy.Signature:
@@ -54,15 +100,33 @@ def fallback_extraction_sig(
         predicate: str = dspy.InputField(desc="Predicate", examples=["is brother of"])
         object: str = dspy.InputField(desc="Object entity", examples=["Vicky"])
 
-    return Relation, extraction_sig(Relation, is_conversation, context)
+    # Relation is new for every call, so caching the signature would only
+    # evict the shared ones.
+    return Relation, extraction_sig.__wrapped__(Relation, is_conversation, context)
 
 
-def get_relations(
-    input_data: str,
-    entities: list[str],
-    is_conversation: bool = False,
-    context: str = "",
-) -> List[str]:
+def fixed_relations_sig(Relation: BaseModel) -> dspy.Signature:
+    class FixedRelations(dspy.Signature):
+        """Fix the relations so that every subject and object of the relations are exact matches to an entity. Keep the predicate the same. The meaning of every relation should stay faithful to the reference text. If you cannot maintain the meaning of the original relation relative to the source text, then do not return it."""
+
+        source_text: str = dspy.InputField()
+        entities: list[str] = dspy.InputField()
+        relations: list[Relation] = dspy.InputField()
+        fixed_relations: list[Relation] = dspy.OutputField()
+
+    return FixedRelations
+
+
+def _good_relations(fixed_relations, entities: list[str]) -> List[str]:
+    good_relations = []
+    for rel in fixed_relations:
+        if rel.subject in entities and rel.object in entities:
+            good_relations.append(rel)
+    return [(r.subject, r.predicate, r.object) for r in good_relations]
+
+
+@lru_cache(maxsize=None)
+def _relation_model() -> BaseModel:
     class Relation(BaseModel):
         """Knowledge graph subject-predicate-object tuple."""
 
@@ -70,36 +134,292 @@ def get_relations(
         predicate: str = dspy.InputField(desc="Predicate", examples=["is brother of"])
         object: str = dspy.InputField(desc="Object entity", examples=["Vicky"])
 
-    ExtractRelations = extraction_sig(Relation, is_conversation, context)
+    return Relation
+
 
-    try:
-        extract = dspy.Predict(ExtractRelations)
-        result = extract(source_text=input_data, entities=entities)
-        return [(r.subject, r.predicate, r.object) for r in result.relations]
+def _count_repaired(relations: list, repaired_relations: list, residue: list) -> int:
+    """Number of `relations` whose subject or object local repair changed."""
+    unmatched = {id(r) for r in residue}
+    raw = [
+        (r.subject, r.predicate, r.object) for r in relations if id(r) not in unmatched
+    ]
+    return sum(a != b for a, b in zip(raw, repaired_relations))
+
+
+def _repair_joint_relations(
+    relations: list, entities: list[str], repair: RelationRepairer
+) -> tuple[list[tuple], list]:
+    """Snap the joint relations onto the joint entities, returning the repaired
+    tuples and the residue for the fix call."""
+    repaired_relations, residue = repair.repair(relations, entities)
+    if not residue:
+        repaired = _count_repaired(relations, repaired_relations, residue)
+        if repaired:
+            repair.record("local", repaired=repaired)
+        else:
+            repair.record("strict")
+    return repaired_relations, residue
+
+
+def fix_joint_relations(
+    input_data: str,
+    relations: list,
+    entities: list[str],
+    repair: Optional[RelationRepairer] = None,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+) -> list[tuple]:
+    """Joint `relations` with every subject and object in `entities`.
+
+    Relations are repaired locally first; only the residue goes to the LM fix
+    call, and relations it can't fix are dropped.
+    """
+    repair = repair or RelationRepairer()
+    fixed, residue = _repair_joint_relations(relations, entities, repair)
+    if residue:
+        repaired = _count_repaired(relations, fixed, residue)
+        fix = dspy.ChainOfThought(fixed_relations_sig(_relation_model()))
+        with stage_lm(lms, "fix_relations"):
+            fix_res = fix(source_text=input_data, entities=entities, relations=residue)
+        fixed += _good_relations(fix_res.fixed_relations, entities)
+        repair.record("llm_fix", repaired=repaired, sent_to_llm=len(residue))
+    return fixed
+
+
+async def afix_joint_relations(
+    input_data: str,
+    relations: list,
+    entities: list[str],
+    repair: Optional[RelationRepairer] = None,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+) -> list[tuple]:
+    """Async counterpart of `fix_joint_relations`."""
+    repair = repair or RelationRepairer()
+    fixed, residue = _repair_joint_relations(relations, entities, repair)
+    if residue:
+        repaired = _count_repaired(relations, fixed, residue)
+        fix = dspy.ChainOfThought(fixed_relations_sig(_relation_model()))
+        with stage_lm(lms, "fix_relations"):
+            fix_res = await fix.acall(
+                source_text=input_data, entities=entities, relations=residue
+            )
+        fixed += _good_relations(fix_res.fixed_relations, entities)
+        repair.record("llm_fix", repaired=repaired, sent_to_llm=len(residue))
+    return fixed
 
-    except Exception as _:
-        Relation, ExtractRelations = fallback_extraction_sig(
-            entities, is_conversation, context
+
+def _cache_lookup(
+    cache: Optional[ExtractionCache],
+    ExtractRelations: dspy.Signature,
+    input_data: str,
+    entities: list[str],
+    context: str,
+):
+    if cache is None:
+        return None, None
+    key = cache.make_key(ExtractRelations, input_data, list(entities), context)
+    cached = cache.get(key)
+    if cached is not None:
+        cached = [tuple(relation) for relation in cached]
+    return key, cached
+
+
+def get_relations(
+    input_data: str,
+    entities: list[str],
+    is_conversation: bool = False,
+    context: str = "",
+    cache: Optional[ExtractionCache] = None,
+    repair: Optional[RelationRepairer] = None,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+) -> List[str]:
+    with stage_lm(lms, "relations"):
+        ExtractRelations = extraction_sig(_relation_model(), is_conversation, context)
+        key, cached = _cache_lookup(
+            cache, ExtractRelations, input_data, entities, context
         )
-        extract = dspy.Predict(ExtractRelations)
-        result = extract(source_text=input_data, entities=entities)
+        if cached is not None:
+            return cached
+        repair = repair or RelationRepairer()
 
-        class FixedRelations(dspy.Signature):
-            """Fix the relations so that every subject and object of the relations are exact matches to an entity. Keep the predicate the same. The meaning of every relation should stay faithful to the reference text. If you cannot maintain the meaning of the original relation relative to the source text, then do not return it."""
+        try:
+            extract = cached_predict(ExtractRelations)
+            result = extract(source_text=input_data, entities=entities)
+            relations = [(r.subject, r.predicate, r.object) for r in result.relations]
 
-            source_text: str = dspy.InputField()
-            entities: list[str] = dspy.InputField()
-            relations: list[Relation] = dspy.InputField()
-            fixed_relations: list[Relation] = dspy.OutputField()
+        except Exception as _:
+            Relation, ExtractRelations = fallback_extraction_sig(
+                entities, is_conversation, context
+            )
+            extract = dspy.Predict(ExtractRelations)
+            result = extract(source_text=input_data, entities=entities)
+
+            # Snap subjects/objects onto the entity list locally; only the residue
+            # goes to the LLM fix call.
+            relations, residue = repair.repair(result.relations, entities)
+            repaired = _count_repaired(result.relations, relations, residue)
+            if residue:
+                fix = dspy.ChainOfThought(fixed_relations_sig(Relation))
 
-        fix = dspy.ChainOfThought(FixedRelations)
+                with stage_lm(lms, "fix_relations"):
+                    fix_res = fix(
+                        source_text=input_data, entities=entities, relations=residue
+                    )
+                relations += _good_relations(fix_res.fixed_relations, entities)
+                repair.record("llm_fix", repaired=repaired, sent_to_llm=len(residue))
+            else:
+                repair.record("local", repaired=repaired)
+        else:
+            repair.record("strict")
 
-        fix_res = fix(
-            source_text=input_data, entities=entities, relations=result.relations
+    if cache is not None:
+        cache.set(key, relations)
+    return relations
+
+
+async def aget_relations(
+    input_data: str,
+    entities: list[str],
+    is_conversation: bool = False,
+    context: str = "",
+    cache: Optional[ExtractionCache] = None,
+    repair: Optional[RelationRepairer] = None,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+) -> List[str]:
+    """Async counterpart of `get_relations`, driven through dspy's async predictors."""
+    with stage_lm(lms, "relations"):
+        ExtractRelations = extraction_sig(_relation_model(), is_conversation, context)
+        key, cached = _cache_lookup(
+            cache, ExtractRelations, input_data, entities, context
         )
+        if cached is not None:
+            return cached
+        repair = repair or RelationRepairer()
+
+        try:
+            extract = cached_predict(ExtractRelations)
+            result = await extract.acall(source_text=input_data, entities=entities)
+            relations = [(r.subject, r.predicate, r.object) for r in result.relations]
+
+        except Exception as _:
+            Relation, ExtractRelations = fallback_extraction_sig(
+                entities, is_conversation, context
+            )
+            extract = dspy.Predict(ExtractRelations)
+            result = await extract.acall(source_text=input_data, entities=entities)
+
+            # Snap subjects/objects onto the entity list locally; only the residue
+            # goes to the LLM fix call.
+            relations, residue = repair.repair(result.relations, entities)
+            repaired = _count_repaired(result.relations, relations, residue)
+            if residue:
+                fix = dspy.ChainOfThought(fixed_relations_sig(Relation))
+
+                with stage_lm(lms, "fix_relations"):
+                    fix_res = await fix.acall(
+                        source_text=input_data, entities=entities, relations=residue
+                    )
+                relations += _good_relations(fix_res.fixed_relations, entities)
+                repair.record("llm_fix", repaired=repaired, sent_to_llm=len(residue))
+            else:
+                repair.record("local", repaired=repaired)
+        else:
+            repair.record("strict")
+
+    if cache is not None:
+        cache.set(key, relations)
+    return relations
+
+
+def get_entities_and_relations(
+    input_data: str,
+    is_conversation: bool = False,
+    context: str = "",
+    cache: Optional[ExtractionCache] = None,
+    repair: Optional[RelationRepairer] = None,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+) -> tuple[List[str], List[str]]:
+    """Extract entities and relations in one LM call.
+
+    Falls back to the two-step `get_entities` / `get_relations` path if the
+    joint response cannot be parsed. Triples whose subject or object is not
+    an extracted entity are repaired as in `get_relations`.
+    """
+    repair = repair or RelationRepairer()
+    with stage_lm(lms, "joint"):
+        ExtractJoint = joint_extraction_sig(_relation_model(), is_conversation, context)
+        key = None
+        if cache is not None:
+            key = cache.make_key(ExtractJoint, input_data, context=context)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached["entities"], [tuple(r) for r in cached["relations"]]
+
+        try:
+            extract = cached_predict(ExtractJoint)
+            result = extract(source_text=input_data)
+            entities = result.entities
+        except Exception as _:
+            entities = get_entities(
+                input_data, is_conversation=is_conversation, lms=lms
+            )
+            relations = get_relations(
+                input_data,
+                entities,
+                is_conversation=is_conversation,
+                context=context,
+                repair=repair,
+                lms=lms,
+            )
+        else:
+            relations = fix_joint_relations(
+                input_data, result.relations, entities, repair, lms
+            )
+
+    if cache is not None:
+        cache.set(key, {"entities": entities, "relations": relations})
+    return entities, relations
+
+
+async def aget_entities_and_relations(
+    input_data: str,
+    is_conversation: bool = False,
+    context: str = "",
+    cache: Optional[ExtractionCache] = None,
+    repair: Optional[RelationRepairer] = None,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+) -> tuple[List[str], List[str]]:
+    """Async counterpart of `get_entities_and_relations`."""
+    repair = repair or RelationRepairer()
+    with stage_lm(lms, "joint"):
+        ExtractJoint = joint_extraction_sig(_relation_model(), is_conversation, context)
+        key = None
+        if cache is not None:
+            key = cache.make_key(ExtractJoint, input_data, context=context)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached["entities"], [tuple(r) for r in cached["relations"]]
+
+        try:
+            extract = cached_predict(ExtractJoint)
+            result = await extract.acall(source_text=input_data)
+            entities = result.entities
+        except Exception as _:
+            entities = await aget_entities(
+                input_data, is_conversation=is_conversation, lms=lms
+            )
+            relations = await aget_relations(
+                input_data,
+                entities,
+                is_conversation=is_conversation,
+                context=context,
+                repair=repair,
+                lms=lms,
+            )
+        else:
+            relations = await afix_joint_relations(
+                input_data, result.relations, entities, repair, lms
+            )
 
-        good_relations = []
-        for rel in fix_res.fixed_relations:
-            if rel.subject in entities and rel.object in entities:
-                good_relations.append(rel)
-        return [(r.subject, r.predicate, r.object) for r in good_relations]
+    if cache is not None:
+        cache.set(key, {"entities": entities, "relations": relations})
+    return entities, relations
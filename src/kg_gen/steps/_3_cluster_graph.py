@@ -1,17 +1,55 @@
 from ..models import Graph
+from ..utils.blocking import Blocker
+from ..utils.cluster_mapping import ClusterMapping
+from ..utils.normalize import Normalizer
+from ..utils.predictors import cached_predict, stage_lm
+import contextvars
 import dspy
-from typing import Optional
-from pydantic import BaseModel
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Mapping, Optional
+from pydantic import BaseModel, field_serializer
 from typing import Literal
 import logging
 
 LOOP_N = 8
+# Blocks hold only similar items, so one empty answer rarely hides a cluster.
+BLOCK_LOOP_N = 2
 BATCH_SIZE = 10
+WINDOW_SIZE = 100
 
 ItemType = Literal["entities", "edges"]
 
 logger = logging.getLogger(__name__)
 
+# Caps the LM calls in flight across the concurrent parts of one cluster_graph.
+_call_slots: contextvars.ContextVar[Optional[threading.BoundedSemaphore]] = (
+    contextvars.ContextVar("cluster_call_slots", default=None)
+)
+
+
+@contextmanager
+def _lm_call(lms: Optional[Mapping[str, dspy.BaseLM]], stage: str):
+    """`stage_lm`, holding one of the caller's call slots if it has any."""
+    with _call_slots.get() or nullcontext(), stage_lm(lms, stage):
+        yield
+
+
+def _run_concurrently(fn: Callable, args: list[tuple], max_workers: int) -> list:
+    """`fn(*a)` for each `a` in `args`, in order, on up to `max_workers` threads.
+
+    Each call runs in a copy of the caller's context so the dspy settings and
+    call slots reach the worker threads.
+    """
+    if max_workers <= 1 or len(args) <= 1:
+        return [fn(*a) for a in args]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(args))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, fn, *a) for a in args
+        ]
+        return [future.result() for future in futures]
+
 
 class ChooseRepresentative(dspy.Signature):
     """Select the best item name to represent the cluster, ideally from the cluster.
@@ -29,9 +67,15 @@ class Cluster(BaseModel):
     representative: str
     members: set[str]
 
+    @field_serializer("members")
+    def _sorted_members(self, members: set[str]) -> list[str]:
+        # Prompts must not depend on set order, or cached and replayed
+        # requests stop matching.
+        return sorted(members)
+
 
 def get_extract_cluster_sig(items: set[str]) -> dspy.Signature:
-    ItemsLiteral = Literal[tuple(items)]
+    ItemsLiteral = Literal[tuple(sorted(items))]
 
     class ExtractCluster(dspy.Signature):
         """Find one cluster of related items from the list.
@@ -48,7 +92,7 @@ def get_extract_cluster_sig(items: set[str]) -> dspy.Signature:
 
 
 def get_validate_cluster_sig(items: set[str]) -> dspy.Signature:
-    ClusterLiteral = Literal[tuple(items)]
+    ClusterLiteral = Literal[tuple(sorted(items))]
 
     class ValidateCluster(dspy.Signature):
         """Validate if these items belong in the same cluster.
@@ -74,7 +118,7 @@ def get_check_existing_clusters_sig(
             clusters.append(Cluster(representative=item, members={item}))
         return None
 
-    BatchLiteral = Literal[tuple(batch)]
+    BatchLiteral = Literal[tuple(sorted(batch))]
 
     class CheckExistingClusters(dspy.Signature):
         """Determine if the given items can be added to any of the existing clusters.
@@ -94,60 +138,94 @@ def get_check_existing_clusters_sig(
     return CheckExistingClusters
 
 
+class ExtractClusterIds(dspy.Signature):
+    """Find one cluster of related items from the numbered items.
+    A cluster should contain items that are the same in meaning, with different tenses, plural forms, stem forms, or cases.
+    Return the IDs of the cluster's items only if you find items that clearly belong together, else return empty list."""
+
+    items: dict[int, str] = dspy.InputField(desc="Items keyed by ID")
+    context: str = dspy.InputField(desc="The larger context in which the items appear")
+    cluster_ids: list[int] = dspy.OutputField()
+
+
+class ValidateClusterIds(dspy.Signature):
+    """Validate if these numbered items belong in the same cluster.
+    A cluster should contain items that are the same in meaning, with different tenses, plural forms, stem forms, or cases.
+    Return populated list only if you find items that clearly belong together, else return empty list."""
+
+    cluster: dict[int, str] = dspy.InputField(desc="Items keyed by ID")
+    context: str = dspy.InputField(desc="The larger context in which the items appear")
+    validated_ids: list[int] = dspy.OutputField(
+        desc="IDs of all the items that belong together in the cluster"
+    )
+
+
+class CheckExistingClusterIds(dspy.Signature):
+    """Determine if the given items can be added to any of the existing clusters.
+    Return the ID of the matching cluster for each item, or None if there is no match."""
+
+    items: dict[int, str] = dspy.InputField(desc="Items keyed by ID")
+    clusters: dict[int, Cluster] = dspy.InputField(desc="Existing clusters keyed by ID")
+    context: str = dspy.InputField(desc="The larger context in which the items appear")
+    cluster_ids_that_items_belong_to: list[Optional[int]] = dspy.OutputField(
+        desc="Ordered list of cluster IDs where each is the cluster where that item belongs to, or None if no match. THIS LIST LENGTH IS SAME AS ITEMS LIST LENGTH"
+    )
+
+
 def _map_batch_items(
     batch: set[str],
     cluster_reps: list[Optional[str]],
     cluster_map: dict[str, Cluster],
     item_assignments: dict[str, Optional[str]],
     context: str,
-    validate: dspy.Signature,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+    max_workers: int = 1,
 ):
-    for i, item in enumerate(batch):
-        # Default: item might become its own cluster if no valid assignment found
-        item_assignments[item] = None
-
+    def assign(i: int, item: str) -> Optional[str]:
         # Get the suggested representative from the LLM call
         rep = cluster_reps[i] if i < len(cluster_reps) else None
 
-        target_cluster = None
         # Check if the suggested representative corresponds to an existing cluster
-        if rep is not None and rep in cluster_map:
-            target_cluster = cluster_map[rep]
-
-        if target_cluster:
-            # If the item is already the representative or a member, assign it definitively
-            if item == target_cluster.representative or item in target_cluster.members:
-                item_assignments[item] = target_cluster.representative
-                continue  # Move to the next item
-
-            # Validate adding the item to the existing cluster's members
-            potential_new_members = target_cluster.members | {item}
-            try:
-                # Call the validation signature
-                v_result = validate(cluster=potential_new_members, context=context)
-                validated_items = set(
-                    v_result.validated_items
-                )  # Ensure result is a set
-
-                # Check if the item was validated as part of the cluster AND
-                # the size matches the expected size after adding.
-                # This assumes 'validate' confirms membership without removing others.
-                if item in validated_items and len(validated_items) == len(
-                    potential_new_members
-                ):
-                    # Validation successful, assign item to this cluster's representative
-                    item_assignments[item] = target_cluster.representative
-                # Else: Validation failed or item rejected, item_assignments[item] remains None
-
-            except Exception as e:
-                logger.error(
-                    f"Validation failed for item '{item}' potentially belonging to cluster '{target_cluster.representative}': {e}"
+        target_cluster = cluster_map.get(rep) if rep is not None else None
+        if target_cluster is None:
+            # Item might become its own cluster if no valid assignment found
+            return None
+
+        # If the item is already the representative or a member, assign it definitively
+        if item == target_cluster.representative or item in target_cluster.members:
+            return target_cluster.representative
+
+        # Validate adding the item to the existing cluster's members
+        potential_new_members = target_cluster.members | {item}
+        try:
+            # Call the validation signature, whose Literal must cover the new member
+            ValidateCluster, _ = get_validate_cluster_sig(potential_new_members)
+            with _lm_call(lms, "validate_cluster"):
+                v_result = dspy.Predict(ValidateCluster)(
+                    cluster=sorted(potential_new_members), context=context
                 )
-                # Keep item_assignments[item] as None, indicating it needs a new cluster
-
-        # Else (no valid target_cluster found for the suggested 'rep'):
-        # item_assignments[item] remains None, will become a new cluster.
+            validated_items = set(v_result.validated_items)  # Ensure result is a set
+
+            # Check if the item was validated as part of the cluster AND
+            # the size matches the expected size after adding.
+            # This assumes 'validate' confirms membership without removing others.
+            if item in validated_items and len(validated_items) == len(
+                potential_new_members
+            ):
+                # Validation successful, assign item to this cluster's representative
+                return target_cluster.representative
+        except Exception as e:
+            logger.error(
+                f"Validation failed for item '{item}' potentially belonging to cluster '{target_cluster.representative}': {e}"
+            )
+        # Validation failed or item rejected: the item needs a new cluster
+        return None
 
+    # Validations of different items are independent LM calls, so they run
+    # concurrently.
+    items = list(batch)
+    assignments = _run_concurrently(assign, list(enumerate(items)), max_workers)
+    item_assignments.update(zip(items, assignments))
     return item_assignments
 
 
@@ -181,14 +259,16 @@ def _process_batch(
     batch: set[str],
     clusters: list[Cluster],
     context: str,
-    validate: dspy.Signature,
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+    max_workers: int = 1,
 ):
     CheckExistingClusters = get_check_existing_clusters_sig(batch, clusters)
     if not CheckExistingClusters:
         return
 
     check_existing = dspy.ChainOfThought(CheckExistingClusters)
-    c_result = check_existing(items=batch, clusters=clusters, context=context)
+    with _lm_call(lms, "check_existing_clusters"):
+        c_result = check_existing(items=batch, clusters=clusters, context=context)
     cluster_reps = c_result.cluster_reps_that_items_belong_to
 
     # Map representatives to their cluster objects for easier lookup
@@ -198,14 +278,14 @@ def _process_batch(
     # Determine assignments for batch items based on validation
     # Stores item -> assigned representative. If None, item needs a new cluster.
     item_assignments: dict[str, Optional[str]] = _map_batch_items(
-        batch, cluster_reps, cluster_map, {}, context, validate
+        batch, cluster_reps, cluster_map, {}, context, lms, max_workers
     )
 
     # Process the assignments determined above
     new_cluster_items = _process_determined_assignments(item_assignments, cluster_map)
 
     # Create the new Cluster objects for items that couldn't be assigned
-    for item in new_cluster_items:
+    for item in sorted(new_cluster_items):
         # Final check: ensure a cluster with this item as rep doesn't exist
         if item not in cluster_map:
             new_cluster = Cluster(representative=item, members={item})
@@ -215,7 +295,13 @@ def _process_batch(
 
 
 def cluster_items(
-    dspy: dspy, items: set[str], item_type: ItemType = "entities", context: str = ""
+    dspy: dspy,
+    items: set[str],
+    item_type: ItemType = "entities",
+    context: str = "",
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+    max_no_progress: int = LOOP_N,
+    max_workers: int = 1,
 ) -> tuple[set[str], dict[str, set[str]]]:
     """Returns item set and cluster dict mapping representatives to sets of items"""
 
@@ -223,15 +309,15 @@ def cluster_items(
     remaining_items = items.copy()
     clusters: list[Cluster] = []
     no_progress_count = 0
-    validate = None
 
-    while len(remaining_items) > 0 and no_progress_count < LOOP_N:
+    while len(remaining_items) > 0 and no_progress_count < max_no_progress:
         ExtractCluster, ItemsLiteral = get_extract_cluster_sig(items)
         extract = dspy.Predict(ExtractCluster)
 
-        suggested_cluster: set[ItemsLiteral] = set(
-            extract(items=remaining_items, context=context).cluster
-        )
+        with _lm_call(lms, "extract_cluster"):
+            suggested_cluster: set[ItemsLiteral] = set(
+                extract(items=sorted(remaining_items), context=context).cluster
+            )
 
         if not suggested_cluster:
             no_progress_count += 1
@@ -240,18 +326,22 @@ def cluster_items(
         ValidateCluster, ClusterLiteral = get_validate_cluster_sig(suggested_cluster)
         validate = dspy.Predict(ValidateCluster)
 
-        validated_cluster = set(
-            validate(cluster=suggested_cluster, context=context).validated_items
-        )
+        with _lm_call(lms, "validate_cluster"):
+            validated_cluster = set(
+                validate(
+                    cluster=sorted(suggested_cluster), context=context
+                ).validated_items
+            )
         if not validated_cluster:
             no_progress_count += 1
             continue
 
         no_progress_count = 0
 
-        representative = choose_rep(
-            cluster=validated_cluster, context=context
-        ).representative
+        with _lm_call(lms, "choose_representative"):
+            representative = choose_rep(
+                cluster=sorted(validated_cluster), context=context
+            ).representative
 
         clusters.append(
             Cluster(representative=representative, members=validated_cluster)
@@ -261,11 +351,11 @@ def cluster_items(
         }
 
     if len(remaining_items) > 0:
-        items_to_process = list(remaining_items)
+        items_to_process = sorted(remaining_items)
 
         for i in range(0, len(items_to_process), BATCH_SIZE):
             batch = items_to_process[i : min(i + BATCH_SIZE, len(items_to_process))]
-            _process_batch(batch, clusters, context, validate)
+            _process_batch(batch, clusters, context, lms, max_workers)
 
     # Prepare the final output format expected by the calling function:
     # 1. A dictionary mapping representative -> set of members
@@ -276,45 +366,244 @@ def cluster_items(
     return new_items, final_clusters_dict
 
 
-def cluster_graph(graph: Graph, context: str = "") -> Graph:
+def _pick(numbered: dict[int, str], ids: list[int]) -> list[str]:
+    """The items of `numbered` with the given IDs, skipping unknown IDs."""
+    return [numbered[i] for i in dict.fromkeys(ids) if i in numbered]
+
+
+def _validate_ids(
+    members: set[str], context: str, lms: Optional[Mapping[str, dspy.BaseLM]]
+) -> set[str]:
+    numbered = dict(enumerate(sorted(members)))
+    with _lm_call(lms, "validate_cluster"):
+        result = cached_predict(ValidateClusterIds)(cluster=numbered, context=context)
+    return set(_pick(numbered, result.validated_ids))
+
+
+def _cluster_window(
+    window: list[str],
+    context: str,
+    lms: Optional[Mapping[str, dspy.BaseLM]],
+    max_no_progress: int,
+    max_workers: int = 1,
+) -> list[Cluster]:
+    """`cluster_items` over one window, with items referenced by their IDs."""
+    remaining = list(window)
+    clusters: list[Cluster] = []
+    no_progress_count = 0
+
+    while len(remaining) > 1 and no_progress_count < max_no_progress:
+        numbered = dict(enumerate(remaining))
+        with _lm_call(lms, "extract_cluster"):
+            result = cached_predict(ExtractClusterIds)(items=numbered, context=context)
+        suggested_cluster = set(_pick(numbered, result.cluster_ids))
+        if not suggested_cluster:
+            no_progress_count += 1
+            continue
+
+        validated_cluster = _validate_ids(suggested_cluster, context, lms)
+        if not validated_cluster:
+            no_progress_count += 1
+            continue
+
+        no_progress_count = 0
+
+        with _lm_call(lms, "choose_representative"):
+            representative = choose_rep(
+                cluster=sorted(validated_cluster), context=context
+            ).representative
+
+        clusters.append(
+            Cluster(representative=representative, members=validated_cluster)
+        )
+        remaining = [item for item in remaining if item not in validated_cluster]
+
+    # Check the leftovers against the window's clusters, as `_process_batch`
+    # does against all clusters.
+    check_existing = dspy.ChainOfThought(CheckExistingClusterIds)
+    for i in range(0, len(remaining), BATCH_SIZE):
+        batch = remaining[i : i + BATCH_SIZE]
+        if not clusters:
+            clusters.extend(
+                Cluster(representative=item, members={item}) for item in batch
+            )
+            continue
+
+        numbered_clusters = dict(enumerate(clusters))
+        with _lm_call(lms, "check_existing_clusters"):
+            result = check_existing(
+                items=dict(enumerate(batch)),
+                clusters=numbered_clusters,
+                context=context,
+            )
+        cluster_ids = result.cluster_ids_that_items_belong_to
+
+        def assign(index: int, item: str) -> Optional[Cluster]:
+            cluster_id = cluster_ids[index] if index < len(cluster_ids) else None
+            target_cluster = numbered_clusters.get(cluster_id)
+            if target_cluster is None:
+                return None
+            potential_new_members = target_cluster.members | {item}
+            try:
+                validated_items = _validate_ids(potential_new_members, context, lms)
+            except Exception as e:
+                logger.error(
+                    f"Validation failed for item '{item}' potentially belonging to cluster '{target_cluster.representative}': {e}"
+                )
+                return None
+            return target_cluster if validated_items == potential_new_members else None
+
+        targets = _run_concurrently(assign, list(enumerate(batch)), max_workers)
+        for item, target_cluster in zip(batch, targets):
+            if target_cluster is not None:
+                target_cluster.members.add(item)
+            else:
+                clusters.append(Cluster(representative=item, members={item}))
+
+    return clusters
+
+
+def cluster_items_windowed(
+    dspy: dspy,
+    items: set[str],
+    item_type: ItemType = "entities",
+    context: str = "",
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+    window: int = WINDOW_SIZE,
+    max_no_progress: int = LOOP_N,
+    max_workers: int = 1,
+) -> tuple[set[str], dict[str, set[str]]]:
+    """`cluster_items` with prompts of at most `window` items.
+
+    Items are sorted case-insensitively, so case and plural variants sit
+    together, and clustered one window at a time. Prompts number the items
+    and the LM answers with those numbers, so the signatures are fixed
+    instead of carrying a `Literal` of every item. Items in different windows
+    are only merged if they end up with the same representative.
+    """
+    if window < 2:
+        raise ValueError("window must be at least 2")
+
+    context = f"{item_type} of a graph extracted from source text." + context
+    ordered = sorted(items, key=lambda item: (item.casefold(), item))
+    clusters: dict[str, set[str]] = {}
+    for start in range(0, len(ordered), window):
+        for cluster in _cluster_window(
+            ordered[start : start + window], context, lms, max_no_progress, max_workers
+        ):
+            clusters.setdefault(cluster.representative, set()).update(cluster.members)
+
+    return set(clusters), clusters
+
+
+def cluster_items_blocked(
+    dspy: dspy,
+    items: set[str],
+    blocker: Blocker,
+    item_type: ItemType = "entities",
+    context: str = "",
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+    max_workers: int = 8,
+    window: Optional[int] = None,
+) -> tuple[set[str], dict[str, set[str]]]:
+    """`cluster_items` run separately within each candidate block of `blocker`.
+
+    Blocks are clustered in parallel on up to `max_workers` threads. Items
+    alone in their block are their own cluster without an LM call. With
+    `window`, blocks are clustered by `cluster_items_windowed`.
+    """
+    clusters: dict[str, set[str]] = {}
+    blocks = []
+    for block in blocker.blocks(items):
+        if len(block) == 1:
+            clusters[block[0]] = {block[0]}
+        else:
+            blocks.append(set(block))
+
+    def cluster_block(block: set[str]):
+        if window is not None:
+            return cluster_items_windowed(
+                dspy, block, item_type, context, lms, window, BLOCK_LOOP_N, max_workers
+            )
+        return cluster_items(
+            dspy, block, item_type, context, lms, BLOCK_LOOP_N, max_workers
+        )
+
+    results = _run_concurrently(
+        cluster_block, [(block,) for block in blocks], max_workers
+    )
+    for _, block_clusters in results:
+        for representative, members in block_clusters.items():
+            clusters.setdefault(representative, set()).update(members)
+
+    return set(clusters), clusters
+
+
+def cluster_graph(
+    graph: Graph,
+    context: str = "",
+    lms: Optional[Mapping[str, dspy.BaseLM]] = None,
+    blocker: Optional[Blocker] = None,
+    max_workers: int = 8,
+    window: Optional[int] = None,
+    normalizer: Optional[Normalizer] = None,
+) -> Graph:
     """Cluster entities and edges in a graph, updating relations accordingly.
 
     Args:
         dspy: The DSPy runtime
         graph: Input graph with entities, edges, and relations
         context: Additional context string for clustering
+        lms: LMs for individual clustering signatures, keyed by stage name
+        blocker: Cluster only within blocks of similar items from this blocker
+        max_workers: Most clustering LM calls in flight at once. Entities and
+            edges are clustered concurrently, as are blocks and the
+            validations of a batch
+        window: Cluster at most this many items per prompt, referenced by ID
+        normalizer: Merge items with equal normalized forms before the LM
+            steps, which then only see one item of each group
 
     Returns:
         Graph with clustered entities and edges, updated relations, and cluster mappings
     """
-    entities, entity_clusters = cluster_items(dspy, graph.entities, "entities", context)
-    edges, edge_clusters = cluster_items(dspy, graph.edges, "edges", context)
-
-    # Update relations based on clusters
-    relations: set[tuple[str, str, str]] = set()
-    for s, p, o in graph.relations:
-        # Look up subject in entity clusters
-        if s not in entities:
-            for rep, cluster in entity_clusters.items():
-                if s in cluster:
-                    s = rep
-                    break
-
-        # Look up predicate in edge clusters
-        if p not in edges:
-            for rep, cluster in edge_clusters.items():
-                if p in cluster:
-                    p = rep
-                    break
-
-        # Look up object in entity clusters
-        if o not in entities:
-            for rep, cluster in entity_clusters.items():
-                if o in cluster:
-                    o = rep
-                    break
-
-        relations.add((s, p, o))
+
+    def cluster(items: set[str], item_type: ItemType):
+        if normalizer is None:
+            return cluster_lm(items, item_type)
+        groups = normalizer.pre_merge(items, item_type)
+        _, clusters = cluster_lm(set(groups), item_type)
+        expanded = {
+            representative: set().union(
+                *(groups.get(member, {member}) for member in members)
+            )
+            for representative, members in clusters.items()
+        }
+        return set(expanded), expanded
+
+    def cluster_lm(items: set[str], item_type: ItemType):
+        if blocker is not None:
+            return cluster_items_blocked(
+                dspy, items, blocker, item_type, context, lms, max_workers, window
+            )
+        if window is not None:
+            return cluster_items_windowed(
+                dspy, items, item_type, context, lms, window, LOOP_N, max_workers
+            )
+        return cluster_items(dspy, items, item_type, context, lms, LOOP_N, max_workers)
+
+    token = _call_slots.set(threading.BoundedSemaphore(max(max_workers, 1)))
+    try:
+        (entities, entity_clusters), (edges, edge_clusters) = _run_concurrently(
+            cluster, [(graph.entities, "entities"), (graph.edges, "edges")], 2
+        )
+    finally:
+        _call_slots.reset(token)
+
+    # Update relations based on clusters. Representatives stay fixed points,
+    # so relations only use items that are in `entities` and `edges`.
+    relations = ClusterMapping.flat(entity_clusters).remap_relations(
+        graph.relations, ClusterMapping.flat(edge_clusters)
+    )
 
     return Graph(
         entities=entities,
@@ -0,0 +1,121 @@
+"""Request and response files for provider batch APIs.
+
+Extraction requests are written as JSONL in the OpenAI batch input format,
+one chat completion request per line, with the same messages a synchronous
+call would send. The provider's output file is read back and each response
+parsed against the signature of its request. Files live in a batch folder,
+named after the wave they belong to:
+
+    entities.requests.jsonl     entities.responses.jsonl
+    relations.requests.jsonl    relations.responses.jsonl
+    joint.requests.jsonl        joint.responses.jsonl
+
+`entities.results.jsonl` keeps the entities the relations wave was exported
+with, so that wave is ingested against exactly those.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Iterable, Optional
+
+import dspy
+
+BATCH_URL = "/v1/chat/completions"
+
+# Connection settings of a dspy LM, not request parameters.
+_CLIENT_KWARGS = {"api_key", "api_base", "base_url"}
+
+
+def _adapter() -> dspy.Adapter:
+    return dspy.settings.adapter or dspy.ChatAdapter()
+
+
+def format_messages(signature: type[dspy.Signature], inputs: dict) -> list[dict]:
+    """Messages the configured dspy adapter would send for `signature`."""
+    return _adapter().format(signature, demos=[], inputs=inputs)
+
+
+def parse_content(signature: type[dspy.Signature], content: str) -> dict:
+    """Output fields of `signature` parsed from a response; raises if malformed."""
+    return _adapter().parse(signature, content)
+
+
+def request_body(lm: dspy.BaseLM, messages: list[dict]) -> dict:
+    """Chat completion body for `lm`: its model (without the provider prefix)
+    and sampling parameters."""
+    body = {
+        key: value
+        for key, value in lm.kwargs.items()
+        if value is not None and key not in _CLIENT_KWARGS
+    }
+    return {"model": lm.model.split("/", 1)[-1], "messages": messages, **body}
+
+
+class BatchFolder:
+    """Folder of batch request and response files, one pair per wave."""
+
+    def __init__(self, folder: str):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+
+    def requests_path(self, wave: str) -> str:
+        return os.path.join(self.folder, f"{wave}.requests.jsonl")
+
+    def responses_path(self, wave: str) -> str:
+        return os.path.join(self.folder, f"{wave}.responses.jsonl")
+
+    def results_path(self, wave: str) -> str:
+        return os.path.join(self.folder, f"{wave}.results.jsonl")
+
+    def has_responses(self, wave: str) -> bool:
+        return os.path.exists(self.responses_path(wave))
+
+    def write_requests(self, wave: str, requests: Iterable[tuple[str, dict]]) -> int:
+        """Write `(custom_id, body)` pairs as batch input lines; returns the count."""
+        count = 0
+        with open(self.requests_path(wave), "w", encoding="utf-8") as f:
+            for custom_id, body in requests:
+                line = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_URL,
+                    "body": body,
+                }
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def read_responses(self, wave: str) -> dict[str, Optional[str]]:
+        """Response content by custom_id; None for requests that failed."""
+        path = self.responses_path(wave)
+        if not os.path.exists(path):
+            raise ValueError(f"No batch responses at {path}")
+        responses = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                content = None
+                if not record.get("error") and response.get("status_code") == 200:
+                    choices = response["body"]["choices"]
+                    content = choices[0]["message"]["content"] if choices else None
+                responses[record["custom_id"]] = content
+        return responses
+
+    def write_results(self, wave: str, results: dict[str, object]):
+        with open(self.results_path(wave), "w", encoding="utf-8") as f:
+            for custom_id, result in results.items():
+                line = {"custom_id": custom_id, "result": result}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    def read_results(self, wave: str) -> dict[str, object]:
+        path = self.results_path(wave)
+        if not os.path.exists(path):
+            raise ValueError(f"No {wave} results at {path}; ingest {wave} first")
+        with open(path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return {record["custom_id"]: record["result"] for record in records}
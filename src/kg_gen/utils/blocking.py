@@ -0,0 +1,135 @@
+"""Embedding-based blocking for clustering large graphs.
+
+Asking the LM to cluster a whole graph puts every item in every prompt. A
+`Blocker` embeds the items, links each to its nearest neighbors above a
+similarity threshold, and returns the connected groups as small candidate
+blocks. Only blocks of two or more items need the LM; items without a close
+neighbor are their own cluster.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+class Blocker:
+    """Groups items into candidate blocks of similar items.
+
+    Args:
+        model: Embedding model with `encode(list[str])`, e.g. a
+            SentenceTransformer
+        max_block_size: Largest block sent to the LM; bigger groups are
+            regrouped at a higher threshold until they fit
+        threshold: Minimum cosine similarity for two items to share a block
+        neighbors: Nearest neighbors considered per item
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        max_block_size: int = 50,
+        threshold: float = 0.75,
+        neighbors: int = 10,
+    ):
+        if max_block_size < 2:
+            raise ValueError("max_block_size must be at least 2")
+        if not -1.0 <= threshold <= 1.0:
+            raise ValueError("threshold must be in [-1, 1]")
+        if neighbors < 1:
+            raise ValueError("neighbors must be at least 1")
+        self.model = model
+        self.max_block_size = max_block_size
+        self.threshold = threshold
+        self.neighbors = neighbors
+
+    def embed(self, items: Sequence[str]) -> np.ndarray:
+        """Unit-length embeddings of `items`, one row each."""
+        import numpy as np
+
+        vectors = np.asarray(self.model.encode(list(items)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def neighbor_links(
+        self, vectors: np.ndarray, threshold: float, batch_size: int = 1024
+    ) -> list[list[int]]:
+        """For each row, the rows among its nearest neighbors above `threshold`.
+
+        Similarities are computed a batch of rows at a time, so memory stays
+        at `batch_size` x len(vectors).
+        """
+        import numpy as np
+
+        count = len(vectors)
+        k = min(self.neighbors, count - 1)
+        links: list[list[int]] = [[] for _ in range(count)]
+        if k < 1:
+            return links
+        for start in range(0, count, batch_size):
+            similarities = vectors[start : start + batch_size] @ vectors.T
+            rows = np.arange(len(similarities))
+            similarities[rows, rows + start] = -np.inf
+            nearest = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            for row, candidates in enumerate(nearest):
+                close = candidates[similarities[row, candidates] >= threshold]
+                links[start + row].extend(int(j) for j in close)
+        return links
+
+    def _components(self, vectors: np.ndarray, threshold: float) -> list[list[int]]:
+        """Groups of rows connected by neighbor links, none larger than
+        `max_block_size`.
+
+        Oversized groups are usually chains of near neighbors, so they are
+        grouped again at a higher threshold, which breaks the weakest links
+        first. Groups that stay too big are cut into consecutive pieces.
+        """
+        links = self.neighbor_links(vectors, threshold)
+        groups = _DisjointSet(len(vectors))
+        for i, neighbors in enumerate(links):
+            for j in neighbors:
+                groups.union(i, j)
+        components: dict[int, list[int]] = {}
+        for i in range(len(vectors)):
+            components.setdefault(groups.find(i), []).append(i)
+
+        result = []
+        tighter = threshold + (1.0 - threshold) / 2
+        for component in components.values():
+            if len(component) <= self.max_block_size:
+                result.append(component)
+            elif tighter - threshold > 1e-3:
+                pieces = self._components(vectors[component], tighter)
+                result.extend([component[i] for i in piece] for piece in pieces)
+            else:
+                size = self.max_block_size
+                result.extend(
+                    component[i : i + size] for i in range(0, len(component), size)
+                )
+        return result
+
+    def blocks(self, items: Sequence[str]) -> list[list[str]]:
+        """Partition `items` into blocks; singletons have no close neighbor."""
+        items = sorted(items)
+        if len(items) < 2:
+            return [[item] for item in items]
+        components = self._components(self.embed(items), self.threshold)
+        return [[items[i] for i in component] for component in components]
@@ -0,0 +1,215 @@
+"""Record LM traffic to a file and replay it offline.
+
+In record mode, `RecordingLM` passes each request to the real LM and appends
+the request and its response to a JSONL cassette. `ReplayLM` then answers
+the same requests from the cassette without a provider, optionally sleeping
+to simulate latency. Full `generate` and `cluster` runs can then be timed
+offline and reproduced exactly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Callable, Literal, Optional, Union
+
+import dspy
+
+CassetteMode = Literal["record", "replay"]
+ReplayLatency = Union[None, float, Literal["recorded"], Callable[[], float]]
+
+
+# LM arguments that change the response, and so go into request keys.
+RESPONSE_ARGS = (
+    "temperature",
+    "max_tokens",
+    "max_completion_tokens",
+    "top_p",
+    "n",
+    "reasoning_effort",
+)
+
+
+def request_key(
+    model: str, prompt: Optional[str], messages: Optional[list], kwargs: dict
+) -> str:
+    """Hash of a request: the model, the prompt or messages and the arguments
+    in `kwargs` that affect the response."""
+    args = {name: kwargs[name] for name in RESPONSE_ARGS if name in kwargs}
+    payload = json.dumps(
+        [model, prompt, messages, args], sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """JSONL file of LM interactions, one line per request.
+
+    Each line holds the request key (see `request_key`), the model, the
+    messages, the response contents and usage, and the latency. Identical
+    requests are replayed in the order they were recorded, cycling once all
+    are used.
+    """
+
+    def __init__(self, path: str, mode: CassetteMode = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError("cassette mode must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.interactions: dict[str, list[dict]] = defaultdict(list)
+        self._replayed: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._file = None
+        if mode == "record":
+            self._file = open(path, "w", encoding="utf-8")
+        else:
+            self._load()
+
+    def __deepcopy__(self, memo):
+        # dspy copies LMs with deepcopy; copies must share the file.
+        return self
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self.interactions[interaction["key"]].append(interaction)
+
+    def record(self, key: str, model: str, messages, response, latency: float):
+        usage = dict(getattr(response, "usage", None) or {})
+        interaction = {
+            "key": key,
+            "model": model,
+            "messages": messages,
+            "contents": [choice.message.content for choice in response.choices],
+            # Token counts only; provider-specific detail objects are dropped.
+            "usage": {k: v for k, v in usage.items() if isinstance(v, (int, float))},
+            "latency": round(latency, 4),
+        }
+        line = json.dumps(interaction, ensure_ascii=False, default=str)
+        with self._lock:
+            self.interactions[key].append(interaction)
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def replay(self, key: str) -> dict:
+        with self._lock:
+            recorded = self.interactions.get(key)
+            if not recorded:
+                raise ValueError(
+                    f"No recorded response in {self.path} for request {key[:12]}"
+                )
+            index = self._replayed[key]
+            self._replayed[key] += 1
+        return recorded[index % len(recorded)]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RecordingLM(dspy.BaseLM):
+    """Passes requests to `lm` and records each request/response pair."""
+
+    def __init__(self, lm: dspy.BaseLM, cassette: Cassette):
+        super().__init__(model=lm.model, model_type=lm.model_type, cache=False)
+        self.kwargs = dict(lm.kwargs)
+        self.lm = lm
+        self.cassette = cassette
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        start = time.monotonic()
+        response = self.lm.forward(prompt=prompt, messages=messages, **kwargs)
+        self.cassette.record(
+            request_key(self.model, prompt, messages, {**self.kwargs, **kwargs}),
+            self.model,
+            messages,
+            response,
+            time.monotonic() - start,
+        )
+        return response
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        start = time.monotonic()
+        response = await self.lm.aforward(prompt=prompt, messages=messages, **kwargs)
+        self.cassette.record(
+            request_key(self.model, prompt, messages, {**self.kwargs, **kwargs}),
+            self.model,
+            messages,
+            response,
+            time.monotonic() - start,
+        )
+        return response
+
+
+class ReplayLM(dspy.BaseLM):
+    """Answers requests from a cassette instead of a provider.
+
+    Requests are looked up under `model` and `kwargs`, so these must match the
+    LM the cassette was recorded with.
+
+    Args:
+        cassette: Cassette opened in replay mode
+        latency: None to answer immediately, "recorded" to sleep for each
+            response's recorded latency, a number of seconds, or a callable
+            returning seconds (e.g. a sampled distribution)
+        model: Model name of the recorded LM
+        kwargs: Arguments of the recorded LM, e.g. temperature and max_tokens
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: ReplayLatency = None,
+        model: str = "replay/cassette",
+        **kwargs,
+    ):
+        super().__init__(model=model, cache=False)
+        # Only the recorded LM's arguments, without BaseLM's defaults.
+        self.kwargs = dict(kwargs)
+        self.cassette = cassette
+        self.latency = latency
+
+    def _replay(self, prompt, messages, kwargs) -> dict:
+        key = request_key(self.model, prompt, messages, {**self.kwargs, **kwargs})
+        return self.cassette.replay(key)
+
+    def _delay(self, interaction: dict) -> float:
+        if self.latency is None:
+            return 0.0
+        if self.latency == "recorded":
+            return interaction["latency"]
+        if callable(self.latency):
+            return self.latency()
+        return float(self.latency)
+
+    def _response(self, interaction: dict):
+        usage = interaction["usage"]
+        if dspy.settings.usage_tracker and usage:
+            dspy.settings.usage_tracker.add_usage(self.model, usage)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(message=SimpleNamespace(content=content))
+                for content in interaction["contents"]
+            ],
+            usage=usage,
+            model=self.model,
+        )
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        interaction = self._replay(prompt, messages, kwargs)
+        time.sleep(self._delay(interaction))
+        return self._response(interaction)
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        interaction = self._replay(prompt, messages, kwargs)
+        await asyncio.sleep(self._delay(interaction))
+        return self._response(interaction)
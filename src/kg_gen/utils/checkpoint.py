@@ -0,0 +1,156 @@
+"""Append-only log of per-chunk extraction results for resumable and incremental runs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Optional
+
+CHECKPOINT_FILENAME = "chunks.jsonl"
+
+ChunkResult = tuple[list[str], list[tuple[str, str, str]]]
+
+
+class ChunkCheckpoint:
+    """JSONL file under `output_folder` with one line per completed chunk.
+
+    Each line holds the chunk's hash and its extracted entities and relations.
+    Lines are flushed and fsynced as chunks finish, so a crashed or killed run
+    loses at most the chunks that were in flight. A truncated trailing line
+    (from a kill mid-write) is ignored on load.
+
+    Keys looked up with `get` are tracked as the current run's chunks;
+    `compact` rewrites the file to hold only those, retracting the results of
+    chunks that are no longer in the input.
+
+    `settings` (e.g. the extraction models and context) go into every key from
+    `key`, so a run with different settings does not reuse these results.
+    """
+
+    def __init__(
+        self,
+        output_folder: str,
+        resume: bool = False,
+        settings: Optional[dict[str, Any]] = None,
+    ):
+        os.makedirs(output_folder, exist_ok=True)
+        self.path = os.path.join(output_folder, CHECKPOINT_FILENAME)
+        self.settings = settings
+        self.completed: dict[str, ChunkResult] = self._load() if resume else {}
+        self.previous = set(self.completed)
+        self.current: dict[str, None] = {}
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() and not self._ends_with_newline():
+            # Terminate a line cut off by a kill so the next record starts clean.
+            self._file.write("\n")
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    @staticmethod
+    def chunk_key(
+        chunk: str,
+        is_conversation: bool,
+        extraction_mode: str,
+        settings: Optional[dict[str, Any]] = None,
+    ) -> str:
+        payload = json.dumps(
+            [chunk, is_conversation, extraction_mode, settings],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def key(self, chunk: str, is_conversation: bool, extraction_mode: str) -> str:
+        """`chunk_key` under this checkpoint's settings."""
+        return self.chunk_key(chunk, is_conversation, extraction_mode, self.settings)
+
+    def _load(self) -> dict[str, ChunkResult]:
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                completed[record["key"]] = (
+                    record["entities"],
+                    [tuple(relation) for relation in record["relations"]],
+                )
+        return completed
+
+    def get(self, key: str) -> Optional[ChunkResult]:
+        self.current[key] = None
+        return self.completed.get(key)
+
+    @staticmethod
+    def _line(key: str, entities, relations) -> str:
+        return json.dumps(
+            {
+                "key": key,
+                "entities": list(entities),
+                "relations": [list(relation) for relation in relations],
+            },
+            ensure_ascii=False,
+        )
+
+    def record(self, key: str, entities, relations):
+        line = self._line(key, entities, relations)
+        with self._lock:
+            self.completed[key] = (list(entities), list(relations))
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def compact(self) -> dict[str, int]:
+        """Rewrite the file with only this run's chunks, in input order.
+
+        Returns how many chunks were reused from the previous run, extracted
+        in this one, and retracted because they are no longer in the input.
+        """
+        with self._lock:
+            retracted = self.previous - self.current.keys()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key in self.current:
+                    f.write(self._line(key, *self.completed[key]) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            for key in retracted:
+                del self.completed[key]
+            reused = len(self.previous & self.current.keys())
+            return {
+                "reused": reused,
+                "extracted": len(self.current) - reused,
+                "retracted": len(retracted),
+            }
+
+
+def relation_provenance(output_folder: str) -> dict[tuple[str, str, str], list[str]]:
+    """Map each relation in `output_folder`'s checkpoint to the hashes of the
+    chunks it was extracted from."""
+    provenance: dict[tuple[str, str, str], list[str]] = {}
+    path = os.path.join(output_folder, CHECKPOINT_FILENAME)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            for relation in record["relations"]:
+                provenance.setdefault(tuple(relation), []).append(record["key"])
+    return provenance
@@ -1,31 +1,128 @@
 import argparse
-import nltk
+import codecs
+import io
+import mmap
+import os
+import zlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Union
+
+if TYPE_CHECKING:
+    from nltk.tokenize import PunktTokenizer
 
 
 # Ensure the punkt tokenizer is downloaded
 def ensure_nltk_resource(resource_path, resource_name):
+    import nltk
+
     try:
         nltk.data.find(resource_path)
     except LookupError:
         nltk.download(resource_name, quiet=True)
 
 
-ensure_nltk_resource("tokenizers/punkt", "punkt")
-ensure_nltk_resource("tokenizers/punkt_tab", "punkt_tab")
+@lru_cache(maxsize=None)
+def _ensure_punkt():
+    # Checked on first use rather than at import, which may hit the network.
+    ensure_nltk_resource("tokenizers/punkt", "punkt")
+    ensure_nltk_resource("tokenizers/punkt_tab", "punkt_tab")
+
+
+Tokenizer = Union[str, Callable[[str], int], Any]
+
+DEFAULT_TIKTOKEN_ENCODING = "o200k_base"
+
+
+def _approximate_token_count(text: str) -> int:
+    # ~4 characters per token, the usual rule of thumb for English text
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=None)
+def _default_token_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(DEFAULT_TIKTOKEN_ENCODING)
+    except Exception:
+        # tiktoken missing, or its encoding file can't be downloaded
+        return _approximate_token_count
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=None)
+def _named_token_counter(name: str) -> Callable[[str], int]:
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.get_encoding(name)
+        except ValueError:
+            encoding = tiktoken.encoding_for_model(name.split("/")[-1])
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        pass
+    try:
+        from transformers import AutoTokenizer
+    except ImportError as e:
+        raise ValueError(
+            f"Unknown tokenizer '{name}': not a tiktoken encoding or model, "
+            "and transformers is not installed to load it from Hugging Face"
+        ) from e
+    hf_tokenizer = AutoTokenizer.from_pretrained(name)
+    return lambda text: len(hf_tokenizer.encode(text, add_special_tokens=False))
+
+
+def get_token_counter(tokenizer: Optional[Tokenizer] = None) -> Callable[[str], int]:
+    """Resolve `tokenizer` to a function returning the token count of a string.
+
+    Accepts None (tiktoken's o200k_base, or ~4 characters per token if tiktoken
+    or its encoding is unavailable), a tiktoken encoding/model name or Hugging
+    Face tokenizer name, an object with an `encode` method (tiktoken encodings,
+    Hugging Face tokenizers), or a callable mapping text to a token count.
+    """
+    if tokenizer is None:
+        return _default_token_counter()
+    if isinstance(tokenizer, str):
+        return _named_token_counter(tokenizer)
+    if hasattr(tokenizer, "encode"):
+        return lambda text: len(tokenizer.encode(text))
+    if callable(tokenizer):
+        return tokenizer
+    raise ValueError(
+        "tokenizer must be a name, an object with an encode method, or a callable"
+    )
 
 
-def chunk_text(text: str, max_chunk_size=500) -> list[str]:
+def chunk_text(
+    text: str,
+    max_chunk_size=500,
+    chunk_size_tokens: Optional[int] = None,
+    tokenizer: Optional[Tokenizer] = None,
+) -> list[str]:
     """
     Chunk text by sentence, respecting a maximum chunk size.
     Falls back to word-based chunking if a single sentence is too large.
 
     :param text: The text to chunk.
     :param max_chunk_size: The maximum length (in characters) of any chunk.
+    :param chunk_size_tokens: If set, pack sentences up to this many tokens per
+        chunk instead of using `max_chunk_size`.
+    :param tokenizer: Tokenizer for `chunk_size_tokens`, see `get_token_counter`.
     :return: A list of text chunks.
     """
+    import nltk
+
+    _ensure_punkt()
+
     # Step 1: Split text into sentences
     sentences = nltk.sent_tokenize(text)
 
+    if chunk_size_tokens is not None:
+        return list(
+            _pack_by_tokens(sentences, chunk_size_tokens, get_token_counter(tokenizer))
+        )
+
     chunks = []
     current_chunk = ""
 
@@ -66,6 +163,222 @@ def chunk_text(text: str, max_chunk_size=500) -> list[str]:
     return chunks
 
 
+def _pack_by_tokens(
+    sentences: Iterable[str], budget: int, count_tokens: Callable[[str], int]
+) -> Iterator[str]:
+    """Greedily pack whole sentences into chunks of at most `budget` tokens.
+
+    Sentence counts are summed rather than re-tokenizing the growing chunk, so
+    each sentence is tokenized once; a sentence over budget is split by words.
+    """
+    if budget < 1:
+        raise ValueError("chunk_size_tokens must be at least 1")
+
+    current: list[str] = []
+    current_tokens = 0
+
+    for sentence in sentences:
+        tokens = count_tokens(sentence)
+        if current_tokens + tokens <= budget:
+            current.append(sentence)
+            current_tokens += tokens
+            continue
+
+        if current:
+            yield " ".join(current)
+            current, current_tokens = [], 0
+
+        if tokens <= budget:
+            current, current_tokens = [sentence], tokens
+            continue
+
+        # Sentence alone exceeds the budget: fall back to packing words.
+        words: list[str] = []
+        words_tokens = 0
+        for word in sentence.split():
+            word_tokens = count_tokens(" " + word)
+            if words and words_tokens + word_tokens > budget:
+                yield " ".join(words)
+                words, words_tokens = [], 0
+            words.append(word)
+            words_tokens += word_tokens
+        if words:
+            yield " ".join(words)
+
+    if current:
+        yield " ".join(current)
+
+
+def _pack_by_chars(sentences: Iterable[str], max_chunk_size: int) -> Iterator[str]:
+    """Same packing as `chunk_text`, with list buffers joined once per chunk."""
+    current: list[str] = []
+    current_length = 0  # length of the chunk including a trailing space
+
+    for sentence in sentences:
+        if current_length + len(sentence) + 1 <= max_chunk_size:
+            current.append(sentence)
+            current_length += len(sentence) + 1
+            continue
+
+        if current:
+            yield " ".join(current).strip()
+            current, current_length = [], 0
+
+        if len(sentence) > max_chunk_size:
+            words: list[str] = []
+            words_length = 0
+            for word in sentence.split():
+                if words_length + len(word) + 1 <= max_chunk_size:
+                    words.append(word)
+                    words_length += len(word) + 1
+                else:
+                    yield " ".join(words)
+                    words, words_length = [word], len(word) + 1
+            if words:
+                yield " ".join(words)
+        else:
+            current, current_length = [sentence], len(sentence) + 1
+
+    if current:
+        yield " ".join(current).strip()
+
+
+def _pack_content_defined(
+    sentences: Iterable[str],
+    budget: int,
+    measure: Callable[[str], int],
+    pack: Callable[[list[str]], Iterator[str]],
+) -> Iterator[str]:
+    """Cut the sentence stream where the content says so, then `pack` each piece.
+
+    A cut follows any sentence whose CRC32 is divisible by 8 once the piece
+    measures at least half the budget. Cuts depend only on the sentences since
+    the previous cut, so an edit changes the chunks around it and boundaries
+    resynchronize after it, unlike greedy packing, which shifts every later
+    chunk.
+    """
+    piece: list[str] = []
+    size = 0
+    for sentence in sentences:
+        piece.append(sentence)
+        size += measure(sentence)
+        if size >= budget // 2 and zlib.crc32(sentence.encode("utf-8")) % 8 == 0:
+            yield from pack(piece)
+            piece, size = [], 0
+    if piece:
+        yield from pack(piece)
+
+
+TextSource = Union[str, os.PathLike, io.IOBase, mmap.mmap, Iterable[str]]
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+
+def _iter_blocks(source: TextSource, block_size: int) -> Iterator[str]:
+    """Yield the text of `source` in pieces of roughly `block_size` characters.
+
+    A `str` is the text itself; only `os.PathLike` sources are opened as files.
+    """
+    if isinstance(source, str):
+        for start in range(0, len(source), block_size):
+            yield source[start : start + block_size]
+    elif isinstance(source, os.PathLike):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from _iter_blocks(mapped, block_size)
+    elif hasattr(source, "read"):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        while block := source.read(block_size):
+            if isinstance(block, bytes):
+                block = decoder.decode(block)
+            yield block
+        if tail := decoder.decode(b"", final=True):
+            yield tail
+    else:
+        yield from source
+
+
+@lru_cache(maxsize=None)
+def _punkt(language: str) -> "PunktTokenizer":
+    from nltk.tokenize import PunktTokenizer
+
+    _ensure_punkt()
+    return PunktTokenizer(language)
+
+
+def _iter_sentences(blocks: Iterable[str], language: str = "english") -> Iterator[str]:
+    """`nltk.sent_tokenize` over a stream of text blocks.
+
+    Only the last, possibly incomplete, sentence of each block is carried into
+    the next one, so memory is bounded by the block and sentence size.
+    """
+    tokenizer = _punkt(language)
+    carry = ""
+    for block in blocks:
+        buffer = carry + block
+        spans = list(tokenizer.span_tokenize(buffer))
+        if not spans:
+            carry = buffer
+            continue
+        for start, end in spans[:-1]:
+            yield buffer[start:end]
+        carry = buffer[spans[-1][0] :]
+    for start, end in tokenizer.span_tokenize(carry):
+        yield carry[start:end]
+
+
+def iter_chunks(
+    source: TextSource,
+    max_chunk_size: int = 500,
+    chunk_size_tokens: Optional[int] = None,
+    tokenizer: Optional[Tokenizer] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    content_defined: bool = False,
+) -> Iterator[str]:
+    """
+    Lazily chunk text read incrementally from `source`.
+
+    Produces the same chunks as `chunk_text` without holding the whole text,
+    its sentence list or the chunk list in memory.
+
+    :param source: Text, an `os.PathLike` path such as `pathlib.Path`
+        (memory-mapped), a file object (text or binary, read in blocks; bytes
+        are decoded as UTF-8), an mmap, or an iterable of text pieces such as
+        lines. A `str` is always chunked as text, never opened as a file.
+    :param max_chunk_size: The maximum length (in characters) of any chunk.
+    :param chunk_size_tokens: If set, pack sentences up to this many tokens per
+        chunk instead of using `max_chunk_size`.
+    :param tokenizer: Tokenizer for `chunk_size_tokens`, see `get_token_counter`.
+    :param block_size: Characters (or bytes) read from `source` at a time.
+    :param content_defined: Choose chunk boundaries from the sentences' content
+        rather than their position, so editing the text only changes the chunks
+        around the edit. Chunks respect the same size limit but are smaller on
+        average than greedily packed ones.
+    :return: An iterator of text chunks.
+    """
+    sentences = _iter_sentences(_iter_blocks(source, block_size))
+    if chunk_size_tokens is not None:
+        count_tokens = get_token_counter(tokenizer)
+        if content_defined:
+            return _pack_content_defined(
+                sentences,
+                chunk_size_tokens,
+                count_tokens,
+                lambda piece: _pack_by_tokens(piece, chunk_size_tokens, count_tokens),
+            )
+        return _pack_by_tokens(sentences, chunk_size_tokens, count_tokens)
+    if content_defined:
+        return _pack_content_defined(
+            sentences,
+            max_chunk_size,
+            lambda sentence: len(sentence) + 1,
+            lambda piece: _pack_by_chars(piece, max_chunk_size),
+        )
+    return _pack_by_chars(sentences, max_chunk_size)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Chunk large text into smaller pieces while respecting sentence boundaries."
@@ -82,6 +395,18 @@ def main():
         help="Maximum chunk size in characters (default=500).",
         default=500,
     )
+    parser.add_argument(
+        "--chunk_size_tokens",
+        type=int,
+        help="Pack chunks to this many tokens instead of --max_chunk_size characters.",
+        default=None,
+    )
+    parser.add_argument(
+        "--tokenizer",
+        type=str,
+        help="tiktoken encoding/model or Hugging Face tokenizer name for --chunk_size_tokens.",
+        default=None,
+    )
     args = parser.parse_args()
 
     # Read the input text
@@ -94,7 +419,12 @@ def main():
         text = sys.stdin.read()
 
     # Chunk the text
-    result_chunks = chunk_text(text, max_chunk_size=args.max_chunk_size)
+    result_chunks = chunk_text(
+        text,
+        max_chunk_size=args.max_chunk_size,
+        chunk_size_tokens=args.chunk_size_tokens,
+        tokenizer=args.tokenizer,
+    )
 
     # Print or otherwise process the chunks
     for i, chunk in enumerate(result_chunks, start=1):
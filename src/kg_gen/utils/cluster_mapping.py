@@ -0,0 +1,105 @@
+"""Member-to-representative lookup for clustered graphs."""
+
+from __future__ import annotations
+
+from typing import Iterable, Mapping, Optional
+
+
+class ClusterMapping:
+    """Maps every clustered item to its cluster's representative.
+
+    A union-find over item names: `add` merges a cluster into whatever
+    clusters its representative and members already belong to, so mappings
+    from several clusterings compose. Lookups are near constant time, which
+    keeps remapping relations linear in their number. Items that were never
+    added map to themselves.
+    """
+
+    def __init__(self, clusters: Optional[Mapping[str, Iterable[str]]] = None):
+        self._parent: dict[str, str] = {}
+        for representative, members in (clusters or {}).items():
+            self.add(representative, members)
+
+    @classmethod
+    def flat(cls, clusters: Mapping[str, Iterable[str]]) -> ClusterMapping:
+        """Mapping for the clusters of a single clustering.
+
+        Unlike the constructor, clusters are not merged: each member maps to
+        the representative of the first cluster listing it, and
+        representatives map to themselves even if another cluster lists them
+        as a member.
+        """
+        mapping = cls()
+        mapping.extend(clusters)
+        return mapping
+
+    def extend(self, clusters: Mapping[str, Iterable[str]]):
+        """Add the clusters of one more clustering without chaining them.
+
+        A representative that is already mapped keeps its mapping, and its
+        cluster's new members join that cluster. Items that are already
+        mapped, including representatives, are left where they are.
+        """
+        for representative in clusters:
+            self._parent.setdefault(representative, representative)
+        for representative, members in clusters.items():
+            root = self._find(representative)
+            for member in members:
+                self._parent.setdefault(member, root)
+
+    def _find(self, item: str) -> str:
+        parent = self._parent
+        root = item
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while item != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def add(self, representative: str, members: Iterable[str]):
+        """Put `representative` and `members` in one cluster.
+
+        Clusters they already belong to are merged, keeping an existing
+        representative: that of `representative`'s cluster if it has one,
+        else that of the first clustered member.
+        """
+        members = list(members)
+        root = self._find(representative)
+        if representative not in self._parent:
+            root = next(
+                (self._find(member) for member in members if member in self._parent),
+                root,
+            )
+        self._parent.setdefault(root, root)
+        self._parent.setdefault(representative, root)
+        for member in members:
+            member_root = self._find(member)
+            if member_root != root:
+                self._parent[member_root] = root
+
+    def __getitem__(self, item: str) -> str:
+        return self._find(item)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._parent
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def clusters(self) -> dict[str, set[str]]:
+        """Representatives mapped to the sets of their members."""
+        clusters: dict[str, set[str]] = {}
+        for item in self._parent:
+            clusters.setdefault(self._find(item), set()).add(item)
+        return clusters
+
+    def remap_relations(
+        self,
+        relations: Iterable[tuple[str, str, str]],
+        edges: Optional[ClusterMapping] = None,
+    ) -> set[tuple[str, str, str]]:
+        """`relations` with subjects and objects mapped by this mapping and
+        predicates by `edges`, if given."""
+        entity = self._find
+        edge = edges._find if edges is not None else str
+        return {(entity(s), edge(p), entity(o)) for s, p, o in relations}
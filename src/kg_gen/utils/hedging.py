@@ -0,0 +1,243 @@
+"""Hedged LM requests to cut tail latency.
+
+A `Hedger` watches how long requests take. When one runs past a percentile
+of the recent latencies, it sends a duplicate and returns whichever finishes
+first. Duplicates are capped at a fraction of all requests, so tail latency
+costs a bounded amount of extra spend. `HedgedLM` applies this to every call
+made through a dspy LM.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Optional
+
+import dspy
+
+from .rate_limit import RateLimiter, estimate_tokens
+
+
+class Hedger:
+    """Sends a duplicate request when the first one is slower than usual.
+
+    Args:
+        percentile: Fraction (0-1) of recent latencies a request may exceed
+            before it is hedged, e.g. 0.95 hedges the slowest ~5%
+        max_hedge_ratio: Cap on duplicates as a fraction of all requests
+        min_samples: Latencies to observe before hedging starts
+        window: Number of recent latencies the percentile is taken over
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_hedge_ratio: float = 0.1,
+        min_samples: int = 20,
+        window: int = 1000,
+    ):
+        if not 0.0 < percentile < 1.0:
+            raise ValueError("percentile must be in (0, 1)")
+        if max_hedge_ratio < 0:
+            raise ValueError("max_hedge_ratio must be non-negative")
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # dspy copies LMs with deepcopy; copies must share latencies and budget.
+        return self
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough latencies are seen."""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        return latencies[max(0, math.ceil(self.percentile * len(latencies)) - 1)]
+
+    def _observe(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def _start(self):
+        with self._lock:
+            self.requests += 1
+
+    def _hedge_affordable(self) -> bool:
+        """Whether a duplicate would currently fit within `max_hedge_ratio`."""
+        with self._lock:
+            return self.hedged + 1 <= self.max_hedge_ratio * self.requests
+
+    def _take_hedge(self) -> bool:
+        """Reserve a duplicate if it fits within `max_hedge_ratio` of requests."""
+        with self._lock:
+            if self.hedged + 1 > self.max_hedge_ratio * self.requests:
+                self.over_budget += 1
+                return False
+            self.hedged += 1
+            return True
+
+    def _won(self, index: int, latency: float):
+        """Record the winning attempt; losers' latencies would skew the percentile."""
+        self._observe(latency)
+        if index > 0:
+            with self._lock:
+                self.hedge_wins += 1
+
+    def _submit(self, fn) -> Future:
+        """Run `fn()` on its own thread, in a copy of the caller's context.
+
+        The future's result is `fn()`'s result and how long it took.
+        """
+        future: Future = Future()
+        context = contextvars.copy_context()
+        start = time.monotonic()
+
+        def run():
+            try:
+                result = context.run(fn)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                future.set_result((result, time.monotonic() - start))
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def _call_inline(self, fn, delay: Optional[float]):
+        start = time.monotonic()
+        result = fn()
+        latency = time.monotonic() - start
+        self._observe(latency)
+        if delay is not None and latency > delay:
+            with self._lock:
+                self.over_budget += 1
+        return result
+
+    def call(self, fn):
+        """Return the first successful result of `fn()` and its hedge, if one is sent.
+
+        When no hedge could be sent (too few latencies seen, or no budget left)
+        `fn()` runs on the caller's thread. Otherwise attempts run on their own
+        threads so the caller can return with whichever finishes first; a losing
+        attempt cannot be interrupted, so it finishes in the background and its
+        result is discarded.
+        """
+        self._start()
+        delay = self.delay()
+        if delay is None or not self._hedge_affordable():
+            return self._call_inline(fn, delay)
+
+        attempts = [self._submit(fn)]
+        done, _ = wait(attempts, timeout=delay)
+        if not done and self._take_hedge():
+            attempts.append(self._submit(fn))
+
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    result, latency = future.result()
+                    self._won(attempts.index(future), latency)
+                    return result
+        return attempts[0].result()
+
+    async def acall(self, fn):
+        """Async counterpart of `call`; the losing task is cancelled."""
+        self._start()
+        delay = self.delay()
+
+        async def timed():
+            start = time.monotonic()
+            result = await fn()
+            return result, time.monotonic() - start
+
+        attempts = [asyncio.ensure_future(timed())]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and self._take_hedge():
+                attempts.append(asyncio.ensure_future(timed()))
+
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        result, latency = task.result()
+                        self._won(attempts.index(task), latency)
+                        return result
+            return attempts[0].result()
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    def stats(self) -> dict[str, float]:
+        delay = self.delay()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "over_budget": self.over_budget,
+                "delay_seconds": round(delay, 3) if delay is not None else None,
+            }
+
+
+class HedgedLM(dspy.LM):
+    """dspy LM whose provider calls are hedged by a shared `Hedger`.
+
+    With a `RateLimiter`, each request and each duplicate draws from its
+    budget separately, and the limiter handles retries as in `RateLimitedLM`.
+    """
+
+    def __init__(
+        self,
+        *args,
+        hedger: Hedger,
+        rate_limiter: Optional[RateLimiter] = None,
+        **kwargs,
+    ):
+        if rate_limiter is not None:
+            kwargs["num_retries"] = 0
+        super().__init__(*args, **kwargs)
+        self.hedger = hedger
+        self.rate_limiter = rate_limiter
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        def attempt():
+            call = lambda: super(HedgedLM, self).forward(  # noqa: E731
+                prompt=prompt, messages=messages, **kwargs
+            )
+            if self.rate_limiter is None:
+                return call()
+            return self.rate_limiter.call(call, estimate_tokens(prompt, messages))
+
+        return self.hedger.call(attempt)
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        async def attempt():
+            call = lambda: super(HedgedLM, self).aforward(  # noqa: E731
+                prompt=prompt, messages=messages, **kwargs
+            )
+            if self.rate_limiter is None:
+                return await call()
+            return await self.rate_limiter.acall(
+                call, estimate_tokens(prompt, messages)
+            )
+
+        return await self.hedger.acall(attempt)
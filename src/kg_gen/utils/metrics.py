@@ -0,0 +1,163 @@
+"""Per-stage latency and token usage for the LM-backed steps of kg-gen.
+
+`KGGen` reports each step it runs (entity or relation extraction for a chunk,
+joint extraction, clustering) to its `callbacks` as a `CallEvent`.
+`MetricsCollector` is a callback that keeps the events and summarizes them
+per stage.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence
+
+from dspy.utils.usage_tracker import track_usage
+
+
+@dataclass
+class CallEvent:
+    """One step of the pipeline, passed to `on_call_start` and `on_call_end`.
+
+    Usage fields are filled in before `on_call_end`. Tokens and `lm_calls` are
+    taken from dspy's usage tracker, so they count requests that reached the
+    provider through a `dspy.LM` (cache hits are not counted). `lm_calls` above
+    one for a relations step means the fallback path ran.
+    """
+
+    stage: str
+    chunk_index: Optional[int] = None
+    latency: float = 0.0
+    lm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    error: Optional[BaseException] = None
+
+
+class MetricsCallback:
+    """Base class for `KGGen(callbacks=[...])`; override either hook."""
+
+    def on_call_start(self, event: CallEvent):
+        pass
+
+    def on_call_end(self, event: CallEvent):
+        pass
+
+
+_current_event: ContextVar[Optional[CallEvent]] = ContextVar(
+    "kg_gen_current_event", default=None
+)
+
+
+def note_retry():
+    """Count a retry against the step running in the current context."""
+    event = _current_event.get()
+    if event is not None:
+        event.retries += 1
+
+
+@contextmanager
+def track_call(
+    callbacks: Sequence[MetricsCallback], stage: str, chunk_index: Optional[int] = None
+) -> Iterator[Optional[CallEvent]]:
+    """Time the enclosed step and report it to `callbacks`; a no-op without any."""
+    if not callbacks:
+        yield None
+        return
+
+    event = CallEvent(stage=stage, chunk_index=chunk_index)
+    for callback in callbacks:
+        callback.on_call_start(event)
+    token = _current_event.set(event)
+    start = time.perf_counter()
+    try:
+        with track_usage() as tracker:
+            yield event
+    except BaseException as error:
+        event.error = error
+        raise
+    finally:
+        event.latency = time.perf_counter() - start
+        _current_event.reset(token)
+        for entries in tracker.usage_data.values():
+            for usage in entries:
+                event.lm_calls += 1
+                event.prompt_tokens += usage.get("prompt_tokens") or 0
+                event.completion_tokens += usage.get("completion_tokens") or 0
+        for callback in callbacks:
+            callback.on_call_end(event)
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted `values`."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class MetricsCollector(MetricsCallback):
+    """Collects every finished `CallEvent` and summarizes them per stage."""
+
+    def __init__(self):
+        self.events: list[CallEvent] = []
+        self._lock = threading.Lock()
+
+    def on_call_end(self, event: CallEvent):
+        with self._lock:
+            self.events.append(event)
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Per-stage counts, token totals and latency (seconds) statistics."""
+        with self._lock:
+            events = list(self.events)
+        by_stage: dict[str, list[CallEvent]] = defaultdict(list)
+        for event in events:
+            by_stage[event.stage].append(event)
+
+        summary = {}
+        for stage, stage_events in by_stage.items():
+            latencies = sorted(event.latency for event in stage_events)
+            summary[stage] = {
+                "calls": len(stage_events),
+                "errors": sum(event.error is not None for event in stage_events),
+                "lm_calls": sum(event.lm_calls for event in stage_events),
+                "retries": sum(event.retries for event in stage_events),
+                "prompt_tokens": sum(event.prompt_tokens for event in stage_events),
+                "completion_tokens": sum(
+                    event.completion_tokens for event in stage_events
+                ),
+                "total_seconds": round(sum(latencies), 4),
+                "mean_seconds": round(sum(latencies) / len(latencies), 4),
+                "p50_seconds": round(_percentile(latencies, 0.5), 4),
+                "p95_seconds": round(_percentile(latencies, 0.95), 4),
+            }
+        return summary
+
+    def report(self) -> str:
+        """`summary()` as a fixed-width table, one row per stage."""
+        columns = [
+            "calls",
+            "errors",
+            "lm_calls",
+            "retries",
+            "prompt_tokens",
+            "completion_tokens",
+            "mean_seconds",
+            "p95_seconds",
+        ]
+        rows = [["stage", *columns]]
+        for stage, stats in self.summary().items():
+            rows.append([stage, *(str(stats[column]) for column in columns)])
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+            for row in rows
+        )
@@ -0,0 +1,151 @@
+"""Deterministic normalization that merges trivial duplicates before clustering.
+
+Case, Unicode, punctuation and inflection variants ("Cat", "cats", "liking",
+"likes") are common in extracted graphs. Merging them locally leaves the LM
+only the items whose relation needs judgement.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Callable, Iterable, Literal, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Punctuation that only joins, wraps or ends words. Other symbols ("#", "+",
+# "&") can tell items apart, as in "C", "C#" and "C++", so they are kept.
+SEPARATORS = re.compile(
+    r"[\s\-\u2010-\u2015_/.,;:!?'\"\u2018\u2019\u201c\u201d()\[\]{}]+"
+)
+# Calls the LM clustering loop spends on each cluster: extraction, validation
+# and choosing a representative.
+CALLS_PER_CLUSTER = 3
+
+# Reduces a word to its lemma for a WordNet part of speech, "n" or "v".
+Lemmatizer = Callable[[str, str], str]
+
+
+@lru_cache(maxsize=None)
+def default_lemmatizer() -> Optional[Lemmatizer]:
+    """NLTK's WordNet lemmatizer, or None if the WordNet data is unavailable.
+
+    The data is downloaded on first use if it is not installed.
+    """
+    from nltk.stem import WordNetLemmatizer
+
+    from .chunk_text import ensure_nltk_resource
+
+    # Checked on first use rather than at import, which may hit the network.
+    ensure_nltk_resource("corpora/wordnet", "wordnet")
+    lemmatizer = WordNetLemmatizer()
+    try:
+        lemmatizer.lemmatize("cats")
+    except LookupError:
+        logger.warning(
+            "WordNet data could not be downloaded, so inflections are not "
+            'merged. Pass lemmatize="stem" to use the Porter stemmer instead'
+        )
+        return None
+    return lemmatizer.lemmatize
+
+
+@lru_cache(maxsize=None)
+def porter_stemmer() -> Lemmatizer:
+    """NLTK's Porter stemmer, which ignores the part of speech."""
+    from nltk.stem import PorterStemmer
+
+    stem = PorterStemmer().stem
+    return lambda word, pos: stem(word)
+
+
+class Normalizer:
+    """Groups items whose normalized forms are equal.
+
+    Args:
+        casefold: Ignore case
+        unicode: Apply NFKC normalization, so e.g. full-width and ligature
+            characters match their plain forms
+        punctuation: Ignore punctuation that joins, wraps or ends words, and
+            repeated whitespace. Symbols such as "#" and "+" are kept
+        lemmatize: Reduce each word to its lemma with `default_lemmatizer`
+            when True, to its stem with NLTK's Porter stemmer when "stem",
+            with the given `Lemmatizer` when callable, or not at all. Entity
+            words are lemmatized as nouns only, so names such as "Rose" are
+            not read as verbs; edge words as verbs, then as nouns. Stemming
+            also merges some related words, such as "universe" and
+            "university"
+    """
+
+    def __init__(
+        self,
+        casefold: bool = True,
+        unicode: bool = True,
+        punctuation: bool = True,
+        lemmatize: Union[bool, Literal["stem"], Lemmatizer] = True,
+    ):
+        self.casefold = casefold
+        self.unicode = unicode
+        self.punctuation = punctuation
+        self.lemmatize = lemmatize
+        self.stats: dict[str, dict[str, int]] = {}
+
+    def _lemmatizer(self) -> Optional[Lemmatizer]:
+        if callable(self.lemmatize):
+            return self.lemmatize
+        if self.lemmatize == "stem":
+            return porter_stemmer()
+        return default_lemmatizer() if self.lemmatize else None
+
+    def key(self, item: str, item_type: str = "entities") -> str:
+        """The normalized form of `item`, an entity or an edge."""
+        if self.unicode:
+            item = unicodedata.normalize("NFKC", item)
+        if self.casefold:
+            item = item.casefold()
+        words = SEPARATORS.split(item) if self.punctuation else item.split()
+        words = [word for word in words if word]
+        if not words:
+            # Only punctuation: keep it, so "-" and "." stay apart.
+            return item.strip()
+        lemmatize = self._lemmatizer()
+        if lemmatize is not None:
+
+            def lemma(word: str) -> str:
+                if item_type == "edges":
+                    verb = lemmatize(word, "v")
+                    if verb != word:
+                        return verb
+                return lemmatize(word, "n")
+
+            words = [lemma(word) if word.isalpha() else word for word in words]
+        return " ".join(words)
+
+    def groups(
+        self, items: Iterable[str], item_type: str = "entities"
+    ) -> dict[str, set[str]]:
+        """Items grouped by normalized form, keyed by each group's shortest
+        member."""
+        by_key: dict[str, set[str]] = {}
+        for item in items:
+            by_key.setdefault(self.key(item, item_type), set()).add(item)
+        return {
+            min(group, key=lambda item: (len(item), item)): group
+            for group in by_key.values()
+        }
+
+    def pre_merge(self, items: Iterable[str], item_type: str) -> dict[str, set[str]]:
+        """`groups` of `items`, recording in `stats[item_type]` how many items
+        were merged and an estimate of the LM calls that saved."""
+        items = set(items)
+        groups = self.groups(items, item_type)
+        merged_groups = sum(len(group) > 1 for group in groups.values())
+        self.stats[item_type] = {
+            "items": len(items),
+            "sent_to_lm": len(groups),
+            "merged_groups": merged_groups,
+            "estimated_lm_calls_avoided": CALLS_PER_CLUSTER * merged_groups,
+        }
+        return groups
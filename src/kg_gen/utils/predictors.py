@@ -0,0 +1,40 @@
+"""Shared dspy predictors, built once per signature instead of once per chunk,
+and routing of each pipeline stage to its own LM."""
+
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Mapping, Optional
+
+import dspy
+
+STAGES = (
+    "entities",
+    "relations",
+    "fix_relations",
+    "joint",
+    "extract_cluster",
+    "validate_cluster",
+    "choose_representative",
+    "check_existing_clusters",
+)
+
+
+@lru_cache(maxsize=256)
+def cached_predict(signature: type[dspy.Signature]) -> dspy.Predict:
+    """Return a predictor for `signature`, reused across chunks and threads.
+
+    Predictors carry no per-call state (the LM comes from the dspy context at
+    call time), so one instance can serve concurrent chunks. Signatures should
+    themselves be memoized so equal signatures map to the same class.
+    """
+    return dspy.Predict(signature)
+
+
+def stage_lm(lms: Optional[Mapping[str, dspy.BaseLM]], stage: str):
+    """Context that routes dspy calls to the LM configured for `stage`.
+
+    A no-op when `lms` has no LM for the stage, leaving the LM already in the
+    dspy context in place.
+    """
+    lm = lms.get(stage) if lms else None
+    return dspy.context(lm=lm) if lm is not None else nullcontext()
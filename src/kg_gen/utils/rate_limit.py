@@ -0,0 +1,358 @@
+"""Client-side rate limiting for LM calls.
+
+A `RateLimiter` combines requests-per-minute and tokens-per-minute token buckets
+with an AIMD (additive-increase / multiplicative-decrease) cap on in-flight
+requests. `RateLimitedLM` applies it to every call made through a dspy LM, so
+extraction, clustering and anything else sharing the LM draw from one budget.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+import dspy
+
+from .metrics import note_retry
+
+# litellm is imported on first use so `import kg_gen` does not pay for it.
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    import litellm
+
+    return (
+        isinstance(error, litellm.RateLimitError)
+        or getattr(error, "status_code", None) == 429
+    )
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Transient provider failures worth retrying, apart from rate limits."""
+    import litellm
+
+    return isinstance(
+        error,
+        (
+            litellm.Timeout,
+            litellm.APIConnectionError,
+            litellm.InternalServerError,
+            litellm.ServiceUnavailableError,
+        ),
+    )
+
+
+def estimate_tokens(
+    prompt: Optional[str] = None, messages: Optional[list] = None
+) -> int:
+    """Rough prompt token count (~4 characters per token) used before a call is made."""
+    text = prompt or ""
+    for message in messages or []:
+        content = message.get("content")
+        text += content if isinstance(content, str) else str(content)
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` tokens per minute.
+
+    Callers reserve tokens up front and sleep off any deficit outside the lock,
+    so the same bucket serves threads and coroutines.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens and return how long the caller must wait for them."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float):
+        """Return tokens (negative amounts charge extra, e.g. after measuring usage)."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on concurrent requests.
+
+    The limit grows by roughly one slot per `limit` healthy completions and is
+    multiplied by `decrease_factor` on a rate-limit error (at most once per
+    `cooldown` seconds, so one burst of 429s only backs off once). A completion
+    is healthy when its latency is within `latency_tolerance` times the best
+    smoothed latency seen so far.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        cooldown: float = 1.0,
+    ):
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._smoothed_latency: Optional[float] = None
+        self._baseline_latency: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(self.min_limit, int(self.limit))
+
+    def acquire(self):
+        with self._condition:
+            while not self._has_capacity():
+                self._condition.wait()
+            self.in_flight += 1
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if not self._has_capacity():
+                return False
+            self.in_flight += 1
+            return True
+
+    async def aacquire(self, poll_interval: float = 0.01):
+        while not self.try_acquire():
+            await asyncio.sleep(poll_interval)
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self, latency: float):
+        with self._condition:
+            if self._smoothed_latency is None:
+                self._smoothed_latency = latency
+            else:
+                self._smoothed_latency = 0.8 * self._smoothed_latency + 0.2 * latency
+            if self._baseline_latency is None:
+                self._baseline_latency = self._smoothed_latency
+            else:
+                self._baseline_latency = min(
+                    self._baseline_latency, self._smoothed_latency
+                )
+
+            if latency <= self._baseline_latency * self.latency_tolerance:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self._condition.notify_all()
+
+    def on_rate_limit(self):
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+
+class RateLimiter:
+    """Shared budget for LM calls: RPM/TPM token buckets plus adaptive concurrency.
+
+    Args:
+        requests_per_minute: Request budget, unlimited when None
+        tokens_per_minute: Token budget (prompt + completion), unlimited when None
+        max_concurrency: Upper bound on in-flight requests
+        adaptive: Adjust the in-flight cap with AIMD instead of holding it fixed
+        max_retries: Retries for rate-limit and transient provider errors
+        backoff: Base delay in seconds for exponential backoff between retries
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: int = 16,
+        adaptive: bool = True,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(
+            initial_limit=max(1, max_concurrency // 2) if adaptive else max_concurrency,
+            max_limit=max_concurrency,
+            min_limit=1 if adaptive else max_concurrency,
+        )
+        self.adaptive = adaptive
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limited = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # dspy copies LMs with deepcopy; copies must keep drawing from this budget.
+        return self
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        if wait:
+            with self._lock:
+                self.throttled_seconds += wait
+        return wait
+
+    def _settle(self, estimated_tokens: int, used_tokens: Optional[int]):
+        if self.tokens is not None and used_tokens is not None:
+            self.tokens.refund(estimated_tokens - used_tokens)
+
+    def _retry_delay(self, attempt: int) -> float:
+        return self.backoff * (2**attempt) * (0.5 + random.random() / 2)
+
+    def _record_failure(self, error: BaseException, attempt: int) -> bool:
+        """Update counters for a failed attempt; returns whether to retry."""
+        rate_limited = is_rate_limit_error(error)
+        if not rate_limited and not is_retryable_error(error):
+            return False
+        if rate_limited:
+            with self._lock:
+                self.rate_limited += 1
+            if self.adaptive:
+                self.concurrency.on_rate_limit()
+        if attempt >= self.max_retries:
+            return False
+        with self._lock:
+            self.retries += 1
+        note_retry()
+        return True
+
+    def call(self, fn, estimated_tokens: int):
+        """Run `fn()` within the budget, retrying rate-limit and transient errors."""
+        attempt = 0
+        while True:
+            wait = self._reserve(estimated_tokens)
+            if wait:
+                time.sleep(wait)
+            with self._slot():
+                start = time.monotonic()
+                try:
+                    response = fn()
+                except Exception as error:
+                    if not self._record_failure(error, attempt):
+                        raise
+                else:
+                    self._on_response(response, estimated_tokens, start)
+                    return response
+            time.sleep(self._retry_delay(attempt))
+            attempt += 1
+
+    async def acall(self, fn, estimated_tokens: int):
+        """Async counterpart of `call`; `fn()` must return an awaitable."""
+        attempt = 0
+        while True:
+            wait = self._reserve(estimated_tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            async with self._aslot():
+                start = time.monotonic()
+                try:
+                    response = await fn()
+                except Exception as error:
+                    if not self._record_failure(error, attempt):
+                        raise
+                else:
+                    self._on_response(response, estimated_tokens, start)
+                    return response
+            await asyncio.sleep(self._retry_delay(attempt))
+            attempt += 1
+
+    def _on_response(self, response, estimated_tokens: int, start: float):
+        if getattr(response, "cache_hit", False):
+            # Served from dspy's cache; nothing was sent to the provider.
+            if self.requests is not None:
+                self.requests.refund(1)
+            self._settle(estimated_tokens, 0)
+            return
+        usage = getattr(response, "usage", None)
+        used_tokens = dict(usage).get("total_tokens") if usage else None
+        self._settle(estimated_tokens, used_tokens)
+        if self.adaptive:
+            self.concurrency.on_success(time.monotonic() - start)
+
+    @contextmanager
+    def _slot(self):
+        self.concurrency.acquire()
+        try:
+            yield
+        finally:
+            self.concurrency.release()
+
+    @asynccontextmanager
+    async def _aslot(self):
+        await self.concurrency.aacquire()
+        try:
+            yield
+        finally:
+            self.concurrency.release()
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+
+
+class RateLimitedLM(dspy.LM):
+    """dspy LM whose provider calls go through a shared `RateLimiter`.
+
+    Retries are handled by the limiter (so rate-limit errors feed back into
+    the concurrency cap) instead of LiteLLM's own retry loop.
+    """
+
+    def __init__(self, *args, rate_limiter: RateLimiter, **kwargs):
+        kwargs["num_retries"] = 0
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        return self.rate_limiter.call(
+            lambda: super(RateLimitedLM, self).forward(
+                prompt=prompt, messages=messages, **kwargs
+            ),
+            estimate_tokens(prompt, messages),
+        )
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        return await self.rate_limiter.acall(
+            lambda: super(RateLimitedLM, self).aforward(
+                prompt=prompt, messages=messages, **kwargs
+            ),
+            estimate_tokens(prompt, messages),
+        )
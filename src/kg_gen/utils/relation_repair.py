@@ -0,0 +1,125 @@
+"""Deterministic snapping of relation subjects/objects onto extracted entities.
+
+Used by `get_relations` when strict extraction fails, and on every joint
+extraction: relations whose subject and object can be matched to the entity
+list locally skip the `FixedRelations` LLM call, which then only sees the
+residue.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from difflib import SequenceMatcher
+from typing import Optional
+
+_ARTICLES = {"a", "an", "the"}
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Casefold, drop punctuation and leading articles, collapse whitespace."""
+    tokens = _TOKEN_PATTERN.findall(text.casefold())
+    while len(tokens) > 1 and tokens[0] in _ARTICLES:
+        tokens = tokens[1:]
+    return " ".join(tokens)
+
+
+class EntityMatcher:
+    """Resolve free-form strings to the closest entity in a fixed list.
+
+    Matching is tried in order: exact string, normalized string, normalized
+    token set (word order ignored), then `difflib` similarity of the normalized
+    strings. A similarity match must reach `threshold` and beat every other
+    candidate; ties are left unresolved rather than guessed.
+    """
+
+    def __init__(self, entities: list[str], threshold: float = 0.85):
+        self.threshold = threshold
+        self.entities = set(entities)
+        self.by_normalized: dict[str, str] = {}
+        self.by_token_set: dict[frozenset[str], str] = {}
+        for entity in entities:
+            normalized = normalize(entity)
+            self.by_normalized.setdefault(normalized, entity)
+            self.by_token_set.setdefault(frozenset(normalized.split()), entity)
+
+    def match(self, text: str) -> Optional[str]:
+        if text in self.entities:
+            return text
+        normalized = normalize(text)
+        if normalized in self.by_normalized:
+            return self.by_normalized[normalized]
+        token_set = frozenset(normalized.split())
+        if token_set in self.by_token_set:
+            return self.by_token_set[token_set]
+        return self._closest(normalized)
+
+    def _closest(self, normalized: str) -> Optional[str]:
+        best, best_score, tied = None, 0.0, False
+        matcher = SequenceMatcher(b=normalized, autojunk=False)
+        for candidate, entity in self.by_normalized.items():
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < self.threshold:
+                continue
+            if matcher.quick_ratio() < self.threshold:
+                continue
+            score = matcher.ratio()
+            if score > best_score:
+                best, best_score, tied = entity, score, False
+            elif score == best_score:
+                tied = True
+        if best_score >= self.threshold and not tied:
+            return best
+        return None
+
+
+class RelationRepairer:
+    """Local relation repair with counters for each path `get_relations` takes.
+
+    Counters (per `get_relations` or joint extraction call):
+        strict: strict extraction succeeded, no repair needed
+        local: fallback relations were all repaired locally, no LLM fix call
+        llm_fix: the LLM fix call ran on the relations local repair couldn't match
+    plus relation totals `repaired_locally` and `sent_to_llm`.
+
+    Args:
+        threshold: Minimum `difflib` similarity (0-1) for a fuzzy match
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.counts = {
+            "strict": 0,
+            "local": 0,
+            "llm_fix": 0,
+            "repaired_locally": 0,
+            "sent_to_llm": 0,
+        }
+        self._lock = threading.Lock()
+
+    def repair(self, relations, entities: list[str]) -> tuple[list[tuple], list]:
+        """Split relations into repaired (subject, predicate, object) tuples and
+        the residue whose subject or object could not be matched."""
+        matcher = EntityMatcher(entities, self.threshold)
+        repaired, residue = [], []
+        for relation in relations:
+            subject = matcher.match(relation.subject)
+            obj = matcher.match(relation.object)
+            if subject is None or obj is None:
+                residue.append(relation)
+            else:
+                repaired.append((subject, relation.predicate, obj))
+        return repaired, residue
+
+    def record(self, path: str, repaired: int = 0, sent_to_llm: int = 0):
+        with self._lock:
+            self.counts[path] += 1
+            self.counts["repaired_locally"] += repaired
+            self.counts["sent_to_llm"] += sent_to_llm
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
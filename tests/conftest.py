@@ -0,0 +1,129 @@
+"""
+Shared fixtures for offline tests.
+
+`FakeLM` stands in for a real provider so the pipeline can be exercised without
+API keys: it reads the dspy ChatAdapter prompt, works out which signature is
+being asked for and answers it from the prompt itself.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import dspy
+import pytest
+
+from benchmarks._prompt_parsing import (
+    format_answer,
+    input_fields,
+    output_fields,
+    parse_list,
+)
+
+
+class FakeLM(dspy.BaseLM):
+    """Deterministic offline LM for kg-gen signatures.
+
+    Entities are the capitalised words of the source text, relations chain
+    consecutive entities with "relates to", and clustering signatures find
+    nothing to merge.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(model="fake/kg-gen", cache=False)
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, messages) -> str:
+        outputs = output_fields(messages[0]["content"])
+        inputs = input_fields(messages[-1]["content"])
+        answer = {}
+        for field in outputs:
+            if field == "entities":
+                words = re.findall(r"\b[A-Z][a-z]+\b", inputs.get("source_text", ""))
+                answer[field] = sorted(set(words))
+            elif field in ("relations", "fixed_relations"):
+                entities = (
+                    parse_list(inputs["entities"])
+                    if "entities" in inputs
+                    else answer.get("entities", [])
+                )
+                answer[field] = [
+                    {"subject": s, "predicate": "relates to", "object": o}
+                    for s, o in zip(entities, entities[1:])
+                ]
+            elif field == "representative":
+                answer[field] = sorted(parse_list(inputs.get("cluster", "[]")))[0]
+            elif field == "reasoning":
+                answer[field] = "Not applicable."
+            else:
+                answer[field] = []
+        return format_answer(answer)
+
+    def _response(self, messages):
+        content = self._answer(messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage={
+                "prompt_tokens": sum(len(m["content"]) for m in messages) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": 0,
+            },
+            model=self.model,
+        )
+
+    def _enter(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            return self._response(messages)
+        finally:
+            self._exit()
+
+    async def aforward(self, prompt=None, messages=None, **kwargs):
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+            return self._response(messages)
+        finally:
+            self._exit()
+
+
+def record_as_provider(kg, lm: dspy.BaseLM):
+    """Wrap `lm` to record on `kg`'s cassette as the provider LM `kg` built, so
+    a replay with the same configuration finds its answers."""
+    from src.kg_gen.utils.cassette import RecordingLM
+
+    lm.model = kg.lm.model
+    lm.kwargs = dict(kg.lm.kwargs)
+    return RecordingLM(lm, kg.cassette)
+
+
+@pytest.fixture
+def fake_lm():
+    return FakeLM()
+
+
+@pytest.fixture
+def offline_kg(fake_lm):
+    """KGGen wired to the offline FakeLM."""
+    from src.kg_gen import KGGen
+
+    kg = KGGen(api_key="dummy-key")
+    kg.lm = fake_lm
+    return kg
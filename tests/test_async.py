@@ -0,0 +1,103 @@
+import asyncio
+
+from benchmarks._prompt_parsing import input_fields
+from conftest import FakeLM
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+
+TEXT = "Linda is the mother of Josh. Ben is the brother of Josh. Andrew is the father of Josh."
+
+
+def test_agenerate_matches_generate(offline_kg: KGGen):
+    sync_graph = offline_kg.generate(input_data=TEXT)
+    async_graph = asyncio.run(offline_kg.agenerate(input_data=TEXT))
+
+    assert async_graph.entities == sync_graph.entities
+    assert async_graph.relations == sync_graph.relations
+    assert {"Linda", "Josh", "Ben", "Andrew"} <= async_graph.entities
+
+
+def test_agenerate_chunked_respects_max_concurrency(offline_kg: KGGen, fake_lm):
+    fake_lm.latency = 0.01
+    offline_kg.max_concurrency = 2
+
+    graph = asyncio.run(offline_kg.agenerate(input_data=TEXT, chunk_size=30))
+
+    assert {"Linda", "Ben", "Andrew", "Josh"} <= graph.entities
+    # Each chunk holds a semaphore slot across its entity and relation calls.
+    assert 1 <= fake_lm.max_in_flight <= 2
+
+
+def test_concurrent_agenerate_calls_share_semaphore(offline_kg: KGGen, fake_lm):
+    fake_lm.latency = 0.01
+    offline_kg.max_concurrency = 3
+
+    async def run_many():
+        return await asyncio.gather(
+            *(offline_kg.agenerate(input_data=TEXT, chunk_size=30) for _ in range(4))
+        )
+
+    graphs = asyncio.run(run_many())
+
+    assert len(graphs) == 4
+    assert fake_lm.max_in_flight <= 3
+
+
+class RecordingLM(FakeLM):
+    """FakeLM that records the source text of every prompt it answers."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(latency)
+        self.texts: set[str] = set()
+
+    def _answer(self, messages) -> str:
+        text = input_fields(messages[-1]["content"]).get("source_text")
+        if text:
+            with self._lock:
+                self.texts.add(text)
+        return super()._answer(messages)
+
+
+def test_concurrent_agenerate_calls_keep_their_own_lm():
+    kg = KGGen(api_key="dummy-key")
+    lm_a, lm_b = RecordingLM(latency=0.01), RecordingLM(latency=0.01)
+
+    async def run(lm, text):
+        kg.lm = lm
+        return await kg.agenerate(input_data=text, chunk_size=30)
+
+    async def run_both():
+        return await asyncio.gather(
+            run(lm_a, TEXT), run(lm_b, "Anna met Carl in Oslo.")
+        )
+
+    graph_a, graph_b = asyncio.run(run_both())
+
+    assert {"Linda", "Josh"} <= graph_a.entities
+    assert "Anna" not in graph_a.entities
+    assert graph_b.entities == {"Anna", "Carl", "Oslo"}
+    assert lm_a.texts and all("Anna" not in text for text in lm_a.texts)
+    assert lm_b.texts and all("Josh" not in text for text in lm_b.texts)
+
+
+def test_agenerate_conversation(offline_kg: KGGen):
+    messages = [
+        {"role": "user", "content": "What is the capital of France?"},
+        {"role": "assistant", "content": "The capital of France is Paris."},
+    ]
+    graph = asyncio.run(offline_kg.agenerate(input_data=messages))
+
+    assert {"France", "Paris"} <= graph.entities
+
+
+def test_acluster(offline_kg: KGGen):
+    graph = Graph(
+        entities={"cat", "dog"},
+        edges={"chases"},
+        relations={("dog", "chases", "cat")},
+    )
+
+    clustered = asyncio.run(offline_kg.acluster(graph))
+
+    assert clustered.entities == {"cat", "dog"}
+    assert clustered.relations == {("dog", "chases", "cat")}
@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+from src.kg_gen.utils.batch import BATCH_URL
+
+TEXT = "Linda is the mother of Josh. Ben is the brother of Josh. Andrew is the father of Josh."
+
+
+def answer_batch(fake_lm, folder, wave, fail=(), rewrite=lambda content: content):
+    """Answer a wave's request file as a provider batch would, failing the
+    requests at indices in `fail` and passing answers through `rewrite`."""
+    lines = (folder / f"{wave}.requests.jsonl").read_text().splitlines()
+    with open(folder / f"{wave}.responses.jsonl", "w") as f:
+        for index, line in enumerate(map(json.loads, lines)):
+            if index in fail:
+                response, error = None, {"code": "server_error", "message": "boom"}
+            else:
+                content = rewrite(fake_lm._answer(line["body"]["messages"]))
+                body = {"choices": [{"message": {"content": content}}]}
+                response, error = {"status_code": 200, "body": body}, None
+            record = {"custom_id": line["custom_id"], "response": response}
+            f.write(json.dumps({**record, "error": error}) + "\n")
+
+
+def test_export_writes_batch_requests(offline_kg, fake_lm, tmp_path):
+    graph = offline_kg.generate(
+        input_data=TEXT, chunk_size=30, batch="export", batch_folder=tmp_path
+    )
+
+    assert graph.entities == set() and graph.relations == set()
+    assert fake_lm.calls == 0
+    lines = [
+        json.loads(line)
+        for line in (tmp_path / "entities.requests.jsonl").read_text().splitlines()
+    ]
+    assert len(lines) == offline_kg.batch_stats["exported"] == 3
+    assert lines[0]["custom_id"].startswith("entities-0-")
+    assert lines[0]["method"] == "POST" and lines[0]["url"] == BATCH_URL
+    assert lines[0]["body"]["model"] == "kg-gen"
+    assert "Linda" in lines[0]["body"]["messages"][-1]["content"]
+
+
+def test_batch_round_trip_matches_synchronous_run(offline_kg, fake_lm, tmp_path):
+    expected = offline_kg.generate(input_data=TEXT, chunk_size=30)
+    fake_lm.calls = 0
+
+    offline_kg.generate(
+        input_data=TEXT, chunk_size=30, batch="export", batch_folder=tmp_path
+    )
+    answer_batch(fake_lm, tmp_path, "entities")
+    partial = offline_kg.generate(
+        input_data=TEXT, chunk_size=30, batch="ingest", batch_folder=tmp_path
+    )
+    assert partial.entities == expected.entities
+    assert partial.relations == set()
+    assert offline_kg.batch_stats == {"exported": 3, "ingested": 3, "fallback": 0}
+
+    answer_batch(fake_lm, tmp_path, "relations")
+    graph = offline_kg.generate(
+        input_data=TEXT, chunk_size=30, batch="ingest", batch_folder=tmp_path
+    )
+    assert graph == expected
+    assert fake_lm.calls == 0
+
+
+def test_joint_batch_is_one_wave(offline_kg, fake_lm, tmp_path):
+    expected = offline_kg.generate(
+        input_data=TEXT, chunk_size=30, extraction_mode="joint"
+    )
+    kwargs = dict(
+        input_data=TEXT,
+        chunk_size=30,
+        extraction_mode="joint",
+        batch_folder=tmp_path,
+    )
+
+    offline_kg.generate(batch="export", **kwargs)
+    answer_batch(fake_lm, tmp_path, "joint")
+    graph = offline_kg.generate(batch="ingest", **kwargs)
+
+    assert graph == expected
+    assert not (tmp_path / "relations.requests.jsonl").exists()
+
+
+def test_joint_batch_repairs_relations_onto_entities(offline_kg, fake_lm, tmp_path):
+    kwargs = dict(input_data=TEXT, extraction_mode="joint", batch_folder=tmp_path)
+    offline_kg.generate(batch="export", **kwargs)
+
+    def rewrite(content):
+        # One endpoint close to an entity, one matching no entity at all.
+        return content.replace(
+            '"subject": "Andrew"', '"subject": "the andrew"'
+        ).replace('"object": "Linda"', '"object": "Ghost"')
+
+    answer_batch(fake_lm, tmp_path, "joint", rewrite=rewrite)
+    graph = offline_kg.generate(batch="ingest", **kwargs)
+
+    assert ("Andrew", "relates to", "Ben") in graph.relations
+    assert all(
+        s in graph.entities and o in graph.entities for s, _, o in graph.relations
+    )
+    assert fake_lm.calls == 1  # the fix call for the unmatched relation
+    assert offline_kg.relation_repair.stats()["sent_to_llm"] == 1
+    assert offline_kg.batch_stats["ingested"] == 1
+
+
+def test_failed_requests_fall_back_to_synchronous_calls(offline_kg, fake_lm, tmp_path):
+    expected = offline_kg.generate(input_data=TEXT, chunk_size=30)
+    kwargs = dict(input_data=TEXT, chunk_size=30, batch_folder=tmp_path)
+
+    offline_kg.generate(batch="export", **kwargs)
+    answer_batch(fake_lm, tmp_path, "entities", fail={1})
+    fake_lm.calls = 0
+    offline_kg.generate(batch="ingest", **kwargs)
+    assert fake_lm.calls == 1
+    assert offline_kg.batch_stats["fallback"] == 1
+
+    answer_batch(fake_lm, tmp_path, "relations", fail={0, 2})
+    graph = offline_kg.generate(batch="ingest", **kwargs)
+    assert graph == expected
+    assert offline_kg.batch_stats == {"exported": 0, "ingested": 1, "fallback": 2}
+
+
+def test_ingest_rejects_responses_for_other_input(offline_kg, fake_lm, tmp_path):
+    offline_kg.generate(
+        input_data=TEXT, chunk_size=30, batch="export", batch_folder=tmp_path
+    )
+    answer_batch(fake_lm, tmp_path, "entities")
+
+    with pytest.raises(ValueError, match="do not match"):
+        offline_kg.generate(
+            input_data=TEXT.replace("Josh", "Joshua"),
+            chunk_size=30,
+            batch="ingest",
+            batch_folder=tmp_path,
+        )
+
+
+def test_batch_validation(offline_kg, tmp_path):
+    with pytest.raises(ValueError, match="batch_folder"):
+        offline_kg.generate(input_data=TEXT, batch="export")
+    with pytest.raises(ValueError, match="'export' or 'ingest'"):
+        offline_kg.generate(input_data=TEXT, batch="submit", batch_folder=tmp_path)
+    with pytest.raises(ValueError, match="resume"):
+        offline_kg.generate(
+            input_data=TEXT,
+            batch="export",
+            batch_folder=tmp_path,
+            output_folder=tmp_path,
+            resume=True,
+        )
+    with pytest.raises(ValueError, match="No batch responses"):
+        offline_kg.generate(input_data=TEXT, batch="ingest", batch_folder=tmp_path)
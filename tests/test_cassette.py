@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from conftest import FakeLM, record_as_provider
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+from src.kg_gen.utils.cassette import Cassette, RecordingLM, ReplayLM
+from src.kg_gen.utils.metrics import MetricsCollector
+
+TEXT = "Linda is the mother of Josh. Ben is the brother of Josh. Andrew is the father of Josh."
+
+
+def record(fake_lm, path) -> tuple:
+    kg = KGGen(api_key="dummy-key", cassette_path=path, cassette_mode="record")
+    kg.lm = record_as_provider(kg, fake_lm)
+    graph = kg.generate(input_data=TEXT, chunk_size=30)
+    clustered = kg.cluster(graph)
+    kg.cassette.close()
+    return graph, clustered
+
+
+def test_replay_reproduces_recorded_run(fake_lm, tmp_path):
+    path = tmp_path / "run.jsonl"
+    graph, clustered = record(fake_lm, path)
+    lines = path.read_text().splitlines()
+    assert len(lines) == fake_lm.calls
+    assert {"key", "messages", "contents", "usage", "latency"} <= set(
+        json.loads(lines[0])
+    )
+
+    fake_lm.calls = 0
+    kg = KGGen(cassette_path=path)
+    assert isinstance(kg.lm, ReplayLM)
+    replayed = kg.generate(input_data=TEXT, chunk_size=30)
+    replayed_clusters = kg.cluster(replayed)
+
+    assert fake_lm.calls == 0
+    assert replayed == graph
+    assert replayed_clusters == clustered
+
+
+def test_cluster_replay_ignores_set_order(fake_lm, tmp_path):
+    names = [f"Item{i}" for i in range(60)]
+    recorded = Graph(entities=set(names), edges={"relates to"}, relations=set())
+    replayed = Graph(
+        entities=set(reversed(names)), edges={"relates to"}, relations=set()
+    )
+    # Sets of the same items built in different orders iterate differently.
+    assert list(recorded.entities) != list(replayed.entities)
+
+    path = tmp_path / "run.jsonl"
+    kg = KGGen(api_key="dummy-key", cassette_path=path, cassette_mode="record")
+    kg.lm = record_as_provider(kg, fake_lm)
+    clustered = kg.cluster(recorded)
+    kg.cassette.close()
+
+    assert KGGen(cassette_path=path).cluster(replayed) == clustered
+
+
+def test_async_replay_with_usage(fake_lm, tmp_path):
+    path = tmp_path / "run.jsonl"
+    graph, _ = record(fake_lm, path)
+    metrics = MetricsCollector()
+    kg = KGGen(cassette_path=path, callbacks=[metrics])
+
+    replayed = asyncio.run(kg.agenerate(input_data=TEXT, chunk_size=30))
+
+    assert replayed == graph
+    assert metrics.summary()["entities"]["prompt_tokens"] > 0
+
+
+def test_unrecorded_request(fake_lm, tmp_path):
+    path = tmp_path / "run.jsonl"
+    record(fake_lm, path)
+    kg = KGGen(cassette_path=path)
+
+    with pytest.raises(ValueError):
+        kg.generate(input_data="Judy is the sister of Andrew.")
+
+
+def test_replay_latency(fake_lm, tmp_path):
+    path = tmp_path / "run.jsonl"
+    record(fake_lm, path)
+    cassette = Cassette(path)
+    key = next(iter(cassette.interactions))
+    interaction = cassette.interactions[key][0]
+
+    assert ReplayLM(cassette)._delay(interaction) == 0.0
+    assert ReplayLM(cassette, "recorded")._delay(interaction) == interaction["latency"]
+    assert ReplayLM(cassette, 0.25)._delay(interaction) == 0.25
+    assert ReplayLM(cassette, lambda: 0.5)._delay(interaction) == 0.5
+
+    kg = KGGen(cassette_path=path, replay_latency=0.05)
+    start = time.monotonic()
+    kg.generate(input_data=TEXT, chunk_size=30)
+    assert time.monotonic() - start >= 0.1  # entities then relations per chunk
+
+
+def test_same_messages_to_different_models_replay_separately(tmp_path):
+    path = tmp_path / "run.jsonl"
+    messages = [{"role": "user", "content": "hi"}]
+    cassette = Cassette(path, "record")
+    cheap, strong = FakeLM(), FakeLM()
+    cheap.model, strong.model = "fake/cheap", "fake/strong"
+    cheap._answer = lambda messages: "cheap"
+    strong._answer = lambda messages: "strong"
+    RecordingLM(cheap, cassette)(messages=messages)
+    RecordingLM(strong, cassette)(messages=messages, temperature=1.0)
+    cassette.close()
+
+    cassette = Cassette(path)
+    replay_cheap = ReplayLM(cassette, model="fake/cheap", **cheap.kwargs)
+    replay_strong = ReplayLM(cassette, model="fake/strong", **strong.kwargs)
+    assert replay_cheap(messages=messages) == ["cheap"]
+    assert replay_strong(messages=messages, temperature=1.0) == ["strong"]
+    with pytest.raises(ValueError):
+        replay_strong(messages=messages)  # recorded only at temperature 1.0
+
+
+def test_invalid_cassette_mode(tmp_path):
+    with pytest.raises(ValueError):
+        KGGen(cassette_path=tmp_path / "run.jsonl", cassette_mode="write")
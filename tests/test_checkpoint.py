@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from conftest import FakeLM
+from src.kg_gen import KGGen
+
+TEXT = (
+    "Linda is the mother of Josh. Ben is the brother of Josh. "
+    "Andrew is the father of Josh. Judy is the sister of Andrew."
+)
+
+
+def checkpoint_lines(output_folder) -> list[dict]:
+    with open(os.path.join(output_folder, "chunks.jsonl")) as f:
+        return [json.loads(line) for line in f]
+
+
+def fail_on(fake_lm, word: str):
+    answer = fake_lm._answer
+
+    def failing_answer(messages):
+        if word in messages[-1]["content"]:
+            raise RuntimeError("provider went away")
+        return answer(messages)
+
+    fake_lm._answer = failing_answer
+    return answer
+
+
+def test_generate_records_each_chunk(offline_kg: KGGen, tmp_path):
+    graph = offline_kg.generate(input_data=TEXT, chunk_size=30, output_folder=tmp_path)
+
+    lines = checkpoint_lines(tmp_path)
+    assert len(lines) == 4
+    assert {entity for line in lines for entity in line["entities"]} == graph.entities
+    assert os.path.exists(tmp_path / "graph.json")
+
+
+def test_resume_only_extracts_remaining_chunks(offline_kg: KGGen, fake_lm, tmp_path):
+    expected = offline_kg.generate(input_data=TEXT, chunk_size=30)
+
+    answer = fail_on(fake_lm, "Judy")
+    with pytest.raises(RuntimeError):
+        offline_kg.generate(input_data=TEXT, chunk_size=30, output_folder=tmp_path)
+    assert len(checkpoint_lines(tmp_path)) == 3
+
+    fake_lm._answer = answer
+    fake_lm.calls = 0
+    graph = offline_kg.generate(
+        input_data=TEXT, chunk_size=30, output_folder=tmp_path, resume=True
+    )
+
+    assert fake_lm.calls == 2  # entities + relations for the one missing chunk
+    assert graph.entities == expected.entities
+    assert graph.relations == expected.relations
+    assert len(checkpoint_lines(tmp_path)) == 4
+
+
+def test_resume_ignores_truncated_line(offline_kg: KGGen, fake_lm, tmp_path):
+    offline_kg.generate(input_data=TEXT, chunk_size=30, output_folder=tmp_path)
+    path = tmp_path / "chunks.jsonl"
+    content = path.read_text()
+    path.write_text(content[: len(content) - 20])  # killed mid-write
+
+    fake_lm.calls = 0
+    offline_kg.generate(
+        input_data=TEXT, chunk_size=30, output_folder=tmp_path, resume=True
+    )
+
+    assert fake_lm.calls == 2
+    last_line = path.read_text().splitlines()[-1]
+    assert json.loads(last_line)["entities"]
+
+
+def test_without_resume_checkpoint_starts_fresh(offline_kg: KGGen, fake_lm, tmp_path):
+    offline_kg.generate(input_data=TEXT, chunk_size=30, output_folder=tmp_path)
+    fake_lm.calls = 0
+    offline_kg.generate(input_data=TEXT, chunk_size=30, output_folder=tmp_path)
+
+    assert fake_lm.calls == 8
+    assert len(checkpoint_lines(tmp_path)) == 4
+
+
+def test_resume_reextracts_after_model_or_context_change(
+    offline_kg: KGGen, fake_lm, tmp_path
+):
+    offline_kg.generate(input_data=TEXT, chunk_size=30, output_folder=tmp_path)
+
+    other_lm = FakeLM()
+    other_lm.model = "fake/other"
+    offline_kg.stage_lms = {"entities": other_lm}
+    fake_lm.calls = 0
+    offline_kg.generate(
+        input_data=TEXT, chunk_size=30, output_folder=tmp_path, resume=True
+    )
+    assert other_lm.calls == 4 and fake_lm.calls == 4
+
+    offline_kg.stage_lms = {}
+    fake_lm.calls = 0
+    offline_kg.generate(
+        input_data=TEXT,
+        chunk_size=30,
+        output_folder=tmp_path,
+        resume=True,
+        context="Family tree",
+    )
+    assert fake_lm.calls == 8
+
+
+def test_agenerate_resume(offline_kg: KGGen, fake_lm, tmp_path):
+    answer = fail_on(fake_lm, "Judy")
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            offline_kg.agenerate(input_data=TEXT, chunk_size=30, output_folder=tmp_path)
+        )
+
+    fake_lm._answer = answer
+    fake_lm.calls = 0
+    graph = asyncio.run(
+        offline_kg.agenerate(
+            input_data=TEXT, chunk_size=30, output_folder=tmp_path, resume=True
+        )
+    )
+
+    assert fake_lm.calls == 2
+    assert {"Linda", "Josh", "Ben", "Andrew", "Judy"} <= graph.entities
+
+
+def test_agenerate_records_other_chunks_when_one_fails(
+    offline_kg: KGGen, fake_lm, tmp_path
+):
+    fake_lm.latency = 0.05
+    aforward = fake_lm.aforward
+
+    async def failing_aforward(prompt=None, messages=None, **kwargs):
+        if "Linda" in messages[-1]["content"]:
+            raise RuntimeError("provider went away")
+        return await aforward(prompt=prompt, messages=messages, **kwargs)
+
+    fake_lm.aforward = failing_aforward
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            offline_kg.agenerate(input_data=TEXT, chunk_size=30, output_folder=tmp_path)
+        )
+
+    assert len(checkpoint_lines(tmp_path)) == 3
+
+
+def test_resume_requires_output_folder(offline_kg: KGGen):
+    with pytest.raises(ValueError):
+        offline_kg.generate(input_data=TEXT, chunk_size=30, resume=True)
@@ -0,0 +1,131 @@
+import json
+import zlib
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from benchmarks._prompt_parsing import input_fields, output_fields
+from conftest import FakeLM
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+from src.kg_gen.utils.blocking import Blocker
+
+ENTITIES = {"Cat", "cat", "cats", "dog", "dogs", "doggo", "apple", "banana"}
+GRAPH = Graph(
+    entities=ENTITIES,
+    edges={"is a", "is an", "eats"},
+    relations={("cats", "eats", "banana"), ("dog", "is a", "Cat")},
+)
+
+
+class TrigramEmbedder:
+    """Character-trigram counts, so spelling variants embed close together."""
+
+    def encode(self, items):
+        vectors = np.zeros((len(items), 64), dtype=np.float32)
+        for row, item in enumerate(items):
+            for token in item.casefold().split():
+                padded = f" {token} "
+                for i in range(len(padded) - 2):
+                    trigram = padded[i : i + 3].encode()
+                    vectors[row, zlib.crc32(trigram) % 64] += 1.0
+        return vectors
+
+
+class ClusteringLM(FakeLM):
+    """FakeLM that clusters items sharing their first three letters and
+    records the items of every ExtractCluster prompt."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(latency)
+        self.extract_prompts: list[set[str]] = []
+
+    def _answer(self, messages) -> str:
+        outputs = output_fields(messages[0]["content"])
+        inputs = input_fields(messages[-1]["content"])
+        if outputs == ["cluster"]:
+            items = json.loads(inputs["items"])
+            with self._lock:
+                self.extract_prompts.append(set(items))
+            groups = defaultdict(list)
+            for item in sorted(items):
+                groups[item.casefold()[:3]].append(item)
+            largest = max(groups.values(), key=len)
+            cluster = largest if len(largest) > 1 else []
+            return (
+                f"[[ ## cluster ## ]]\n{json.dumps(cluster)}\n\n[[ ## completed ## ]]"
+            )
+        if outputs == ["validated_items"]:
+            items = json.loads(inputs["cluster"])
+            return f"[[ ## validated_items ## ]]\n{json.dumps(items)}\n\n[[ ## completed ## ]]"
+        if outputs == ["representative"]:
+            representative = sorted(json.loads(inputs["cluster"]))[0]
+            return (
+                f"[[ ## representative ## ]]\n{representative}\n\n[[ ## completed ## ]]"
+            )
+        return super()._answer(messages)
+
+
+def blocking_kg(lm, block_size: int = 10) -> KGGen:
+    kg = KGGen(
+        api_key="dummy-key",
+        cluster_block_size=block_size,
+        cluster_block_threshold=0.5,
+    )
+    kg.retrieval_model = TrigramEmbedder()
+    kg.lm = lm
+    return kg
+
+
+def test_blocks_group_similar_items():
+    blocker = Blocker(TrigramEmbedder(), max_block_size=10, threshold=0.5)
+    blocks = sorted(sorted(block) for block in blocker.blocks(ENTITIES))
+
+    assert blocks == [
+        ["Cat", "cat", "cats"],
+        ["apple"],
+        ["banana"],
+        ["dog", "doggo", "dogs"],
+    ]
+
+
+def test_oversized_blocks_are_split():
+    blocker = Blocker(TrigramEmbedder(), max_block_size=2, threshold=0.5)
+    blocks = blocker.blocks(ENTITIES)
+
+    assert max(len(block) for block in blocks) == 2
+    assert sorted(item for block in blocks for item in block) == sorted(ENTITIES)
+
+
+def test_blocked_clustering_prompts_stay_within_blocks():
+    lm = ClusteringLM()
+    kg = blocking_kg(lm)
+
+    clustered = kg.cluster(GRAPH)
+
+    blocks = [{"Cat", "cat", "cats"}, {"dog", "doggo", "dogs"}, {"is a", "is an"}]
+    assert lm.extract_prompts
+    assert all(any(items <= block for block in blocks) for items in lm.extract_prompts)
+    assert clustered.entity_clusters["Cat"] == {"Cat", "cat", "cats"}
+    assert clustered.entity_clusters["apple"] == {"apple"}
+    assert clustered.edge_clusters["is a"] == {"is a", "is an"}
+    assert ("Cat", "eats", "banana") in clustered.relations
+    assert ("dog", "is a", "Cat") in clustered.relations
+
+
+def test_blocks_are_clustered_concurrently():
+    lm = ClusteringLM(latency=0.05)
+    kg = blocking_kg(lm)
+
+    kg.cluster(GRAPH)
+
+    assert lm.max_in_flight > 1
+
+
+def test_blocking_needs_an_embedding_model(fake_lm):
+    kg = KGGen(api_key="dummy-key", cluster_block_size=10)
+    kg.lm = fake_lm
+
+    with pytest.raises(ValueError, match="retrieval model"):
+        kg.cluster(GRAPH)
@@ -0,0 +1,87 @@
+import json
+from collections import defaultdict
+
+from benchmarks._prompt_parsing import input_fields, output_fields
+from conftest import FakeLM
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+
+ENTITIES = {
+    f"{word}{suffix}"
+    for word in ("cat", "dog", "owl", "elk")
+    for suffix in ("", "s", "ish", "like")
+}
+EDGES = {"eats", "eaten by", "eating", "sees", "seen by", "seeing"}
+GRAPH = Graph(
+    entities=ENTITIES,
+    edges=EDGES,
+    relations={("cats", "eats", "owl"), ("dog", "sees", "elklike")},
+)
+
+
+def _key(item: str) -> str:
+    return item.casefold()[:3]
+
+
+class SlowClusteringLM(FakeLM):
+    """FakeLM that clusters items sharing their first three letters, three at a
+    time, so the rest are matched to clusters and validated one by one."""
+
+    def _answer(self, messages) -> str:
+        outputs = output_fields(messages[0]["content"])
+        inputs = input_fields(messages[-1]["content"])
+        if outputs == ["cluster"]:
+            groups = defaultdict(list)
+            for item in sorted(json.loads(inputs["items"])):
+                groups[_key(item)].append(item)
+            largest = max(groups.values(), key=len)
+            answer = largest[:3] if len(largest) > 1 else []
+        elif outputs == ["validated_items"]:
+            answer = json.loads(inputs["cluster"])
+        elif outputs == ["representative"]:
+            representative = sorted(json.loads(inputs["cluster"]))[0]
+            return (
+                f"[[ ## representative ## ]]\n{representative}\n\n[[ ## completed ## ]]"
+            )
+        elif outputs == ["reasoning", "cluster_reps_that_items_belong_to"]:
+            representatives = {
+                _key(cluster["representative"]): cluster["representative"]
+                for cluster in json.loads(inputs["clusters"])
+            }
+            answer = [
+                representatives.get(_key(item)) for item in json.loads(inputs["items"])
+            ]
+            return (
+                "[[ ## reasoning ## ]]\nMatched by prefix.\n\n"
+                f"[[ ## {outputs[1]} ## ]]\n{json.dumps(answer)}\n\n"
+                "[[ ## completed ## ]]"
+            )
+        else:
+            return super()._answer(messages)
+        return (
+            f"[[ ## {outputs[0]} ## ]]\n{json.dumps(answer)}\n\n[[ ## completed ## ]]"
+        )
+
+
+def test_cluster_calls_run_concurrently():
+    lm = SlowClusteringLM(latency=0.05)
+    kg = KGGen(api_key="dummy-key", max_concurrency=4)
+    kg.lm = lm
+
+    clustered = kg.cluster(GRAPH)
+
+    assert clustered.entity_clusters["cat"] == {"cat", "cats", "catish", "catlike"}
+    assert clustered.entity_clusters["elk"] == {"elk", "elks", "elkish", "elklike"}
+    assert clustered.edge_clusters["eaten by"] == {"eats", "eaten by", "eating"}
+    assert ("cat", "eaten by", "owl") in clustered.relations
+    assert 1 < lm.max_in_flight <= 4
+
+
+def test_concurrency_limit_holds_across_clustering():
+    lm = SlowClusteringLM(latency=0.02)
+    kg = KGGen(api_key="dummy-key", max_concurrency=1)
+    kg.lm = lm
+
+    kg.cluster(GRAPH)
+
+    assert lm.max_in_flight == 1
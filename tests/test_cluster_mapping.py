@@ -0,0 +1,124 @@
+from src.kg_gen import Graph
+from src.kg_gen.steps import _3_cluster_graph
+from src.kg_gen.steps._3_cluster_graph import cluster_graph
+from src.kg_gen.utils.cluster_mapping import ClusterMapping
+
+NEW_YORK = {
+    "New York": {"NYC", "New York City", "New York"},
+    "New York State": {"New York", "New York State"},
+}
+
+
+def test_members_map_to_their_representative():
+    mapping = ClusterMapping({"Cat": {"Cat", "cats"}, "dog": {"dogs"}})
+
+    assert mapping["cats"] == "Cat"
+    assert mapping["dogs"] == "dog"
+    assert mapping["dog"] == "dog"
+    assert mapping["apple"] == "apple"
+    assert "apple" not in mapping
+    assert len(mapping) == 4
+
+
+def test_added_clusters_merge_with_existing_ones():
+    mapping = ClusterMapping({"Cat": {"cats"}})
+    mapping.add("cats", {"cat", "kitty"})
+    mapping.add("kitten", {"kitty"})
+
+    assert mapping.clusters() == {"Cat": {"Cat", "cats", "cat", "kitty", "kitten"}}
+
+
+def test_flat_mapping_keeps_representatives_fixed():
+    mapping = ClusterMapping.flat(NEW_YORK)
+
+    assert mapping["NYC"] == "New York"
+    assert mapping["New York"] == "New York"
+    assert mapping["New York State"] == "New York State"
+    assert ClusterMapping(NEW_YORK)["New York State"] == "New York"
+
+
+def cluster_new_york(monkeypatch) -> Graph:
+    def fake_cluster_items(dspy, items, item_type, *args):
+        if item_type == "entities":
+            return set(NEW_YORK), NEW_YORK
+        return set(items), {item: {item} for item in items}
+
+    monkeypatch.setattr(_3_cluster_graph, "cluster_items", fake_cluster_items)
+    graph = Graph(
+        entities={"NYC", "New York City", "New York", "New York State"},
+        edges={"is in"},
+        relations={("NYC", "is in", "New York State")},
+    )
+    return cluster_graph(graph)
+
+
+def test_extend_joins_clusters_by_representative_only():
+    mapping = ClusterMapping.flat({"Cat": {"Cat", "cats"}, "dog": {"dog"}})
+    mapping.extend({"cats": {"cats", "kitty"}, "puppy": {"puppy", "dog"}})
+
+    assert mapping["kitty"] == "Cat"
+    assert mapping["dog"] == "dog"
+    assert mapping["puppy"] == "puppy"
+
+
+def test_cluster_graph_relations_use_its_representatives(monkeypatch):
+    clustered = cluster_new_york(monkeypatch)
+
+    assert clustered.relations == {("New York", "is in", "New York State")}
+    assert clustered.entities == set(clustered.entity_clusters) == set(NEW_YORK)
+
+
+def test_remap_relations_maps_entities_and_edges():
+    entities = ClusterMapping({"Cat": {"cats"}})
+    edges = ClusterMapping({"eats": {"ate"}})
+    relations = {("cats", "ate", "fish"), ("Cat", "eats", "fish")}
+
+    assert entities.remap_relations(relations, edges) == {("Cat", "eats", "fish")}
+    assert entities.remap_relations(relations) == {
+        ("Cat", "ate", "fish"),
+        ("Cat", "eats", "fish"),
+    }
+
+
+def test_aggregate_merges_clusters_across_graphs(offline_kg):
+    graph1 = Graph(
+        entities={"Cat", "fish"},
+        edges={"eats"},
+        relations={("Cat", "eats", "fish")},
+        entity_clusters={"Cat": {"Cat", "cats"}, "fish": {"fish"}},
+        edge_clusters={"eats": {"eats", "ate"}},
+    )
+    graph2 = Graph(
+        entities={"cats", "cat", "mouse"},
+        edges={"ate", "chased"},
+        relations={("cats", "ate", "mouse"), ("cat", "chased", "mouse")},
+        entity_clusters={"cats": {"cats", "cat"}},
+    )
+
+    combined = offline_kg.aggregate([graph1, graph2])
+
+    assert combined.entities == {"Cat", "fish", "mouse"}
+    assert combined.edges == {"eats", "chased"}
+    assert combined.relations == {
+        ("Cat", "eats", "fish"),
+        ("Cat", "eats", "mouse"),
+        ("Cat", "chased", "mouse"),
+    }
+    assert combined.entity_clusters["Cat"] == {"Cat", "cats", "cat"}
+
+
+def test_aggregate_of_one_clustered_graph_is_unchanged(offline_kg, monkeypatch):
+    clustered = cluster_new_york(monkeypatch)
+
+    assert offline_kg.aggregate([clustered]) == clustered
+
+
+def test_aggregate_without_clusters_keeps_items(offline_kg):
+    graph1 = Graph(entities={"a", "b"}, edges={"r"}, relations={("a", "r", "b")})
+    graph2 = Graph(entities={"b", "c"}, edges={"s"}, relations={("b", "s", "c")})
+
+    combined = offline_kg.aggregate([graph1, graph2])
+
+    assert combined.entities == {"a", "b", "c"}
+    assert combined.relations == {("a", "r", "b"), ("b", "s", "c")}
+    assert combined.entity_clusters is None
@@ -0,0 +1,117 @@
+import json
+from collections import defaultdict
+
+import pytest
+
+from benchmarks._prompt_parsing import input_fields, output_fields
+from conftest import FakeLM
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+from src.kg_gen.steps._3_cluster_graph import cluster_items_windowed
+
+ENTITIES = {"Cat", "cat", "cats", "dog", "dogs", "doggo", "apple", "banana"}
+GRAPH = Graph(
+    entities=ENTITIES,
+    edges={"eats"},
+    relations={("cats", "eats", "banana"), ("dogs", "eats", "apple")},
+)
+
+
+def _key(item: str) -> str:
+    return item.casefold()[:3]
+
+
+class IdClusteringLM(FakeLM):
+    """FakeLM for the ID-based clustering signatures. It clusters items
+    sharing their first three letters, returns at most `max_cluster` of them
+    per extraction and records the items of every prompt."""
+
+    def __init__(self, max_cluster: int = 10):
+        super().__init__()
+        self.max_cluster = max_cluster
+        self.prompts: list[list[str]] = []
+
+    def _answer(self, messages) -> str:
+        outputs = output_fields(messages[0]["content"])
+        inputs = input_fields(messages[-1]["content"])
+        if "items" in inputs:
+            with self._lock:
+                self.prompts.append(list(json.loads(inputs["items"]).values()))
+        if outputs == ["cluster_ids"]:
+            groups = defaultdict(list)
+            for i, item in json.loads(inputs["items"]).items():
+                groups[_key(item)].append(int(i))
+            largest = max(groups.values(), key=len)
+            answer = largest[: self.max_cluster] if len(largest) > 1 else []
+        elif outputs == ["validated_ids"]:
+            answer = [int(i) for i in json.loads(inputs["cluster"])]
+        elif outputs == ["reasoning", "cluster_ids_that_items_belong_to"]:
+            clusters = {
+                _key(cluster["representative"]): int(i)
+                for i, cluster in json.loads(inputs["clusters"]).items()
+            }
+            answer = [
+                clusters.get(_key(item))
+                for item in json.loads(inputs["items"]).values()
+            ]
+            return (
+                "[[ ## reasoning ## ]]\nMatched by prefix.\n\n"
+                f"[[ ## {outputs[1]} ## ]]\n{json.dumps(answer)}\n\n"
+                "[[ ## completed ## ]]"
+            )
+        elif outputs == ["representative"]:
+            representative = sorted(json.loads(inputs["cluster"]))[0]
+            return (
+                f"[[ ## representative ## ]]\n{representative}\n\n[[ ## completed ## ]]"
+            )
+        else:
+            return super()._answer(messages)
+        return (
+            f"[[ ## {outputs[0]} ## ]]\n{json.dumps(answer)}\n\n[[ ## completed ## ]]"
+        )
+
+
+def windowed_kg(lm, window: int = 4) -> KGGen:
+    kg = KGGen(api_key="dummy-key", cluster_window=window)
+    kg.lm = lm
+    return kg
+
+
+def test_windowed_clustering_merges_items():
+    lm = IdClusteringLM()
+
+    clustered = windowed_kg(lm, window=10).cluster(GRAPH)
+
+    assert clustered.entity_clusters["Cat"] == {"Cat", "cat", "cats"}
+    assert clustered.entity_clusters["dog"] == {"dog", "dogs", "doggo"}
+    assert clustered.entity_clusters["apple"] == {"apple"}
+    assert ("Cat", "eats", "banana") in clustered.relations
+    assert ("dog", "eats", "apple") in clustered.relations
+
+
+def test_prompts_hold_at_most_one_window():
+    lm = IdClusteringLM()
+
+    windowed_kg(lm, window=3).cluster(GRAPH)
+
+    ordered = sorted(ENTITIES, key=lambda item: (item.casefold(), item))
+    windows = [set(ordered[i : i + 3]) for i in range(0, len(ordered), 3)]
+    assert lm.prompts
+    assert all(
+        any(set(items) <= window for window in windows + [{"eats"}])
+        for items in lm.prompts
+    )
+
+
+def test_leftovers_join_clusters_of_their_window():
+    lm = IdClusteringLM(max_cluster=2)
+
+    clustered = windowed_kg(lm, window=10).cluster(GRAPH)
+
+    assert clustered.entity_clusters["Cat"] == {"Cat", "cat", "cats"}
+    assert clustered.entity_clusters["dog"] == {"dog", "dogs", "doggo"}
+
+
+def test_window_must_hold_two_items(fake_lm):
+    with pytest.raises(ValueError, match="window"):
+        cluster_items_windowed(None, ENTITIES, window=1)
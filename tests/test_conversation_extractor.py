@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from src.kg_gen import ConversationExtractor
+
+TURNS = [
+    {"role": "user", "content": "who is Linda?"},
+    {"role": "assistant", "content": "Linda is the mother of Josh."},
+    {"role": "user", "content": "and Ben?"},
+    {"role": "assistant", "content": "Ben is the brother of Josh."},
+    {"role": "user", "content": "what about Andrew?"},
+    {"role": "assistant", "content": "Andrew is the father of Josh."},
+]
+
+
+def record_prompts(fake_lm) -> list[str]:
+    prompts = []
+    answer = fake_lm._answer
+
+    def recording(messages):
+        prompts.append(messages[-1]["content"])
+        return answer(messages)
+
+    fake_lm._answer = recording
+    return prompts
+
+
+def test_updates_extract_only_new_messages(offline_kg, fake_lm):
+    prompts = record_prompts(fake_lm)
+    extractor = ConversationExtractor(offline_kg, overlap=1)
+
+    for end in range(2, len(TURNS) + 1, 2):
+        graph = extractor.update(TURNS[:end])
+
+    assert extractor.processed == len(TURNS)
+    assert fake_lm.calls == 6
+    last_entities_prompt = prompts[-2]
+    assert "Andrew is the father" in last_entities_prompt
+    assert "Ben is the brother" in last_entities_prompt  # one message of overlap
+    assert "Linda is the mother" not in last_entities_prompt
+    assert graph.entities == offline_kg.generate(input_data=TURNS).entities
+    assert ("Andrew", "relates to", "Ben") in graph.relations
+
+
+def test_known_entities_are_carried_forward(offline_kg, fake_lm):
+    prompts = record_prompts(fake_lm)
+    extractor = ConversationExtractor(offline_kg, overlap=0, max_known_entities=2)
+
+    extractor.update(TURNS[:2])
+    extractor.update(TURNS[:4])
+    extractor.update(TURNS[:6])
+
+    assert "known_entities" in prompts[2]
+    assert '["Josh", "Linda"]' in prompts[2]
+    # Capped to the two most recently mentioned entities.
+    assert '["Ben", "Josh"]' in prompts[4]
+    assert extractor.known_entities() == ["Andrew", "Josh"]
+
+
+def test_no_new_messages(offline_kg, fake_lm):
+    extractor = ConversationExtractor(offline_kg)
+    graph = extractor.update(TURNS)
+    calls = fake_lm.calls
+
+    assert extractor.update(TURNS) is graph
+    assert fake_lm.calls == calls
+    with pytest.raises(ValueError, match="extend"):
+        extractor.update(TURNS[:2])
+
+
+def test_continue_from_saved_graph(offline_kg, fake_lm):
+    first = ConversationExtractor(offline_kg)
+    graph = first.update(TURNS[:4]).model_copy(deep=True)
+    saved = set(graph.entities)
+
+    extractor = ConversationExtractor(offline_kg, graph=graph, processed=4)
+    assert set(extractor.known_entities()) == saved
+    updated = extractor.update(TURNS)
+
+    assert updated is graph
+    assert updated.entities == saved | {"Andrew"}
+
+
+def test_async_update(offline_kg, fake_lm):
+    extractor = ConversationExtractor(offline_kg)
+
+    async def run():
+        await extractor.aupdate(TURNS[:2])
+        return await extractor.aupdate(TURNS)
+
+    graph = asyncio.run(run())
+    assert {"Linda", "Ben", "Andrew", "Josh"} <= graph.entities
+    assert fake_lm.calls == 4
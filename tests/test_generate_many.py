@@ -0,0 +1,70 @@
+import pytest
+
+from src.kg_gen import KGGen
+
+DOCUMENTS = [
+    "Linda is the mother of Josh. Ben is the brother of Josh. Andrew is the father of Josh. "
+    "Judy is the sister of Andrew. Josh is the nephew of Judy.",
+    "Paris is the capital of France.",
+    [
+        {"role": "user", "content": "Where does Alice work?"},
+        {"role": "assistant", "content": "Alice works at Google."},
+    ],
+]
+
+
+def test_generate_many_matches_per_document_generate(offline_kg: KGGen):
+    graphs = offline_kg.generate_many(DOCUMENTS, chunk_size=40)
+
+    assert len(graphs) == len(DOCUMENTS)
+    for document, graph in zip(DOCUMENTS, graphs):
+        expected = offline_kg.generate(input_data=document, chunk_size=40)
+        assert graph.entities == expected.entities
+        assert graph.relations == expected.relations
+
+
+def test_generate_many_interleaves_documents(offline_kg: KGGen):
+    offline_kg.max_concurrency = 1
+    processed = []
+    process_chunk = offline_kg._process_chunk
+
+    def recording_process_chunk(chunk, *args):
+        processed.append(chunk)
+        return process_chunk(chunk, *args)
+
+    offline_kg._process_chunk = recording_process_chunk
+    offline_kg.generate_many(DOCUMENTS[:2], chunk_size=40)
+
+    # The short document's only chunk is scheduled right after the long
+    # document's first chunk rather than behind all of them.
+    assert processed[1] == "Paris is the capital of France."
+    assert len(processed) > 2
+
+
+def test_generate_many_empty_document(offline_kg: KGGen):
+    graphs = offline_kg.generate_many(
+        ["", "Paris is the capital of France."], chunk_size=40
+    )
+
+    assert graphs[0].entities == set()
+    assert {"Paris", "France"} <= graphs[1].entities
+
+
+def test_generate_many_cancels_pending_chunks_on_failure(offline_kg: KGGen, fake_lm):
+    offline_kg.max_concurrency = 1
+    answer = fake_lm._answer
+
+    def failing_answer(messages):
+        if "Linda" in messages[-1]["content"]:
+            raise RuntimeError("provider went away")
+        return answer(messages)
+
+    fake_lm._answer = failing_answer
+    documents = [DOCUMENTS[0]] + [f"Document {i} mentions Paris." for i in range(20)]
+
+    with pytest.raises(RuntimeError):
+        offline_kg.generate_many(documents, chunk_size=40)
+
+    # The failing chunk is scheduled first, so all but the chunk already
+    # running when it failed are cancelled before they start.
+    assert fake_lm.calls < 10
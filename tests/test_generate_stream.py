@@ -0,0 +1,78 @@
+import json
+import threading
+
+import pytest
+
+from src.kg_gen import ChunkUpdate, KGGen
+
+TEXT = (
+    "Linda is the mother of Josh. Ben is the brother of Josh. "
+    "Andrew is the father of Josh. Judy is the sister of Andrew."
+)
+
+
+def test_stream_matches_generate(offline_kg: KGGen):
+    expected = offline_kg.generate(input_data=TEXT, chunk_size=30)
+
+    updates = list(offline_kg.generate_stream(input_data=TEXT, chunk_size=30))
+
+    assert all(isinstance(update, ChunkUpdate) for update in updates)
+    assert sorted(update.chunk_index for update in updates) == [0, 1, 2, 3]
+    final = updates[-1].graph
+    assert final.entities == expected.entities
+    assert final.relations == expected.relations
+    assert final.edges == expected.edges
+
+
+def test_stream_yields_in_completion_order(offline_kg: KGGen, fake_lm):
+    answer = fake_lm._answer
+    slow = threading.Event()
+
+    def slow_first_chunk(messages):
+        if "Linda" in messages[-1]["content"]:
+            slow.wait(timeout=5)
+        return answer(messages)
+
+    fake_lm._answer = slow_first_chunk
+    stream = offline_kg.generate_stream(input_data=TEXT, chunk_size=30)
+    first = next(stream)
+    slow.set()
+    rest = list(stream)
+
+    assert first.chunk_index != 0
+    assert rest[-1].graph.entities >= {"Linda", "Judy"}
+
+
+def test_stream_graph_grows_in_place(offline_kg: KGGen):
+    sizes = [
+        len(update.graph.relations)
+        for update in offline_kg.generate_stream(input_data=TEXT, chunk_size=30)
+    ]
+
+    assert sizes == sorted(sizes)
+    assert sizes[-1] > sizes[0]
+
+
+def test_stream_checkpoint_and_resume(offline_kg: KGGen, fake_lm, tmp_path):
+    list(offline_kg.generate_stream(TEXT, chunk_size=30, output_folder=tmp_path))
+    with open(tmp_path / "graph.json") as f:
+        assert set(json.load(f)["entities"]) >= {"Linda", "Judy"}
+
+    fake_lm.calls = 0
+    updates = list(
+        offline_kg.generate_stream(
+            TEXT, chunk_size=30, output_folder=tmp_path, resume=True
+        )
+    )
+
+    assert fake_lm.calls == 0
+    assert len(updates) == 4
+
+
+def test_stream_propagates_chunk_errors(offline_kg: KGGen, fake_lm):
+    def broken(messages):
+        raise RuntimeError("provider went away")
+
+    fake_lm._answer = broken
+    with pytest.raises(RuntimeError):
+        list(offline_kg.generate_stream(input_data=TEXT, chunk_size=30))
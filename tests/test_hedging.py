@@ -0,0 +1,168 @@
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.utils.hedging import HedgedLM, Hedger
+
+
+def warmed_hedger(**kwargs) -> Hedger:
+    hedger = Hedger(min_samples=5, **kwargs)
+    for _ in range(5):
+        hedger.call(lambda: time.sleep(0.01))
+    return hedger
+
+
+def slow_first(slow: float = 2.0):
+    """fn whose first call takes `slow` seconds and later calls return at once."""
+    counter = itertools.count()
+
+    def fn():
+        attempt = next(counter)
+        if attempt == 0:
+            time.sleep(slow)
+        return attempt
+
+    return fn
+
+
+def test_slow_request_is_hedged():
+    hedger = warmed_hedger(max_hedge_ratio=0.5)
+
+    start = time.monotonic()
+    result = hedger.call(slow_first())
+
+    assert result == 1  # the duplicate's answer
+    assert time.monotonic() - start < 1.0
+    stats = hedger.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    assert stats["requests"] == 6
+
+
+def test_no_hedging_before_enough_samples():
+    hedger = Hedger(min_samples=5)
+    assert hedger.call(slow_first(0.05)) == 0
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_unhedgeable_requests_run_on_callers_thread():
+    hedger = Hedger(min_samples=5)
+
+    assert hedger.call(threading.get_ident) == threading.get_ident()
+    hedger = warmed_hedger(max_hedge_ratio=0.0)
+    assert hedger.call(threading.get_ident) == threading.get_ident()
+
+
+def test_only_winning_latency_is_observed():
+    hedger = warmed_hedger(max_hedge_ratio=0.5)
+
+    assert hedger.call(slow_first(0.5)) == 1
+    time.sleep(0.6)  # let the losing request finish
+
+    assert len(hedger.latencies) == 6
+    assert max(hedger.latencies) < 0.4
+
+
+def test_hedges_capped_by_budget():
+    hedger = warmed_hedger(max_hedge_ratio=0.0)
+
+    assert hedger.call(slow_first(0.1)) == 0
+    assert hedger.stats()["hedged"] == 0
+    assert hedger.stats()["over_budget"] == 1
+
+
+def test_failed_primary_falls_back_to_hedge():
+    hedger = warmed_hedger(max_hedge_ratio=0.5)
+    counter = itertools.count()
+
+    def fn():
+        if next(counter) == 0:
+            time.sleep(0.2)
+            raise RuntimeError("provider went away")
+        time.sleep(0.4)
+        return "hedge"
+
+    assert hedger.call(fn) == "hedge"
+
+
+def test_errors_raised_when_all_attempts_fail():
+    hedger = warmed_hedger(max_hedge_ratio=0.5)
+
+    def fn():
+        time.sleep(0.1)
+        raise RuntimeError("provider went away")
+
+    with pytest.raises(RuntimeError):
+        hedger.call(fn)
+
+
+def test_attempts_see_callers_context():
+    var = contextvars.ContextVar("var", default=None)
+    hedger = Hedger()
+    var.set("chunk-3")
+
+    assert hedger.call(var.get) == "chunk-3"
+
+
+def test_async_hedge_cancels_loser():
+    cancelled = []
+
+    async def run():
+        hedger = Hedger(min_samples=5, max_hedge_ratio=0.5)
+        for _ in range(5):
+            await hedger.acall(lambda: asyncio.sleep(0.01))
+        counter = itertools.count()
+
+        async def fn():
+            attempt = next(counter)
+            try:
+                await asyncio.sleep(2.0 if attempt == 0 else 0)
+            except asyncio.CancelledError:
+                cancelled.append(attempt)
+                raise
+            return attempt
+
+        result = await hedger.acall(fn)
+        await asyncio.sleep(0)
+        return result, hedger.stats()
+
+    start = time.monotonic()
+    result, stats = asyncio.run(run())
+
+    assert result == 1
+    assert time.monotonic() - start < 1.0
+    assert cancelled == [0]
+    assert stats["hedge_wins"] == 1
+
+
+def test_kggen_builds_hedged_lm():
+    kg = KGGen(api_key="dummy-key", hedge_percentile=0.9, requests_per_minute=100)
+
+    assert isinstance(kg.lm, HedgedLM)
+    assert kg.lm.rate_limiter is kg.rate_limiter
+    assert kg.lm.hedger is kg.hedger
+    assert kg.hedger.percentile == 0.9
+
+
+def test_hedged_lm_round_trip():
+    hedger = Hedger(min_samples=1)
+    lm = HedgedLM(
+        model="openai/gpt-4o-mini",
+        hedger=hedger,
+        api_key="dummy-key",
+        mock_response="hello",  # answered by LiteLLM without a provider
+        cache=False,
+    )
+
+    assert lm("hi") == ["hello"]
+    assert asyncio.run(lm.acall("hi")) == ["hello"]
+    assert hedger.stats()["requests"] == 2
+
+
+def test_invalid_percentile():
+    with pytest.raises(ValueError):
+        Hedger(percentile=95)
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = ["sentence_transformers", "sklearn", "networkx", "nltk", "torch"]
+
+
+def import_kg_gen() -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.kg_gen"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def cumulative_import_us(stderr: str) -> dict[str, int]:
+    """Cumulative import time in microseconds per module from -X importtime."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_does_not_load_heavy_dependencies():
+    times = cumulative_import_us(import_kg_gen().stderr)
+
+    loaded = [m for m in HEAVY_MODULES if any(t.split(".")[0] == m for t in times)]
+    assert loaded == []
+
+
+def test_import_time_beyond_dspy():
+    times = cumulative_import_us(import_kg_gen().stderr)
+    own_seconds = (times["src.kg_gen"] - times["dspy"]) / 1e6
+
+    assert own_seconds < 1.0, (
+        f"import src.kg_gen: {times['src.kg_gen'] / 1e6:.2f}s total, "
+        f"{own_seconds:.2f}s beyond dspy"
+    )
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.utils.checkpoint import relation_provenance
+from src.kg_gen.utils.chunk_text import iter_chunks
+
+NAMES = [
+    "Alice", "Bruno", "Carla", "Dmitri", "Elena", "Farid", "Greta", "Hiro",
+    "Ingrid", "Jonas", "Kemal", "Lucia", "Marco", "Nadia", "Oskar", "Priya",
+    "Quentin", "Rosa", "Stefan", "Tamar", "Umberto", "Vera", "Walter", "Yusuf",
+]  # fmt: skip
+SENTENCES = [f"{a} works with {b} on the project." for a, b in zip(NAMES, NAMES[1:])]
+TEXT = " ".join(SENTENCES)
+
+
+def edit(sentences: list[str], index: int, replacement: str) -> str:
+    return " ".join(sentences[:index] + [replacement] + sentences[index + 1 :])
+
+
+def test_content_defined_chunks_resynchronize_after_edit():
+    edited = edit(SENTENCES, 3, "Dmitri rarely talks to Zelda about anything at all.")
+    before = list(iter_chunks(TEXT, 100, content_defined=True))
+    after = list(iter_chunks(edited, 100, content_defined=True))
+
+    assert all(len(chunk) <= 100 for chunk in before + after)
+    assert " ".join(before) == TEXT
+    assert len(set(after) - set(before)) <= 2
+    assert len(set(before) & set(after)) >= len(before) - 2
+
+
+def test_incremental_only_extracts_changed_chunks(offline_kg: KGGen, fake_lm, tmp_path):
+    offline_kg.generate(
+        input_data=TEXT, chunk_size=100, output_folder=tmp_path, incremental=True
+    )
+    first = offline_kg.incremental_stats
+    assert first["reused"] == 0 and first["retracted"] == 0
+
+    edited = edit(SENTENCES, 3, "Dmitri rarely talks to Zelda about anything at all.")
+    expected = offline_kg.generate(input_data=edited, chunk_size=100)
+    expected_chunks = list(iter_chunks(edited, 100, content_defined=True))
+
+    fake_lm.calls = 0
+    graph = offline_kg.generate(
+        input_data=edited, chunk_size=100, output_folder=tmp_path, incremental=True
+    )
+    stats = offline_kg.incremental_stats
+
+    assert stats["extracted"] <= 2
+    assert stats["extracted"] + stats["reused"] == len(set(expected_chunks))
+    assert fake_lm.calls == 2 * stats["extracted"]
+    assert "Zelda" in graph.entities
+    assert ("Dmitri", "relates to", "Elena") not in graph.relations
+    assert graph.entities <= expected.entities | set(NAMES)
+    assert len((tmp_path / "chunks.jsonl").read_text().splitlines()) == len(
+        set(expected_chunks)
+    )
+
+
+def test_incremental_retracts_removed_chunks(offline_kg: KGGen, fake_lm, tmp_path):
+    offline_kg.generate(
+        input_data=TEXT, chunk_size=100, output_folder=tmp_path, incremental=True
+    )
+    fake_lm.calls = 0
+    graph = offline_kg.generate(
+        input_data=" ".join(SENTENCES[:6]),
+        chunk_size=100,
+        output_folder=tmp_path,
+        incremental=True,
+    )
+
+    assert offline_kg.incremental_stats["retracted"] > 0
+    assert "Yusuf" not in graph.entities
+    assert all("Yusuf" not in relation for relation in relation_provenance(tmp_path))
+
+
+def test_unchanged_input_makes_no_calls(offline_kg: KGGen, fake_lm, tmp_path):
+    first = offline_kg.generate(
+        input_data=TEXT, chunk_size=100, output_folder=tmp_path, incremental=True
+    )
+    fake_lm.calls = 0
+    second = asyncio.run(
+        offline_kg.agenerate(
+            input_data=TEXT, chunk_size=100, output_folder=tmp_path, incremental=True
+        )
+    )
+
+    assert fake_lm.calls == 0
+    assert offline_kg.incremental_stats["extracted"] == 0
+    assert second.relations == first.relations
+
+
+def test_relation_provenance_points_to_chunks(offline_kg: KGGen, tmp_path):
+    graph = offline_kg.generate(
+        input_data=TEXT, chunk_size=100, output_folder=tmp_path, incremental=True
+    )
+    provenance = relation_provenance(tmp_path)
+
+    assert set(provenance) == graph.relations
+    assert all(len(key) == 64 for keys in provenance.values() for key in keys)
+
+
+def test_incremental_requires_output_folder(offline_kg: KGGen):
+    with pytest.raises(ValueError):
+        offline_kg.generate(input_data=TEXT, chunk_size=100, incremental=True)
@@ -0,0 +1,105 @@
+import io
+from itertools import islice
+
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.utils.chunk_text import chunk_text, iter_chunks
+
+with open("tests/data/kingkiller_chapter_one.txt", "r", encoding="utf-8") as f:
+    TEXT = f.read()
+
+
+@pytest.mark.parametrize("max_chunk_size", [50, 500, 2000])
+@pytest.mark.parametrize("block_size", [64, 4096])
+def test_iter_chunks_matches_chunk_text(tmp_path, max_chunk_size, block_size):
+    path = tmp_path / "book.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    expected = chunk_text(TEXT, max_chunk_size)
+
+    sources = [
+        TEXT,
+        path,
+        io.StringIO(TEXT),
+        io.BytesIO(TEXT.encode("utf-8")),
+        iter(TEXT.splitlines(keepends=True)),
+    ]
+    for source in sources:
+        chunks = iter_chunks(source, max_chunk_size, block_size=block_size)
+        assert list(chunks) == expected
+
+
+def test_iter_chunks_decodes_multibyte_across_blocks():
+    text = "Ünïcödé sentences — with dashes. Ещё одно предложение. " * 20
+
+    chunks = iter_chunks(io.BytesIO(text.encode("utf-8")), 100, block_size=7)
+
+    assert list(chunks) == chunk_text(text, 100)
+
+
+def test_iter_chunks_token_budget():
+    chunks = iter_chunks(TEXT, chunk_size_tokens=200, tokenizer=len, block_size=512)
+
+    assert list(chunks) == chunk_text(TEXT, chunk_size_tokens=200, tokenizer=len)
+
+
+def test_iter_chunks_is_lazy():
+    def endless():
+        while True:
+            yield "Linda is the mother of Josh. "
+
+    chunks = list(islice(iter_chunks(endless(), 60), 3))
+
+    assert chunks == ["Linda is the mother of Josh. Linda is the mother of Josh."] * 3
+
+
+def test_iter_chunks_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text("")
+
+    assert list(iter_chunks(path)) == []
+
+
+def test_generate_streams_file_input(offline_kg: KGGen, tmp_path):
+    text = " ".join(
+        f"Person{chr(65 + i)} is the friend of Person{chr(66 + i)}." for i in range(20)
+    )
+    path = tmp_path / "input.txt"
+    path.write_text(text)
+
+    expected = offline_kg.generate(input_data=text, chunk_size=80)
+    graph = offline_kg.generate(input_data=path, chunk_size=80)
+
+    assert graph.entities == expected.entities
+    assert graph.relations == expected.relations
+
+
+def test_generate_pulls_chunks_lazily(offline_kg: KGGen):
+    offline_kg.max_concurrency = 1
+    pulled = []
+
+    def lines():
+        for i in range(50):
+            pulled.append(i)
+            yield f"Linda met Josh on day {i}. "
+
+    process_chunk = offline_kg._process_chunk
+    pulled_at_first_chunk = []
+
+    def recording_process_chunk(*args):
+        pulled_at_first_chunk.append(len(pulled))
+        return process_chunk(*args)
+
+    offline_kg._process_chunk = recording_process_chunk
+    offline_kg.generate(input_data=lines(), chunk_size=30)
+
+    assert len(pulled) == 50
+    assert pulled_at_first_chunk[0] < 10
+
+
+def test_generate_stream_input_requires_chunk_size(offline_kg: KGGen, tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("Linda is the mother of Josh.")
+
+    with pytest.raises(ValueError):
+        offline_kg.generate(input_data=path)
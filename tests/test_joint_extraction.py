@@ -0,0 +1,96 @@
+import asyncio
+
+import dspy
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.steps._2_get_relations import (
+    aget_entities_and_relations,
+    get_entities_and_relations,
+)
+from src.kg_gen.utils.relation_repair import RelationRepairer
+
+TEXT = "Linda is the mother of Josh. Ben is the brother of Josh. Andrew is the father of Josh."
+
+
+def test_joint_mode_uses_one_call_per_chunk(offline_kg: KGGen, fake_lm):
+    two_step = offline_kg.generate(input_data=TEXT, chunk_size=30)
+    two_step_calls = fake_lm.calls
+
+    fake_lm.calls = 0
+    joint = offline_kg.generate(input_data=TEXT, chunk_size=30, extraction_mode="joint")
+
+    assert fake_lm.calls * 2 == two_step_calls
+    assert joint.entities == two_step.entities
+    assert joint.relations == two_step.relations
+
+
+def test_agenerate_joint_mode(offline_kg: KGGen, fake_lm):
+    graph = asyncio.run(offline_kg.agenerate(input_data=TEXT, extraction_mode="joint"))
+
+    assert fake_lm.calls == 1
+    assert {"Linda", "Josh", "Ben", "Andrew"} <= graph.entities
+    assert ("Andrew", "relates to", "Ben") in graph.relations
+
+
+def test_joint_mode_falls_back_to_two_step(offline_kg: KGGen, fake_lm):
+    answer = fake_lm._answer
+
+    def unparseable_joint_answer(messages):
+        # The joint prompt asks for relations without being given entities.
+        is_joint = (
+            "`relations`" in messages[0]["content"]
+            and "## entities ##" not in messages[-1]["content"]
+        )
+        return "no fields here" if is_joint else answer(messages)
+
+    fake_lm._answer = unparseable_joint_answer
+    graph = offline_kg.generate(input_data=TEXT, extraction_mode="joint")
+
+    assert {"Linda", "Josh", "Ben", "Andrew"} <= graph.entities
+    assert graph.relations
+
+
+def off_list_joint_lm(fake_lm):
+    """Make the joint answer name one endpoint loosely and one not at all."""
+    answer = fake_lm._answer
+    prompts = []
+
+    def patched(messages):
+        prompts.append(messages[0]["content"])
+        content = answer(messages)
+        if "## entities ##" in content and "## relations ##" in content:
+            content = content.replace(
+                '"subject": "Ben"', '"subject": "ben"', 1
+            ).replace('"object": "Josh"', '"object": "Ghost"', 1)
+        return content
+
+    fake_lm._answer = patched
+    return prompts
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_joint_relations_are_repaired_onto_entities(fake_lm, use_async):
+    prompts = off_list_joint_lm(fake_lm)
+    repair = RelationRepairer()
+    text = "Andrew met Ben. Ben met Josh."
+
+    with dspy.context(lm=fake_lm):
+        if use_async:
+            entities, relations = asyncio.run(
+                aget_entities_and_relations(text, repair=repair)
+            )
+        else:
+            entities, relations = get_entities_and_relations(text, repair=repair)
+
+    assert entities == ["Andrew", "Ben", "Josh"]
+    assert ("Andrew", "relates to", "Ben") in relations
+    assert all(s in entities and o in entities for s, _, o in relations)
+    assert sum("`fixed_relations`" in prompt for prompt in prompts) == 1
+    assert repair.stats()["llm_fix"] == 1
+    assert repair.stats()["sent_to_llm"] == 1
+
+
+def test_unknown_extraction_mode(offline_kg: KGGen):
+    with pytest.raises(ValueError):
+        offline_kg.generate(input_data=TEXT, extraction_mode="single")
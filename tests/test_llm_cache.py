@@ -0,0 +1,61 @@
+import dspy
+
+from src.kg_gen import KGGen
+from src.kg_gen.steps._1_get_entities import TextEntities
+from src.kg_gen.utils.llm_cache import ExtractionCache
+
+TEXT = "Linda is the mother of Josh. Ben is the brother of Josh."
+
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+
+    assert cache.get("missing") is None
+    cache.set("key", ["Linda", "Josh"])
+
+    assert cache.get("key") == ["Linda", "Josh"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ExtractionCache(path).set("key", [["Linda", "is mother of", "Josh"]])
+
+    assert ExtractionCache(path).get("key") == [["Linda", "is mother of", "Josh"]]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), max_size_bytes=30)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    cache.get("a")  # "b" is now the least recently used entry
+    cache.set("c", "z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.get("c") == "z" * 10
+    assert cache.stats()["size_bytes"] <= 30
+
+
+def test_cache_key_depends_on_model(tmp_path, fake_lm):
+    with dspy.context(lm=fake_lm):
+        key = ExtractionCache.make_key(TextEntities, TEXT)
+    with dspy.context(lm=dspy.LM("openai/gpt-4o-mini")):
+        other_key = ExtractionCache.make_key(TextEntities, TEXT)
+
+    assert key != other_key
+
+
+def test_generate_served_from_cache(tmp_path, fake_lm):
+    kg = KGGen(api_key="dummy-key", cache_path=str(tmp_path / "cache.sqlite"))
+    kg.lm = fake_lm
+
+    first = kg.generate(input_data=TEXT)
+    calls_after_first = fake_lm.calls
+    second = kg.generate(input_data=TEXT)
+
+    assert second == first
+    assert fake_lm.calls == calls_after_first
+    assert kg.cache.stats()["hits"] == 2
@@ -0,0 +1,118 @@
+import asyncio
+
+import dspy
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.utils.metrics import (
+    MetricsCallback,
+    MetricsCollector,
+    note_retry,
+    track_call,
+)
+
+TEXT = "Linda is the mother of Josh. Ben is the brother of Josh. Andrew is the father of Josh."
+
+
+@pytest.fixture
+def metrics(offline_kg: KGGen, fake_lm, monkeypatch) -> MetricsCollector:
+    """Attach a collector and have the FakeLM report usage like `dspy.LM` does."""
+    forward, aforward = fake_lm.forward, fake_lm.aforward
+
+    def report(response):
+        if dspy.settings.usage_tracker:
+            dspy.settings.usage_tracker.add_usage(fake_lm.model, response.usage)
+        return response
+
+    monkeypatch.setattr(fake_lm, "forward", lambda **kw: report(forward(**kw)))
+
+    async def reporting_aforward(**kw):
+        return report(await aforward(**kw))
+
+    monkeypatch.setattr(fake_lm, "aforward", reporting_aforward)
+    collector = MetricsCollector()
+    offline_kg.callbacks.append(collector)
+    return collector
+
+
+def test_generate_reports_each_stage_per_chunk(offline_kg: KGGen, metrics):
+    offline_kg.generate(input_data=TEXT, chunk_size=30)
+
+    stages = {(event.stage, event.chunk_index) for event in metrics.events}
+    assert stages == {
+        (stage, i) for stage in ("entities", "relations") for i in range(3)
+    }
+    assert all(event.lm_calls == 1 for event in metrics.events)
+    assert all(event.prompt_tokens > 0 for event in metrics.events)
+    assert all(event.latency > 0 for event in metrics.events)
+
+    summary = metrics.summary()
+    assert summary["entities"]["calls"] == 3
+    assert summary["relations"]["completion_tokens"] > 0
+    assert "relations" in metrics.report().splitlines()[2]
+
+
+def test_agenerate_joint_and_cluster_stages(offline_kg: KGGen, metrics):
+    graph = asyncio.run(
+        offline_kg.agenerate(input_data=TEXT, chunk_size=30, extraction_mode="joint")
+    )
+    offline_kg.cluster(graph)
+
+    summary = metrics.summary()
+    assert summary["joint"]["calls"] == 3
+    assert summary["cluster"]["calls"] == 1
+    assert summary["cluster"]["lm_calls"] > 0
+
+
+def test_relations_fallback_shows_extra_lm_call(offline_kg: KGGen, fake_lm, metrics):
+    answer = fake_lm._answer
+
+    def unparseable_strict_relations(messages):
+        system = messages[0]["content"]
+        # The strict signature; the fallback's lists the allowed entities.
+        if "`relations`" in system and "must be one of" not in system:
+            return "not parseable"
+        return answer(messages)
+
+    fake_lm._answer = unparseable_strict_relations
+    offline_kg.generate(input_data=TEXT)
+
+    (relations,) = [event for event in metrics.events if event.stage == "relations"]
+    assert relations.lm_calls > 1
+
+
+def test_failed_step_is_reported(offline_kg: KGGen, fake_lm, metrics):
+    def failing_answer(messages):
+        raise RuntimeError("provider went away")
+
+    fake_lm._answer = failing_answer
+    with pytest.raises(RuntimeError):
+        offline_kg.generate(input_data=TEXT)
+
+    (event,) = metrics.events
+    assert event.stage == "entities"
+    assert isinstance(event.error, RuntimeError)
+    assert metrics.summary()["entities"]["errors"] == 1
+
+
+def test_track_call_hooks_and_retries():
+    seen = []
+
+    class Recorder(MetricsCallback):
+        def on_call_start(self, event):
+            seen.append(("start", event.stage, event.chunk_index))
+
+        def on_call_end(self, event):
+            seen.append(("end", event.stage, event.retries))
+
+    with track_call([Recorder()], "entities", 4):
+        note_retry()
+        note_retry()
+    note_retry()  # outside any step: ignored
+
+    assert seen == [("start", "entities", 4), ("end", "entities", 2)]
+
+
+def test_no_callbacks_is_a_no_op():
+    with track_call([], "entities") as event:
+        assert event is None
@@ -0,0 +1,134 @@
+import json
+
+import nltk
+from benchmarks._prompt_parsing import input_fields, output_fields
+from conftest import FakeLM
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+from src.kg_gen.utils import normalize
+from src.kg_gen.utils.normalize import Normalizer
+
+GRAPH = Graph(
+    entities={"cat", "cats", "Cat", "kitten", "dog", "dogs", "puppy"},
+    edges={"likes", "like", "liking", "chases", "chase"},
+    relations={
+        ("cat", "likes", "dog"),
+        ("cats", "like", "dogs"),
+        ("kitten", "liking", "puppy"),
+        ("dog", "chases", "cat"),
+        ("dogs", "chase", "cats"),
+    },
+)
+
+
+class RecordingLM(FakeLM):
+    """FakeLM that records the items of every ExtractCluster prompt."""
+
+    def __init__(self):
+        super().__init__()
+        self.extract_prompts: list[set[str]] = []
+
+    def _answer(self, messages) -> str:
+        if output_fields(messages[0]["content"]) == ["cluster"]:
+            items = json.loads(input_fields(messages[-1]["content"])["items"])
+            with self._lock:
+                self.extract_prompts.append(set(items))
+        return super()._answer(messages)
+
+
+def test_key_ignores_case_unicode_and_punctuation():
+    normalizer = Normalizer(lemmatize=False)
+
+    assert normalizer.key("Ｃａｔ") == normalizer.key("cat")
+    assert normalizer.key("New-York ") == normalizer.key("new  york")
+    assert normalizer.key("cats") != normalizer.key("cat")
+
+
+def test_key_keeps_symbols_that_tell_items_apart():
+    normalizer = Normalizer(lemmatize="stem")
+
+    assert len({normalizer.key(item) for item in ("C", "C#", "C++")}) == 3
+    assert normalizer.key("F") != normalizer.key("F#")
+    assert len({normalizer.key(item) for item in ("+", "-", "&", ".")}) == 4
+    assert normalizer.groups({"AT&T", "at&t", "ATT"}) == {
+        "ATT": {"ATT"},
+        "AT&T": {"AT&T", "at&t"},
+    }
+
+
+def test_groups_are_keyed_by_shortest_member():
+    normalizer = Normalizer(lemmatize=lambda word, pos: word.removesuffix("s"))
+
+    assert normalizer.groups({"Cats", "cat", "cats", "dog"}) == {
+        "cat": {"Cats", "cat", "cats"},
+        "dog": {"dog"},
+    }
+
+
+def test_entities_are_lemmatized_as_nouns_only():
+    verbs = {"rose": "rise", "saw": "see", "aids": "aid"}
+    normalizer = Normalizer(
+        lemmatize=lambda word, pos: verbs.get(word, word) if pos == "v" else word
+    )
+
+    assert len(normalizer.groups({"Rose", "rise", "saw", "see", "AIDS", "aid"})) == 6
+    assert normalizer.key("rose", "edges") == normalizer.key("rise", "edges")
+    assert normalizer.groups({"saw", "see"}, "edges") == {"saw": {"saw", "see"}}
+
+
+def test_stemmer_merges_inflections():
+    normalizer = Normalizer(lemmatize="stem")
+
+    assert normalizer.key("likes", "edges") == normalizer.key("liking") == "like"
+    assert normalizer.key("Cats") == normalizer.key("cat")
+
+
+def test_default_lemmatizer_fetches_wordnet_once_and_never_stems(monkeypatch):
+    downloads = []
+
+    def find(resource_path, *args, **kwargs):
+        raise LookupError(resource_path)
+
+    monkeypatch.setattr(nltk.data, "find", find)
+    monkeypatch.setattr(nltk, "download", lambda name, **kwargs: downloads.append(name))
+    normalize.default_lemmatizer.cache_clear()
+    try:
+        lemmatize = normalize.default_lemmatizer()
+        normalizer = Normalizer()
+        if lemmatize is None:  # no WordNet data: inflections are left alone
+            assert normalizer.key("Mars") != normalizer.key("mar")
+        assert normalizer.key("Mars") == normalizer.key("MARS")
+    finally:
+        normalize.default_lemmatizer.cache_clear()
+
+    assert downloads == ["wordnet"]
+
+
+def test_lm_only_sees_one_item_per_group():
+    lm = RecordingLM()
+    kg = KGGen(api_key="dummy-key", cluster_normalize=Normalizer(lemmatize="stem"))
+    kg.lm = lm
+
+    clustered = kg.cluster(GRAPH)
+
+    assert {"Cat", "kitten", "dog", "puppy"} in lm.extract_prompts
+    assert clustered.entity_clusters["Cat"] == {"Cat", "cat", "cats"}
+    assert clustered.edge_clusters["like"] == {"like", "likes", "liking"}
+    assert ("Cat", "like", "dog") in clustered.relations
+    assert ("dog", "chase", "Cat") in clustered.relations
+    assert kg.normalization_stats["entities"] == {
+        "items": 7,
+        "sent_to_lm": 4,
+        "merged_groups": 2,
+        "estimated_lm_calls_avoided": 6,
+    }
+    assert kg.normalization_stats["edges"]["sent_to_lm"] == 2
+    # Each call counts on its own copy, so the shared Normalizer is untouched.
+    assert kg.cluster_normalize.stats == {}
+
+
+def test_normalization_is_off_by_default(offline_kg):
+    clustered = offline_kg.cluster(GRAPH)
+
+    assert clustered.entities == GRAPH.entities
+    assert offline_kg.normalization_stats is None
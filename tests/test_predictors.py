@@ -0,0 +1,51 @@
+import dspy
+
+from src.kg_gen import KGGen
+from src.kg_gen.steps._1_get_entities import TextEntities
+from src.kg_gen.steps._2_get_relations import (
+    _relation_model,
+    extraction_sig,
+    fallback_extraction_sig,
+    joint_extraction_sig,
+)
+from src.kg_gen.utils.predictors import cached_predict
+
+
+def test_signatures_are_memoized():
+    Relation = _relation_model()
+
+    assert _relation_model() is Relation
+    assert extraction_sig(Relation, False, "") is extraction_sig(Relation, False, "")
+    assert extraction_sig(Relation, True, "") is not extraction_sig(Relation, False, "")
+    assert joint_extraction_sig(Relation, False, "news") is joint_extraction_sig(
+        Relation, False, "news"
+    )
+
+
+def test_fallback_signatures_are_not_memoized():
+    extraction_sig.cache_clear()
+    extraction_sig(_relation_model(), False, "")
+
+    for entities in (["Linda"], ["Josh"], ["Ben"]):
+        fallback_extraction_sig(entities, False)
+
+    assert extraction_sig.cache_info().currsize == 1
+
+
+def test_predictors_are_shared_per_signature():
+    predictor = cached_predict(TextEntities)
+
+    assert isinstance(predictor, dspy.Predict)
+    assert cached_predict(TextEntities) is predictor
+
+
+def test_chunks_reuse_predictors(offline_kg: KGGen):
+    cached_predict.cache_clear()
+    offline_kg.generate(
+        input_data="Linda is the mother of Josh. Ben is the brother of Josh.",
+        chunk_size=30,
+    )
+
+    info = cached_predict.cache_info()
+    assert info.misses == 2  # one entity and one relation predictor
+    assert info.hits == 2
@@ -0,0 +1,130 @@
+import copy
+import time
+from types import SimpleNamespace
+
+import dspy
+import litellm
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.utils.rate_limit import (
+    AdaptiveConcurrency,
+    RateLimitedLM,
+    RateLimiter,
+    TokenBucket,
+)
+
+
+def rate_limit_error():
+    return litellm.RateLimitError(
+        message="429", llm_provider="openai", model="openai/gpt-4o"
+    )
+
+
+def response(total_tokens=10):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+        usage={"total_tokens": total_tokens},
+        model="openai/gpt-4o",
+    )
+
+
+def test_token_bucket_waits_once_exhausted():
+    bucket = TokenBucket(per_minute=60)  # one token per second
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_aimd_increases_on_healthy_latency_and_halves_on_rate_limit():
+    concurrency = AdaptiveConcurrency(initial_limit=4, max_limit=8, cooldown=0.0)
+    for _ in range(20):
+        concurrency.on_success(0.1)
+    assert concurrency.limit > 4
+
+    before = concurrency.limit
+    concurrency.on_rate_limit()
+    assert concurrency.limit == pytest.approx(before / 2)
+
+
+def test_aimd_ignores_slow_calls_and_repeated_429s_within_cooldown():
+    concurrency = AdaptiveConcurrency(initial_limit=4, max_limit=8, cooldown=60.0)
+    concurrency.on_success(0.1)
+    limit = concurrency.limit
+    concurrency.on_success(5.0)
+    assert concurrency.limit == limit
+
+    concurrency.on_rate_limit()
+    concurrency.on_rate_limit()
+    assert concurrency.limit == pytest.approx(limit / 2)
+
+
+def test_rate_limiter_retries_rate_limit_errors_and_backs_off():
+    limiter = RateLimiter(max_concurrency=8, backoff=0.0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise rate_limit_error()
+        return response()
+
+    assert limiter.call(flaky, estimated_tokens=10).usage["total_tokens"] == 10
+    assert len(attempts) == 3
+    assert limiter.stats()["rate_limited"] == 2
+    assert limiter.concurrency.limit < 4
+
+
+def test_rate_limiter_does_not_retry_other_errors():
+    limiter = RateLimiter(backoff=0.0)
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limiter.call(broken, estimated_tokens=10)
+    assert limiter.stats()["retries"] == 0
+
+
+def test_rate_limiter_bounds_requests_per_minute():
+    limiter = RateLimiter(requests_per_minute=600, adaptive=False)
+    limiter.requests.tokens = 0  # drain the initial burst
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.call(response, estimated_tokens=1)
+
+    # 600 RPM refills one request every 0.1s
+    assert time.monotonic() - start >= 0.25
+
+
+def test_rate_limited_lm_routes_calls_through_shared_limiter(monkeypatch):
+    calls = []
+
+    def fake_forward(self, prompt=None, messages=None, **kwargs):
+        calls.append(messages)
+        if len(calls) == 1:
+            raise rate_limit_error()
+        return response()
+
+    monkeypatch.setattr(dspy.LM, "forward", fake_forward)
+    limiter = RateLimiter(backoff=0.0)
+    lm = RateLimitedLM(model="openai/gpt-4o", rate_limiter=limiter, cache=False)
+
+    lm.forward(messages=[{"role": "user", "content": "hi"}])
+
+    assert len(calls) == 2
+    assert lm.num_retries == 0
+    assert copy.deepcopy(lm).rate_limiter is limiter
+
+
+def test_kggen_builds_rate_limited_lm():
+    kg = KGGen(api_key="dummy-key", requests_per_minute=100, adaptive_concurrency=True)
+
+    assert isinstance(kg.lm, RateLimitedLM)
+    assert kg.lm.rate_limiter is kg.rate_limiter
+
+    kg.init_model(model="openai/gpt-4o-mini")
+    assert kg.lm.rate_limiter is kg.rate_limiter
+
+    assert not isinstance(KGGen(api_key="dummy-key").lm, RateLimitedLM)
@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import dspy
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.steps._2_get_relations import get_relations
+from src.kg_gen.utils.relation_repair import EntityMatcher, RelationRepairer
+
+ENTITIES = ["Linda", "Josh", "Eiffel Tower", "Andrew", "New York City"]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Linda", "Linda"),
+        ("  linda ", "Linda"),
+        ("The Eiffel Tower", "Eiffel Tower"),
+        ("eiffel-tower", "Eiffel Tower"),
+        ("City New York", "New York City"),
+        ("Andrw", "Andrew"),
+        ("New York Cty", "New York City"),
+        ("Paris", None),
+    ],
+)
+def test_entity_matcher(text, expected):
+    assert EntityMatcher(ENTITIES).match(text) == expected
+
+
+def test_entity_matcher_leaves_ties_unresolved():
+    assert EntityMatcher(["Jon", "Jan"], threshold=0.6).match("Jn") is None
+
+
+def test_repairer_splits_residue():
+    relations = [
+        SimpleNamespace(subject="linda", predicate="mother of", object="JOSH"),
+        SimpleNamespace(subject="Paris", predicate="near", object="Eiffel Tower"),
+    ]
+
+    repaired, residue = RelationRepairer().repair(relations, ENTITIES)
+
+    assert repaired == [("Linda", "mother of", "Josh")]
+    assert residue == relations[1:]
+
+
+def test_repairer_rejects_bad_threshold():
+    with pytest.raises(ValueError):
+        RelationRepairer(threshold=0)
+
+
+def fallback_lm(fake_lm, rewrite):
+    """Fail strict relation extraction and rewrite the fallback's answer."""
+    answer = fake_lm._answer
+    prompts = []
+
+    def patched(messages):
+        system = messages[0]["content"]
+        prompts.append(system)
+        if "`fixed_relations`" in system:
+            return answer(messages)
+        if "`relations`" in system:
+            if "must be one of" not in system:
+                return "not parseable"
+            return rewrite(answer(messages))
+        return answer(messages)
+
+    fake_lm._answer = patched
+    return prompts
+
+
+def test_fallback_repairs_locally_without_fix_call(fake_lm):
+    prompts = fallback_lm(
+        fake_lm, lambda content: content.replace('"Linda"', '"  the linda"')
+    )
+    repair = RelationRepairer()
+
+    with dspy.context(lm=fake_lm):
+        relations = get_relations(
+            "Linda is the mother of Josh.", ["Josh", "Linda"], repair=repair
+        )
+
+    assert relations == [("Josh", "relates to", "Linda")]
+    assert not any("`fixed_relations`" in prompt for prompt in prompts)
+    assert repair.stats()["local"] == 1
+    assert repair.stats()["repaired_locally"] == 1
+
+
+def test_fallback_counts_only_changed_relations(fake_lm):
+    fallback_lm(fake_lm, lambda content: content.replace('"Linda"', '"  the linda"'))
+    repair = RelationRepairer()
+
+    with dspy.context(lm=fake_lm):
+        relations = get_relations(
+            "Linda and Josh met Andrew.", ["Andrew", "Josh", "Linda"], repair=repair
+        )
+
+    assert relations == [
+        ("Andrew", "relates to", "Josh"),
+        ("Josh", "relates to", "Linda"),
+    ]
+    assert repair.stats()["local"] == 1
+    assert repair.stats()["repaired_locally"] == 1
+
+
+def test_fallback_sends_only_residue_to_llm(fake_lm):
+    prompts = fallback_lm(
+        fake_lm,
+        lambda content: content.replace(
+            '"object": "Linda"', '"object": "Unknown Person"'
+        ),
+    )
+    repair = RelationRepairer()
+
+    with dspy.context(lm=fake_lm):
+        relations = get_relations(
+            "Linda and Josh met Andrew.", ["Andrew", "Josh", "Linda"], repair=repair
+        )
+
+    assert ("Andrew", "relates to", "Josh") in relations
+    assert sum("`fixed_relations`" in prompt for prompt in prompts) == 1
+    assert repair.stats()["llm_fix"] == 1
+    assert repair.stats()["sent_to_llm"] == 1
+
+
+def test_kggen_counts_strict_path(offline_kg: KGGen):
+    offline_kg.generate(input_data="Linda is the mother of Josh.")
+
+    assert offline_kg.relation_repair.stats()["strict"] == 1
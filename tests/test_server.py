@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from app import server
+from src.kg_gen import KGGen
+from src.kg_gen.models import Graph
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    """Answer /api/generate without an LM and keep each request's KGGen."""
+    instances = []
+
+    async def fake_agenerate(self, **kwargs):
+        instances.append(self)
+        return Graph(entities={"Linda", "Josh"}, relations=set(), edges=set())
+
+    monkeypatch.setattr(KGGen, "agenerate", fake_agenerate)
+    return instances
+
+
+def test_generate_defaults_temperature_to_zero(generated):
+    client = TestClient(server.app)
+    response = client.post(
+        "/api/generate",
+        data={"api_key": "dummy-key", "source_text": "Linda is the mother of Josh."},
+    )
+
+    assert response.status_code == 200
+    (kg_gen,) = generated
+    assert kg_gen.temperature == 0.0
+    assert kg_gen.lm.kwargs["temperature"] == 0.0
+
+
+def test_generate_uses_given_temperature(generated):
+    client = TestClient(server.app)
+    response = client.post(
+        "/api/generate",
+        data={
+            "api_key": "dummy-key",
+            "source_text": "Linda is the mother of Josh.",
+            "temperature": "0.5",
+        },
+    )
+
+    assert response.status_code == 200
+    (kg_gen,) = generated
+    assert kg_gen.lm.kwargs["temperature"] == 0.5
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.utils.cassette import RecordingLM, ReplayLM
+
+from conftest import FakeLM, record_as_provider
+
+TEXT = "Linda is the mother of Josh. Ben is the brother of Josh. Andrew is the father of Josh."
+
+
+def recording(lm: FakeLM) -> list[str]:
+    """Record the system prompt of every call made to `lm`."""
+    prompts = []
+    answer = lm._answer
+
+    def record(messages):
+        prompts.append(messages[0]["content"])
+        return answer(messages)
+
+    lm._answer = record
+    return prompts
+
+
+def routed_kg(fake_lm, stage_models) -> KGGen:
+    kg = KGGen(api_key="dummy-key", stage_models=stage_models)
+    kg.lm = fake_lm
+    return kg
+
+
+def test_entities_routed_to_stage_model(fake_lm):
+    cheap = FakeLM()
+    cheap_prompts = recording(cheap)
+    main_prompts = recording(fake_lm)
+    kg = routed_kg(fake_lm, {"entities": cheap})
+
+    graph = kg.generate(input_data=TEXT, chunk_size=30)
+
+    assert cheap.calls == 3 and fake_lm.calls == 3
+    assert all("`entities`" in prompt for prompt in cheap_prompts)
+    assert all("`relations`" in prompt for prompt in main_prompts)
+    assert {"Linda", "Josh", "Ben", "Andrew"} <= graph.entities
+
+
+def test_async_and_joint_routing(fake_lm):
+    cheap = FakeLM()
+    kg = routed_kg(fake_lm, {"joint": cheap})
+
+    asyncio.run(kg.agenerate(input_data=TEXT, chunk_size=30, extraction_mode="joint"))
+
+    assert cheap.calls == 3 and fake_lm.calls == 0
+
+
+def test_clustering_signature_routed(fake_lm):
+    strong = FakeLM()
+    strong_prompts = recording(strong)
+    kg = routed_kg(fake_lm, {"extract_cluster": strong})
+    graph = kg.generate(input_data=TEXT)
+    fake_lm.calls = 0
+
+    kg.cluster(graph)
+
+    # With nothing to merge, the FakeLM only ever gets ExtractCluster calls.
+    assert strong.calls > 0 and fake_lm.calls == 0
+    assert all("`cluster`" in prompt for prompt in strong_prompts)
+
+
+def test_stage_model_specs_inherit_main_settings():
+    kg = KGGen(
+        model="openai/gpt-4o",
+        temperature=0.3,
+        api_key="dummy-key",
+        stage_models={
+            "entities": "openai/gpt-4o-mini",
+            "relations": {
+                "model": "ollama_chat/llama3.2",
+                "api_base": "http://localhost:11434",
+            },
+        },
+    )
+
+    entities_lm = kg.stage_lms["entities"]
+    relations_lm = kg.stage_lms["relations"]
+    assert entities_lm.model == "openai/gpt-4o-mini"
+    assert entities_lm.kwargs["temperature"] == 0.3
+    assert relations_lm.model == "ollama_chat/llama3.2"
+    assert relations_lm.kwargs["api_base"] == "http://localhost:11434"
+    assert set(kg._routed_lms()) >= {"entities", "validate_cluster"}
+    assert kg._routed_lms()["validate_cluster"] is kg.lm
+
+
+def test_stage_models_rebuilt_with_main_model():
+    kg = KGGen(api_key="dummy-key", stage_models={"entities": {"max_tokens": 1000}})
+    kg.init_model(model="openai/gpt-4.1")
+
+    assert kg.stage_lms["entities"].model == "openai/gpt-4.1"
+    assert kg.stage_lms["entities"].kwargs["max_tokens"] == 1000
+
+
+def test_stage_lm_instances_use_the_cassette(fake_lm, tmp_path):
+    path = tmp_path / "run.jsonl"
+    cheap = FakeLM()
+    kg = KGGen(
+        api_key="dummy-key",
+        cassette_path=path,
+        cassette_mode="record",
+        stage_models={"entities": cheap},
+    )
+    kg.lm = record_as_provider(kg, fake_lm)
+    expected = kg.generate(input_data=TEXT)
+    kg.cassette.close()
+    assert isinstance(kg.stage_lms["entities"], RecordingLM)
+
+    cheap.calls = 0
+    replay = KGGen(cassette_path=path, stage_models={"entities": cheap})
+
+    assert isinstance(replay.stage_lms["entities"], ReplayLM)
+    assert replay.generate(input_data=TEXT) == expected
+    assert cheap.calls == 0
+
+
+def test_stages_on_other_endpoints_get_their_own_rate_limiter():
+    kg = KGGen(
+        model="openai/gpt-4o",
+        api_key="dummy-key",
+        requests_per_minute=100,
+        stage_models={
+            "entities": {
+                "model": "ollama_chat/llama3.2",
+                "api_base": "http://localhost:11434",
+            },
+            "relations": {
+                "model": "ollama_chat/llama3.2",
+                "api_base": "http://localhost:11434",
+            },
+            "joint": {"max_tokens": 1000},
+        },
+    )
+
+    local = kg.stage_lms["entities"].rate_limiter
+    assert local is not kg.rate_limiter
+    assert kg.stage_lms["relations"].rate_limiter is local
+    assert kg.stage_lms["joint"].rate_limiter is kg.rate_limiter
+    assert kg.stage_rate_limiters == {
+        ("ollama_chat/llama3.2", "http://localhost:11434"): local
+    }
+
+
+def test_unknown_stage():
+    with pytest.raises(ValueError):
+        KGGen(api_key="dummy-key", stage_models={"entity": "openai/gpt-4o-mini"})
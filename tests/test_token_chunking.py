@@ -0,0 +1,72 @@
+import pytest
+
+from src.kg_gen import KGGen
+from src.kg_gen.utils.chunk_text import chunk_text, get_token_counter
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+class WhitespaceTokenizer:
+    def encode(self, text: str) -> list[str]:
+        return text.split()
+
+
+TEXT = (
+    "Linda is the mother of Josh. Ben is the brother of Josh. "
+    "Andrew is the father of Josh. Judy is the sister of Andrew."
+)
+
+
+def test_packs_sentences_up_to_token_budget():
+    chunks = chunk_text(TEXT, chunk_size_tokens=12, tokenizer=word_count)
+
+    assert chunks == [
+        "Linda is the mother of Josh. Ben is the brother of Josh.",
+        "Andrew is the father of Josh. Judy is the sister of Andrew.",
+    ]
+
+
+def test_tokenizer_with_encode_method():
+    chunks = chunk_text(TEXT, chunk_size_tokens=6, tokenizer=WhitespaceTokenizer())
+
+    assert len(chunks) == 4
+    assert all(word_count(chunk) <= 6 for chunk in chunks)
+
+
+def test_long_sentence_is_split_by_words():
+    text = " ".join(["word"] * 25) + "."
+
+    chunks = chunk_text(text, chunk_size_tokens=10, tokenizer=word_count)
+
+    assert [word_count(chunk) for chunk in chunks] == [10, 10, 5]
+    assert " ".join(chunks) == text
+
+
+def test_default_tokenizer_counts_tokens():
+    count = get_token_counter()
+
+    assert 0 < count("Linda is the mother of Josh.") < 20
+
+
+def test_invalid_budget_and_tokenizer():
+    with pytest.raises(ValueError):
+        chunk_text(TEXT, chunk_size_tokens=0, tokenizer=word_count)
+    with pytest.raises(ValueError):
+        get_token_counter(42)
+
+
+def test_generate_with_token_budget(fake_lm):
+    kg = KGGen(api_key="dummy-key", tokenizer=word_count)
+    kg.lm = fake_lm
+
+    graph = kg.generate(input_data=TEXT, chunk_size_tokens=12)
+
+    assert fake_lm.calls == 4  # two chunks, two calls each
+    assert {"Linda", "Josh", "Ben", "Andrew", "Judy"} <= graph.entities
+
+
+def test_generate_rejects_both_chunk_sizes(offline_kg: KGGen):
+    with pytest.raises(ValueError):
+        offline_kg.generate(input_data=TEXT, chunk_size=30, chunk_size_tokens=10)